@@ -1,9 +1,18 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
 import sys
 from importlib.metadata import PackageNotFoundError
 from PyInstaller.utils.hooks import collect_all, copy_metadata
 
-datas = []
+sys.path.insert(0, SPECPATH)
+
+from fontrapak.clientassets import bundledAssetsDirName, writeBuildAssets
+
+# Derive the client version token from the client files, and precompress them
+assetsBuildDir = os.path.join(workpath, bundledAssetsDirName)
+print("client version token:", writeBuildAssets(assetsBuildDir))
+
+datas = [(assetsBuildDir, bundledAssetsDirName)]
 binaries = []
 hiddenimports = []
 
@@ -16,8 +25,22 @@ modules_to_collect_all = [
     "openstep_plist",
     "glyphsLib.data",
 ]
+
+
+def isShippedModule(name):
+    # Test suites are of no use in the app
+    return not any(part in {"test", "tests"} for part in name.split("."))
+
+
 for module_name in modules_to_collect_all:
-    tmp_ret = collect_all(module_name)
+    # Collected as a whole, as the plugins are found through entry points and
+    # import their submodules dynamically. Nothing is imported until a file
+    # needs it, see fontrapak/filetypes.py: the bundle's size only costs disk.
+    tmp_ret = collect_all(
+        module_name,
+        filter_submodules=isShippedModule,
+        exclude_datas=["**/tests/**", "**/test/**"],
+    )
     datas += tmp_ret[0]
     binaries += tmp_ret[1]
     hiddenimports += tmp_ret[2]
@@ -29,6 +52,20 @@ for module_name in modules_to_collect_all:
 
 block_cipher = None
 
+# Windows and Linux only; the macOS app is always a folder. "onedir" (the
+# default) builds a folder with the executable and its libraries next to it:
+# it starts without first unpacking itself to a temporary folder, which the
+# "onefile" executable does on each launch, along with UPX-decompressing the
+# libraries.
+bundleModes = ["onedir", "onefile"]
+bundleMode = os.environ.get("FONTRA_PAK_BUNDLE_MODE", "onedir")
+if bundleMode not in bundleModes:
+    raise SystemExit(
+        f"FONTRA_PAK_BUNDLE_MODE must be one of {', '.join(bundleModes)}, "
+        f"not {bundleMode!r}"
+    )
+print("bundle mode:", bundleMode)
+
 
 a = Analysis(
     ["FontraPakMain.py"],
@@ -98,6 +135,36 @@ if sys.platform == "darwin":
             ],
         },
     )
+elif bundleMode == "onedir":
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name="Fontra Pak",
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        # Nothing to gain in download size that's worth decompressing the
+        # libraries at every launch
+        upx=False,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+        icon="icon/FontraIcon.ico",
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.zipfiles,
+        a.datas,
+        strip=False,
+        upx=False,
+        name="Fontra Pak",
+    )
 else:
     exe = EXE(
         pyz,
@@ -0,0 +1,162 @@
+"""Compile the same sample projects with each compile engine, and compare
+wall time, peak memory and output table sizes:
+
+    python -m benchmarks.compileengines Sample1.designspace Sample2.glyphs
+
+Each compile runs in a fresh process, with the export cache off, so the
+numbers are comparable between engines and runs. The outputs of each engine
+are checked against those of the reference engine (the first one).
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fontrapak.compileengines import compileEngines, defaultCompileEngineName
+from fontrapak.exportcache import exportCacheModeEnvironmentVariable
+from fontrapak.memory import formatBytes, getPeakChildRSS
+
+
+def getOutputSummary(fontPath):
+    from fontTools.ttLib import TTFont
+
+    font = TTFont(fontPath, lazy=True)
+    summary = dict(
+        glyphNames=sorted(font.getGlyphOrder()),
+        cmap={str(codePoint): name for codePoint, name in font.getBestCmap().items()},
+        advanceWidths={
+            glyphName: advance
+            for glyphName, (advance, _) in font["hmtx"].metrics.items()
+        },
+        axes=[axis.axisTag for axis in font["fvar"].axes] if "fvar" in font else [],
+    )
+    tableSizes = {tag: len(font.reader[tag]) for tag in sorted(font.reader.keys())}
+    font.close()
+    return summary, tableSizes
+
+
+def compileSample(sourcePath, engineName, outputDir):
+    os.environ[exportCacheModeEnvironmentVariable] = "off"
+    from fontrapak.export import exportFontToPath
+
+    destPath = outputDir / f"{sourcePath.stem}-{engineName}.ttf"
+    logFilePath = outputDir / f"{sourcePath.stem}-{engineName}.log"
+    start = time.perf_counter()
+    try:
+        report = exportFontToPath(
+            sourcePath, destPath, "ttf", logFilePath, compileEngine=engineName
+        )
+    except Exception as e:
+        return dict(
+            source=os.fspath(sourcePath),
+            engine=engineName,
+            status="failed",
+            error=repr(e),
+            logFile=os.fspath(logFilePath),
+        )
+    wallTime = time.perf_counter() - start
+
+    summary, tableSizes = getOutputSummary(destPath)
+    # fontmake may run in a subprocess of its own
+    peakRSS = max(report["peakRSS"], getPeakChildRSS() or 0)
+    return dict(
+        source=os.fspath(sourcePath),
+        engine=engineName,
+        status="done",
+        wallTime=wallTime,
+        peakRSS=peakRSS,
+        fileSize=destPath.stat().st_size,
+        tableSizes=tableSizes,
+        summary=summary,
+    )
+
+
+def compareSummaries(summary, referenceSummary):
+    return [key for key in referenceSummary if summary[key] != referenceSummary[key]]
+
+
+def runBenchmark(sourcePaths, engineNames, outputDir):
+    results = []
+    for sourcePath in sourcePaths:
+        reference = None
+        for engineName in engineNames:
+            # A fresh process for each compile, for honest peak RSS figures
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(
+                    compileSample, sourcePath, engineName, outputDir
+                ).result()
+            if result["status"] == "done":
+                if reference is None:
+                    reference = result
+                else:
+                    result["differences"] = compareSummaries(
+                        result["summary"], reference["summary"]
+                    )
+            print(formatResult(result), flush=True)
+            results.append(result)
+    return results
+
+
+def formatResult(result):
+    name = f"{pathlib.Path(result['source']).name} [{result['engine']}]"
+    if result["status"] != "done":
+        return f"{name}: failed, {result['error']} (see {result['logFile']})"
+    differences = result.get("differences")
+    if differences is None:
+        check = "reference"
+    elif differences:
+        check = "differs in " + ", ".join(differences)
+    else:
+        check = "matches reference"
+    return (
+        f"{name}: {result['wallTime']:.2f}s, peak RSS "
+        f"{formatBytes(result['peakRSS'])}, {formatBytes(result['fileSize'])}; "
+        f"{check}"
+    )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.compileengines",
+        description="Compare compile engines on sample projects",
+    )
+    parser.add_argument("sources", nargs="+", help="sample project paths")
+    parser.add_argument(
+        "--engines",
+        default=",".join(
+            [defaultCompileEngineName]
+            + sorted(set(compileEngines) - {defaultCompileEngineName})
+        ),
+        help="comma-separated engines to compare, the first is the reference",
+    )
+    parser.add_argument("--output-dir", help="keep the outputs in this folder")
+    parser.add_argument("--report", help="write the results as JSON to this path")
+    args = parser.parse_args(args)
+
+    engineNames = args.engines.split(",")
+    for engineName in engineNames:
+        if engineName not in compileEngines:
+            parser.error(f"unknown engine: {engineName}")
+    sourcePaths = [pathlib.Path(source).resolve() for source in args.sources]
+
+    with tempfile.TemporaryDirectory() as tempDir:
+        outputDir = pathlib.Path(args.output_dir or tempDir).resolve()
+        outputDir.mkdir(parents=True, exist_ok=True)
+        results = runBenchmark(sourcePaths, engineNames, outputDir)
+
+    if args.report:
+        for result in results:
+            result.pop("summary", None)
+        with open(args.report, "w", encoding="utf-8") as reportFile:
+            json.dump(dict(results=results), reportFile, indent=2)
+
+    return 1 if any(result["status"] != "done" for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
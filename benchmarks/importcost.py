@@ -0,0 +1,206 @@
+"""Report what each of Fontra Pak's processes imports, and what it costs:
+
+    python -m benchmarks.importcost --dist "dist/Fontra Pak" --report imports.json
+
+For each process, the modules it imports on startup are timed with
+`python -X importtime`, in a fresh interpreter, and its resident memory is
+measured once they are imported. The export worker is measured with the
+plugins it used to import up front and with the ones it imports now; each
+optional plugin is measured on top of the worker's own imports. With --dist,
+the sizes of the top-level folders of a build are listed too.
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import subprocess
+import sys
+
+from fontrapak.compileengines import compileEngines
+from fontrapak.exportworker import warmModules
+from fontrapak.filetypes import optionalModules
+from fontrapak.memory import formatBytes
+
+repoRoot = pathlib.Path(__file__).resolve().parent.parent
+
+optionalModuleNames = sorted(
+    {
+        moduleName
+        for moduleNames in optionalModules.values()
+        for moduleName in moduleNames
+    }
+    | {
+        moduleName
+        for engine in compileEngines.values()
+        for moduleName in engine.moduleNames
+    }
+)
+
+scenarios = {
+    "baseline": [],
+    "gui": ["FontraPakMain", "fontrapak.app"],
+    "server": ["fontrapak.server", "fontrapak.projectmanager", "fontra.core.server"],
+    "export worker, all plugins": warmModules + optionalModuleNames,
+    "export worker": warmModules,
+}
+
+# The last line the measuring script prints
+rssPrefix = "rss "
+
+
+def parseImportTime(text):
+    """Parse `python -X importtime` output into a list of dicts with the
+    module name, its own import time and its cumulative import time, in
+    seconds, and its nesting depth.
+    """
+    imports = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # The header
+            continue
+        selfTime, cumulativeTime, name = fields
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append(
+            dict(
+                module=name.strip(),
+                selfTime=int(selfTime) / 1e6,
+                cumulativeTime=int(cumulativeTime) / 1e6,
+                depth=depth,
+            )
+        )
+    return imports
+
+
+def summarizeByPackage(imports):
+    # Total own import time per top-level package, most expensive first
+    packageTimes = {}
+    for item in imports:
+        package = item["module"].split(".")[0]
+        packageTimes[package] = packageTimes.get(package, 0) + item["selfTime"]
+    return dict(sorted(packageTimes.items(), key=lambda item: -item[1]))
+
+
+def measureImports(moduleNames, python=sys.executable):
+    script = (
+        "".join(f"import {moduleName}\n" for moduleName in moduleNames)
+        + "from fontrapak.memory import getCurrentRSS\n"
+        + f"print({rssPrefix!r} + str(getCurrentRSS()))\n"
+    )
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", script],
+        capture_output=True,
+        cwd=repoRoot,
+        encoding="utf-8",
+        check=False,
+    )
+    if result.returncode:
+        return dict(status="failed", error=result.stderr.strip().splitlines()[-1])
+    imports = parseImportTime(result.stderr)
+    rss = int(result.stdout.strip().splitlines()[-1].removeprefix(rssPrefix))
+    return dict(
+        status="done",
+        importTime=sum(item["selfTime"] for item in imports),
+        numModules=len(imports),
+        rss=rss,
+        packages=summarizeByPackage(imports),
+        modules=sorted(imports, key=lambda item: -item["selfTime"]),
+    )
+
+
+def getBundleSizes(distDir):
+    """Return the total size of a build, and the sizes of its top-level
+    files and folders, looking into PyInstaller's _internal folder.
+    """
+    distDir = pathlib.Path(distDir)
+    internalDir = distDir / "_internal"
+    rootDir = internalDir if internalDir.is_dir() else distDir
+    sizes = {}
+    total = 0
+    for path in distDir.rglob("*"):
+        if not path.is_file():
+            continue
+        size = path.stat().st_size
+        total += size
+        try:
+            topLevel = path.relative_to(rootDir).parts[0]
+        except ValueError:
+            topLevel = path.relative_to(distDir).parts[0]
+        sizes[topLevel] = sizes.get(topLevel, 0) + size
+    return dict(
+        total=total,
+        entries=dict(sorted(sizes.items(), key=lambda item: -item[1])),
+    )
+
+
+def runReport(distDirs=()):
+    results = {
+        name: measureImports(moduleNames) for name, moduleNames in scenarios.items()
+    }
+    for moduleName in optionalModuleNames:
+        results[f"export worker + {moduleName}"] = measureImports(
+            warmModules + [moduleName]
+        )
+    return dict(
+        scenarios=results,
+        bundles={os.fspath(distDir): getBundleSizes(distDir) for distDir in distDirs},
+    )
+
+
+def formatReport(report, numTop=10):
+    lines = []
+    scenarios = report["scenarios"]
+    baselineRSS = scenarios["baseline"].get("rss", 0)
+    for name, result in scenarios.items():
+        if result["status"] != "done":
+            lines.append(f"{name}: failed, {result['error']}")
+            continue
+        lines.append(
+            f"{name}: {result['numModules']} modules in "
+            f"{result['importTime']:.2f}s, "
+            f"+{formatBytes(result['rss'] - baselineRSS)} resident"
+        )
+        topPackages = list(result["packages"].items())[:numTop]
+        lines.extend(f"    {package:24} {time:6.3f}s" for package, time in topPackages)
+    for distDir, sizes in report["bundles"].items():
+        lines.append(f"bundle {distDir}: {formatBytes(sizes['total'])}")
+        topEntries = list(sizes["entries"].items())[:numTop]
+        lines.extend(
+            f"    {entry:24} {formatBytes(size)}" for entry, size in topEntries
+        )
+    return "\n".join(lines)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.importcost",
+        description="Report the import cost of each Fontra Pak process",
+    )
+    parser.add_argument(
+        "--dist",
+        action="append",
+        default=[],
+        help="a build folder to list the size of (can be repeated)",
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="packages to list per process"
+    )
+    parser.add_argument("--report", help="write the full report as JSON to this path")
+    args = parser.parse_args(args)
+
+    report = runReport(args.dist)
+    print(formatReport(report, args.top))
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as reportFile:
+            json.dump(report, reportFile, indent=2)
+
+    failed = any(result["status"] != "done" for result in report["scenarios"].values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""Build the app in each bundle mode and compare how long it takes to launch:
+
+    python -m benchmarks.launchtime --modes onefile,onedir --runs 5
+
+Each build is launched with the `test-startup` argument, which makes the app
+report when its window was shown, when the server was ready and when it
+served the first page, and quit. The first launch of a build is reported
+separately: it pays for the operating system's caches being cold. Use
+--no-build to measure earlier builds in the same --build-dir again, or
+--dist to measure a build made by `pyinstaller FontraPak.spec`:
+
+    python -m benchmarks.launchtime --modes onedir --dist dist
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+
+repoRoot = pathlib.Path(__file__).resolve().parent.parent
+
+bundleModes = ["onedir", "onefile"]
+bundleModeEnvironmentVariable = "FONTRA_PAK_BUNDLE_MODE"
+
+startupTimingPrefix = "startup-timing "
+startupMilestones = ["processStart", "windowShown", "serverReady", "firstPage"]
+
+
+def findAppPath(distDir, platform=sys.platform):
+    """Return the path of the executable PyInstaller built in `distDir`, in
+    whichever bundle mode.
+    """
+    distDir = pathlib.Path(distDir)
+    if platform == "darwin":
+        return distDir / "Fontra Pak.app" / "Contents" / "MacOS" / "Fontra Pak"
+    exeName = "Fontra Pak.exe" if platform == "win32" else "Fontra Pak"
+    appDir = distDir / "Fontra Pak"
+    if appDir.is_dir():
+        return appDir / exeName
+    return distDir / exeName
+
+
+def runTestStartup(appPath, timeout=90):
+    """Launch the app in test-startup mode. Returns the completed process, the
+    times it reported, and the milestones among those in seconds from
+    launching. The latter two are None if it reported nothing.
+    """
+    launchTime = time.time()
+    result = subprocess.run(
+        [appPath, "test-startup"],
+        capture_output=True,
+        timeout=timeout,
+        check=False,
+        encoding="utf-8",
+    )
+    exitTime = time.time()
+    startupTimes = None
+    for line in result.stdout.splitlines():
+        if line.startswith(startupTimingPrefix):
+            startupTimes = json.loads(line.removeprefix(startupTimingPrefix))
+    if startupTimes is None:
+        return result, None, None
+    timings = {
+        name: startupTimes[name] - launchTime
+        for name in startupMilestones
+        if name in startupTimes
+    }
+    timings["exit"] = exitTime - launchTime
+    return result, startupTimes, timings
+
+
+def buildApp(mode, buildDir):
+    distDir = buildDir / mode / "dist"
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "PyInstaller",
+            "FontraPak.spec",
+            "-y",
+            "--distpath",
+            os.fspath(distDir),
+            "--workpath",
+            os.fspath(buildDir / mode / "work"),
+        ],
+        cwd=repoRoot,
+        env=dict(os.environ, **{bundleModeEnvironmentVariable: mode}),
+        check=True,
+    )
+    return distDir
+
+
+def getBundleSize(distDir):
+    return sum(
+        path.stat().st_size
+        for path in pathlib.Path(distDir).rglob("*")
+        if path.is_file()
+    )
+
+
+def measureMode(mode, distDir, numRuns):
+    appPath = findAppPath(distDir)
+    runs = []
+    for _ in range(numRuns):
+        result, _, timings = runTestStartup(appPath)
+        if timings is None:
+            return dict(
+                mode=mode,
+                status="failed",
+                error=(result.stderr or result.stdout)[-2000:],
+            )
+        runs.append(timings)
+    warmRuns = runs[1:] or runs
+    return dict(
+        mode=mode,
+        status="done",
+        appPath=os.fspath(appPath),
+        bundleSize=getBundleSize(distDir),
+        firstRun=runs[0],
+        median={
+            name: statistics.median(run[name] for run in warmRuns)
+            for name in warmRuns[0]
+            if all(name in run for run in warmRuns)
+        },
+        runs=runs,
+    )
+
+
+def formatResult(result):
+    if result["status"] != "done":
+        return f"{result['mode']}: failed\n{result['error']}"
+
+    def formatTimings(timings):
+        return ", ".join(f"{name} {timings[name]:.2f}s" for name in timings)
+
+    return (
+        f"{result['mode']} ({result['bundleSize'] / 1024**2:.0f} MB):\n"
+        f"  first launch: {formatTimings(result['firstRun'])}\n"
+        f"  median after: {formatTimings(result['median'])}"
+    )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.launchtime",
+        description="Compare launch times of the app's bundle modes",
+    )
+    parser.add_argument(
+        "--modes",
+        default=",".join(bundleModes),
+        help=f"comma-separated bundle modes (default: {','.join(bundleModes)})",
+    )
+    parser.add_argument(
+        "--runs", type=int, default=5, help="launches per mode (default: 5)"
+    )
+    parser.add_argument(
+        "--build-dir",
+        default="build/launchtime",
+        help="where the builds go (default: build/launchtime)",
+    )
+    parser.add_argument(
+        "--no-build", action="store_true", help="measure the existing builds"
+    )
+    parser.add_argument(
+        "--dist",
+        help="measure the existing build in this dist folder, for a single mode",
+    )
+    parser.add_argument("--report", help="write the results as JSON to this path")
+    args = parser.parse_args(args)
+
+    modes = args.modes.split(",")
+    for mode in modes:
+        if mode not in bundleModes:
+            parser.error(f"unknown bundle mode: {mode}")
+    if args.dist and len(modes) != 1:
+        parser.error("--dist measures a single build: pass its mode with --modes")
+    if sys.platform == "darwin":
+        print("note: the macOS app is a folder whatever the bundle mode")
+
+    buildDir = (repoRoot / args.build_dir).resolve()
+    results = []
+    for mode in modes:
+        if args.dist:
+            distDir = pathlib.Path(args.dist).resolve()
+        elif args.no_build:
+            distDir = buildDir / mode / "dist"
+        else:
+            distDir = buildApp(mode, buildDir)
+        result = measureMode(mode, distDir, args.runs)
+        print(formatResult(result), flush=True)
+        results.append(result)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as reportFile:
+            json.dump(
+                dict(platform=sys.platform, results=results), reportFile, indent=2
+            )
+
+    return 1 if any(result["status"] != "done" for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
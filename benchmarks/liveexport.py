@@ -0,0 +1,236 @@
+"""Compare exporting from disk with exporting from the server that has the
+project loaded:
+
+    python -m benchmarks.liveexport --size large
+    python -m benchmarks.liveexport Sample1.designspace Sample2.glyphs
+
+A Fontra Pak server is started the way the app starts it, and each project
+is prefetched into it. Each export then runs in a fresh process, with the
+export cache off, once reading the project from disk, and once reading it
+from the server. Without source paths, a synthetic project is generated, see
+benchmarks/syntheticfonts.py.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import pathlib
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+
+from fontrapak.exportcache import exportCacheModeEnvironmentVariable
+
+from .syntheticfonts import ProjectParameters, createProject, presets
+
+readModes = ["disk", "live"]
+
+serverStartTimeout = 60
+
+
+def getProjectIdentifier(sourcePath):
+    # As the app's getProjectIdentifierParts() does it
+    sourcePath = pathlib.Path(sourcePath).resolve()
+    parts = list(sourcePath.parts)
+    if not sourcePath.drive:
+        del parts[0]
+    return "/".join(parts)
+
+
+def findFreePort(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def startServer(host):
+    from fontrapak.messagebus import MessageBus
+    from fontrapak.server import runFontraServer
+
+    port = findFreePort(host)
+    queue = multiprocessing.Queue()
+    serverQueue = multiprocessing.Queue()
+    serverProcess = multiprocessing.Process(
+        target=runFontraServer,
+        args=(host, port, queue, serverQueue),
+        daemon=True,
+    )
+    readyOptions = {}
+    ready = threading.Event()
+
+    def messageFromServer(action, path, options):
+        if action == "serverReady":
+            readyOptions.update(options)
+            ready.set()
+
+    serverBus = MessageBus(serverQueue, queue, messageFromServer)
+    serverBus.start()
+    serverProcess.start()
+    if not ready.wait(serverStartTimeout):
+        raise TimeoutError("the server didn't start")
+    serverURL = f"http://{host}:{port}"
+    return serverProcess, serverBus, serverURL, readyOptions["liveExportToken"]
+
+
+async def loadProject(liveSource):
+    # Waits until the server has the project open, as it would have once the
+    # user has been editing it
+    from fontrapak.liveexport import LiveServerBackend
+
+    backend = LiveServerBackend(**liveSource)
+    await backend.connect()
+    await backend.aclose()
+
+
+def exportSample(sourcePath, destPath, fileExtension, liveSource):
+    os.environ[exportCacheModeEnvironmentVariable] = "off"
+    from fontrapak.export import exportFontToPath
+
+    logFilePath = destPath.with_suffix(".log")
+    start = time.perf_counter()
+    try:
+        report = exportFontToPath(
+            sourcePath, destPath, fileExtension, logFilePath, liveSource=liveSource
+        )
+    except Exception as e:
+        return dict(status="failed", error=repr(e), logFile=os.fspath(logFilePath))
+    return dict(
+        status="done",
+        wallTime=time.perf_counter() - start,
+        peakRSS=report["peakRSS"],
+        stages={record["stage"]: record["elapsed"] for record in report["stages"]},
+    )
+
+
+def runBenchmark(sourcePaths, fileExtensions, outputDir, repeat=1, host="127.0.0.1"):
+    serverProcess, serverBus, serverURL, token = startServer(host)
+    results = []
+    try:
+        for sourcePath in sourcePaths:
+            projectIdentifier = getProjectIdentifier(sourcePath)
+            liveSource = dict(
+                serverURL=serverURL, token=token, projectIdentifier=projectIdentifier
+            )
+            serverBus.post(
+                "prefetchProject", projectIdentifier, {"dropTime": time.time()}
+            )
+            asyncio.run(loadProject(liveSource))
+            for fileExtension in fileExtensions:
+                for mode in readModes:
+                    destPath = outputDir / f"{sourcePath.stem}-{mode}.{fileExtension}"
+                    runs = []
+                    for _ in range(repeat):
+                        # A fresh process for each export, like the worker
+                        # pool's first job
+                        with ProcessPoolExecutor(max_workers=1) as executor:
+                            runs.append(
+                                executor.submit(
+                                    exportSample,
+                                    sourcePath,
+                                    destPath,
+                                    fileExtension,
+                                    liveSource if mode == "live" else None,
+                                ).result()
+                            )
+                    result = min(runs, key=lambda run: run.get("wallTime", sys.maxsize))
+                    result.update(
+                        source=os.fspath(sourcePath), format=fileExtension, mode=mode
+                    )
+                    print(formatResult(result), flush=True)
+                    results.append(result)
+    finally:
+        serverBus.close()
+        serverProcess.terminate()
+        serverProcess.join()
+    return results
+
+
+def formatResult(result):
+    name = (
+        f"{pathlib.Path(result['source']).name} "
+        f"[{result['format']}, {result['mode']}]"
+    )
+    if result["status"] != "done":
+        return f"{name}: failed, {result['error']} (see {result['logFile']})"
+    stages = ", ".join(
+        f"{stage} {elapsed:.2f}s" for stage, elapsed in result["stages"].items()
+    )
+    return f"{name}: {result['wallTime']:.2f}s ({stages})"
+
+
+def formatSpeedups(results):
+    lines = []
+    byKey = {
+        (result["source"], result["format"], result["mode"]): result
+        for result in results
+        if result["status"] == "done"
+    }
+    for (source, fileExtension, mode), result in byKey.items():
+        diskResult = byKey.get((source, fileExtension, "disk"))
+        if mode != "live" or diskResult is None:
+            continue
+        lines.append(
+            f"{pathlib.Path(source).name} [{fileExtension}]: live is "
+            f"{diskResult['wallTime'] / result['wallTime']:.2f}x as fast as disk"
+        )
+    return lines
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.liveexport",
+        description="Compare exporting from disk and from the running server",
+    )
+    parser.add_argument(
+        "sources", nargs="*", help="project paths (default: a synthetic project)"
+    )
+    parser.add_argument(
+        "--size",
+        choices=sorted(presets),
+        default="large",
+        help="the synthetic project's size (default: large)",
+    )
+    parser.add_argument(
+        "--formats",
+        default="fontra,ttf",
+        help="comma-separated formats to export to (default: fontra,ttf)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="report the best of this many runs"
+    )
+    parser.add_argument("--output-dir", help="keep the outputs in this folder")
+    parser.add_argument("--report", help="write the results as JSON to this path")
+    args = parser.parse_args(args)
+
+    fileExtensions = args.formats.split(",")
+
+    with tempfile.TemporaryDirectory() as tempDir:
+        outputDir = pathlib.Path(args.output_dir or tempDir).resolve()
+        outputDir.mkdir(parents=True, exist_ok=True)
+        if args.sources:
+            sourcePaths = [pathlib.Path(source).resolve() for source in args.sources]
+        else:
+            sourcePath = pathlib.Path(tempDir).resolve() / "Synthetic.fontra"
+            parameters = ProjectParameters(**asdict(presets[args.size]))
+            asyncio.run(createProject(sourcePath, parameters))
+            sourcePaths = [sourcePath]
+        results = runBenchmark(sourcePaths, fileExtensions, outputDir, args.repeat)
+
+    for line in formatSpeedups(results):
+        print(line)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as reportFile:
+            json.dump(dict(results=results), reportFile, indent=2)
+
+    return 1 if any(result["status"] != "done" for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+"""Time the paths Fontra Pak depends on against generated projects:
+
+    python -m benchmarks.syntheticfonts --size medium --output results.json
+    python -m benchmarks.syntheticfonts --size medium --compare results.json
+
+Projects are written through the same fontra backends createNewFont() uses:
+N glyphs × M sources, with the given number of contours per glyph, and a
+share of composite glyphs. We time creating the project, opening it,
+copyFont() to each format Fontra Pak can write, and exporting to TTF and
+OTF. With --compare, timings are checked against a stored baseline, and the
+exit status is 1 if any of them regressed by more than the tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+
+from fontrapak.filetypes import fileTypes
+
+
+@dataclass(kw_only=True)
+class ProjectParameters:
+    numGlyphs: int
+    numSources: int
+    numContours: int
+    compositeRatio: float
+
+
+presets = {
+    "small": ProjectParameters(
+        numGlyphs=100, numSources=2, numContours=2, compositeRatio=0.2
+    ),
+    "medium": ProjectParameters(
+        numGlyphs=1000, numSources=3, numContours=3, compositeRatio=0.3
+    ),
+    "large": ProjectParameters(
+        numGlyphs=5000, numSources=4, numContours=4, compositeRatio=0.3
+    ),
+}
+
+defaultTolerance = 0.2
+
+
+def makeContour(centerX, centerY, radius, numPoints):
+    # A closed polygon-ish contour of cubic curves, varied per glyph
+    points = []
+    for i in range(numPoints):
+        angle = 2 * math.pi * i / numPoints
+        nextAngle = 2 * math.pi * (i + 1) / numPoints
+        for a, pointType in [
+            (angle, None),
+            (angle + (nextAngle - angle) / 3, "cubic"),
+            (angle + 2 * (nextAngle - angle) / 3, "cubic"),
+        ]:
+            point = dict(
+                x=round(centerX + radius * math.cos(a)),
+                y=round(centerY + radius * math.sin(a)),
+            )
+            if pointType is not None:
+                point["type"] = pointType
+            points.append(point)
+    return dict(points=points, isClosed=True)
+
+
+def makeGlyph(glyphName, glyphIndex, numContours, sources, componentNames=None):
+    from fontra.core.classes import (
+        Component,
+        GlyphSource,
+        Layer,
+        StaticGlyph,
+        VariableGlyph,
+    )
+    from fontra.core.path import PackedPath
+
+    glyphSources = []
+    layers = {}
+    for sourceIndex, (sourceName, location) in enumerate(sources):
+        weight = 1 + sourceIndex
+        if componentNames:
+            glyph = StaticGlyph(
+                xAdvance=600,
+                components=[Component(name=name) for name in componentNames],
+            )
+            glyph.components[-1].transformation.translateY = 500
+        else:
+            contours = [
+                makeContour(
+                    100 + 100 * contourIndex,
+                    300,
+                    40 + 10 * weight + contourIndex,
+                    4 + (glyphIndex + contourIndex) % 5,
+                )
+                for contourIndex in range(numContours)
+            ]
+            glyph = StaticGlyph(
+                xAdvance=500 + 20 * weight,
+                path=PackedPath.fromUnpackedContours(contours),
+            )
+        layerName = f"{glyphName}-{sourceName}"
+        glyphSources.append(
+            GlyphSource(name=sourceName, location=location, layerName=layerName)
+        )
+        layers[layerName] = Layer(glyph=glyph)
+    return VariableGlyph(name=glyphName, sources=glyphSources, layers=layers)
+
+
+async def createProject(projectPath, parameters):
+    import secrets
+
+    from fontra.backends import newFileSystemBackend
+    from fontra.core.classes import Axes, FontAxis, FontSource, LineMetric
+
+    from fontrapak.app import defaultLineMetrics
+
+    axes = []
+    if parameters.numSources > 1:
+        axes.append(
+            FontAxis(
+                name="weight",
+                label="Weight",
+                tag="wght",
+                minValue=100,
+                defaultValue=100,
+                maxValue=900,
+            )
+        )
+
+    sources = []
+    fontSources = {}
+    for sourceIndex in range(parameters.numSources):
+        location = {}
+        if parameters.numSources > 1:
+            location["weight"] = 100 + 800 * sourceIndex / (parameters.numSources - 1)
+        sourceName = f"Source{sourceIndex}"
+        sources.append((sourceName, location))
+        fontSources[secrets.token_hex(4)] = FontSource(
+            name=sourceName,
+            location=location,
+            lineMetricsHorizontalLayout={
+                name: LineMetric(value=value, zone=zone)
+                for name, (value, zone) in defaultLineMetrics.items()
+            },
+        )
+
+    # The last glyphs are composites, each of two of the (at most 50) first
+    # glyphs, the second one raised like a mark
+    numComposites = round(parameters.numGlyphs * parameters.compositeRatio)
+    numBaseGlyphs = parameters.numGlyphs - numComposites
+    glyphNames = [f"glyph{i:05}" for i in range(parameters.numGlyphs)]
+    componentSourceNames = glyphNames[: min(numBaseGlyphs, 50)]
+
+    backend = newFileSystemBackend(projectPath)
+    try:
+        await backend.putAxes(Axes(axes=axes))
+        await backend.putSources(fontSources)
+        for glyphIndex, glyphName in enumerate(glyphNames):
+            componentNames = None
+            if glyphIndex >= numBaseGlyphs and componentSourceNames:
+                componentNames = [
+                    componentSourceNames[glyphIndex % len(componentSourceNames)],
+                    componentSourceNames[glyphIndex * 7 % len(componentSourceNames)],
+                ]
+            glyph = makeGlyph(
+                glyphName, glyphIndex, parameters.numContours, sources, componentNames
+            )
+            await backend.putGlyph(glyphName, glyph, [0xE000 + glyphIndex])
+    finally:
+        await backend.aclose()
+
+
+async def openProject(projectPath):
+    from fontra.backends import getFileSystemBackend
+
+    backend = getFileSystemBackend(projectPath)
+    try:
+        glyphMap = await backend.getGlyphMap()
+        await backend.getAxes()
+        await backend.getSources()
+    finally:
+        await backend.aclose()
+    return len(glyphMap)
+
+
+async def copyProject(sourcePath, destPath):
+    from fontra.backends import getFileSystemBackend, newFileSystemBackend
+    from fontra.backends.copy import copyFont
+
+    sourceBackend = getFileSystemBackend(sourcePath)
+    destBackend = newFileSystemBackend(destPath)
+    try:
+        await copyFont(sourceBackend, destBackend)
+    finally:
+        await sourceBackend.aclose()
+        await destBackend.aclose()
+
+
+async def exportProject(sourcePath, destPath, fileExtension):
+    from fontrapak.export import exportFontToPathAsync
+
+    await exportFontToPathAsync(sourcePath, destPath, fileExtension)
+
+
+def timeRun(function, *args, repeat=1):
+    # The best of `repeat` runs
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        asyncio.run(function(*args))
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def runBenchmarks(parameters, workDir, repeat=1, printFunc=print):
+    from fontrapak.exportcache import exportCacheModeEnvironmentVariable
+
+    # Exports must measure the compile, not the export cache
+    os.environ[exportCacheModeEnvironmentVariable] = "off"
+
+    workDir = pathlib.Path(workDir)
+    sourcePath = workDir / "Synthetic.fontra"
+    results = {}
+
+    def record(name, function, *args, repeat=repeat):
+        try:
+            results[name] = dict(
+                status="done", time=timeRun(function, *args, repeat=repeat)
+            )
+        except Exception as e:
+            results[name] = dict(status="failed", error=repr(e))
+        printFunc(formatResult(name, results[name]))
+
+    record("create", createProject, sourcePath, parameters, repeat=1)
+    if results["create"]["status"] != "done":
+        return results
+
+    record("open", openProject, sourcePath)
+    for _, fileExtension in fileTypes:
+        destDir = workDir / f"copy-{fileExtension}"
+        destDir.mkdir()
+        record(
+            f"copy:{fileExtension}",
+            copyProject,
+            sourcePath,
+            destDir / f"Synthetic.{fileExtension}",
+        )
+    for fileExtension in ["ttf", "otf"]:
+        record(
+            f"export:{fileExtension}",
+            exportProject,
+            sourcePath,
+            workDir / f"Synthetic.{fileExtension}",
+            fileExtension,
+        )
+    return results
+
+
+def formatResult(name, result):
+    if result["status"] != "done":
+        return f"{name:16} failed: {result['error']}"
+    return f"{name:16} {result['time']:8.3f}s"
+
+
+def compareResults(results, baselineResults, tolerance=defaultTolerance):
+    """Return (name, time, baselineTime) for each benchmark that got slower
+    than its baseline by more than `tolerance`, or that failed while the
+    baseline succeeded.
+    """
+    regressions = []
+    for name, baselineResult in baselineResults.items():
+        result = results.get(name)
+        if result is None or baselineResult["status"] != "done":
+            continue
+        if result["status"] != "done":
+            regressions.append((name, None, baselineResult["time"]))
+        elif result["time"] > baselineResult["time"] * (1 + tolerance):
+            regressions.append((name, result["time"], baselineResult["time"]))
+    return regressions
+
+
+def getEnvironmentInfo():
+    try:
+        from fontra import __version__ as fontraVersion
+    except ImportError:
+        fontraVersion = None
+    return dict(
+        python=platform.python_version(),
+        platform=platform.platform(),
+        machine=platform.machine(),
+        fontra=fontraVersion,
+    )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.syntheticfonts",
+        description="Benchmark create, open, copy and export on generated projects",
+    )
+    parser.add_argument(
+        "--size", choices=sorted(presets), default="small", help="(default: small)"
+    )
+    parser.add_argument("--glyphs", type=int, help="override the number of glyphs")
+    parser.add_argument("--sources", type=int, help="override the number of sources")
+    parser.add_argument(
+        "--contours", type=int, help="override the number of contours per glyph"
+    )
+    parser.add_argument(
+        "--composite-ratio", type=float, help="override the share of composites"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="report the best of this many runs"
+    )
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    parser.add_argument("--compare", help="baseline results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=defaultTolerance,
+        help=f"allowed slowdown against the baseline (default: {defaultTolerance})",
+    )
+    args = parser.parse_args(args)
+
+    parameters = ProjectParameters(**asdict(presets[args.size]))
+    for argName, fieldName in [
+        ("glyphs", "numGlyphs"),
+        ("sources", "numSources"),
+        ("contours", "numContours"),
+        ("composite_ratio", "compositeRatio"),
+    ]:
+        value = getattr(args, argName)
+        if value is not None:
+            setattr(parameters, fieldName, value)
+
+    with tempfile.TemporaryDirectory() as workDir:
+        results = runBenchmarks(parameters, workDir, repeat=args.repeat)
+
+    report = dict(
+        parameters=asdict(parameters),
+        environment=getEnvironmentInfo(),
+        results=results,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as outputFile:
+            json.dump(report, outputFile, indent=2)
+            outputFile.write("\n")
+
+    if not args.compare:
+        return 1 if any(r["status"] != "done" for r in results.values()) else 0
+
+    with open(args.compare, encoding="utf-8") as baselineFile:
+        baseline = json.load(baselineFile)
+    if baseline["parameters"] != report["parameters"]:
+        print("warning: the baseline was made with other project parameters")
+    regressions = compareResults(results, baseline["results"], args.tolerance)
+    for name, resultTime, baselineTime in regressions:
+        if resultTime is None:
+            print(f"REGRESSION {name}: failed, baseline {baselineTime:.3f}s")
+        else:
+            print(
+                f"REGRESSION {name}: {resultTime:.3f}s, baseline {baselineTime:.3f}s "
+                f"(+{(resultTime / baselineTime - 1) * 100:.0f}%)"
+            )
+    if not regressions:
+        print(f"no regressions against {args.compare}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
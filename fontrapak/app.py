@@ -0,0 +1,743 @@
+import html
+import json
+import multiprocessing
+import os
+import pathlib
+import secrets
+import signal
+import socket
+import sys
+import tempfile
+import time
+import webbrowser
+from urllib.error import URLError
+from urllib.parse import quote
+from urllib.request import urlopen
+
+from fontra import __version__ as fontraVersion
+from PyQt6.QtCore import QEvent, QPoint, QSettings, QSize, Qt, QTimer, QUrl
+from PyQt6.QtWidgets import (
+    QApplication,
+    QCheckBox,
+    QComboBox,
+    QDockWidget,
+    QFileDialog,
+    QGridLayout,
+    QHBoxLayout,
+    QLabel,
+    QMainWindow,
+    QMessageBox,
+    QPushButton,
+    QSizePolicy,
+    QWidget,
+)
+
+from .asyncloop import AsyncLoop, StallMonitor, callInMainThread
+from .compileengines import (
+    compileEngineEnvironmentVariable,
+    compileEngines,
+    defaultCompileEngineName,
+)
+from .exportlog import readLogTail
+from .exportworker import ExportJob, ExportWorkerPool
+from .filetypes import (
+    exportExtensionMapping,
+    exportFileTypesMapping,
+    fanOutFileExtensions,
+    fileTypesMapping,
+    getOptionalModules,
+)
+from .jobspanel import ExportJobsPanel
+from .messagebus import MessageBus
+from .profiling import getProfilePath, isProfilingEnabled, readSummary
+from .progress import formatDuration
+from .server import runFontraServer
+from .servermetrics import metricsViewerPath
+from .threads import callInNewThread
+
+# Only what's needed to show the main window is imported up front. The fontra
+# backends are imported when they are needed, the server only ever in the
+# server process.
+
+
+commonCSS = """
+border-radius: 20px;
+border-style: dashed;
+font-size: 18px;
+padding: 16px;
+"""
+
+neutralCSS = (
+    """
+background-color: rgba(255,255,255,128);
+border: 5px solid lightgray;
+"""
+    + commonCSS
+)
+
+droppingCSS = (
+    """
+background-color: rgba(255,255,255,64);
+border: 5px solid gray;
+"""
+    + commonCSS
+)
+
+mainText = """
+<span style="font-size: 40px;">Drop font files here</span>
+<br>
+<br>
+Your fonts will stay on your computer and will not be uploaded anywhere.
+<br>
+<br>
+Fontra Pak reads and writes .ufo, .designspace, .rcjk and .fontra
+<br>
+Additionally, it can read (not write) .ttf, .otf, .woff, .woff2, and (with some limitations)
+.glyphs and .glyphspackage
+"""
+
+
+class FontraApplication(QApplication):
+    def __init__(self, argv, server):
+        self.server = server
+        super().__init__(argv)
+
+    def event(self, event):
+        """Handle macOS FileOpen events."""
+        if event.type() == QEvent.Type.FileOpen:
+            self.server.openFile(event.file())
+        else:
+            return super().event(event)
+
+        return True
+
+
+def getFontPath(path, fileType, mapping):
+    extension = mapping[fileType]
+    if not path.endswith(extension):
+        path += extension
+
+    return path
+
+
+class FontraMainWidget(QMainWindow):
+    def __init__(self, server, exportPool, asyncLoop):
+        super().__init__()
+        self.server = server
+        self.exportPool = exportPool
+        self.asyncLoop = asyncLoop
+        self.setWindowTitle("Fontra Pak")
+        self.resize(720, 480)
+
+        self.settings = QSettings("xyz.fontra", "FontraPak")
+
+        self.resize(self.settings.value("size", QSize(720, 480)))
+        self.move(self.settings.value("pos", QPoint(50, 50)))
+
+        self.setAcceptDrops(True)
+
+        self.label = QLabel(mainText)
+        self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.label.setStyleSheet(neutralCSS)
+        self.label.setSizePolicy(
+            QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding
+        )
+        self.label.setWordWrap(True)
+
+        # Helpful: https://www.pythontutorial.net/pyqt/pyqt-qgridlayout/
+        layout = QGridLayout()
+
+        self.newFontButton = QPushButton("&New Font...", self)
+        self.newFontButton.setSizePolicy(
+            QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed
+        )
+        self.newFontButton.clicked.connect(self.newFont)
+
+        buttonDocs = QPushButton("Documentation", self)
+        buttonDocs.setToolTip("Open documentation website")
+        buttonDocs.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
+        buttonDocs.clicked.connect(lambda: webbrowser.open("https://docs.fontra.xyz"))
+
+        layout.addWidget(self.newFontButton, 0, 0, alignment=Qt.AlignmentFlag.AlignLeft)
+        layout.addWidget(buttonDocs, 0, 1, alignment=Qt.AlignmentFlag.AlignRight)
+
+        layout.addWidget(self.label, 1, 0, 1, 2)
+
+        self.fanOutCheckBox = QCheckBox(
+            "Export TTF and OTF with one font per discrete axis location", self
+        )
+        self.fanOutCheckBox.setToolTip(
+            "For example MyFont-Upright.ttf and MyFont-Italic.ttf, compiled in "
+            "parallel, instead of only the default location"
+        )
+        self.fanOutCheckBox.setChecked(self.settings.value("fanOut", False, type=bool))
+        self.fanOutCheckBox.toggled.connect(
+            lambda checked: self.settings.setValue("fanOut", checked)
+        )
+        layout.addWidget(self.fanOutCheckBox, 2, 0)
+
+        self.compileEngineComboBox = QComboBox(self)
+        for engine in compileEngines.values():
+            label = engine.name
+            if "otf" not in engine.fileExtensions:
+                label += " (TTF only)"
+            self.compileEngineComboBox.addItem(label, engine.name)
+        self.compileEngineComboBox.setToolTip(
+            "The compiler for TTF, OTF, WOFF and WOFF2 exports. OTF always uses "
+            f"{defaultCompileEngineName}."
+        )
+        self.compileEngineComboBox.setCurrentIndex(
+            max(
+                0,
+                self.compileEngineComboBox.findData(
+                    self.settings.value(
+                        "compileEngine",
+                        os.environ.get(
+                            compileEngineEnvironmentVariable, defaultCompileEngineName
+                        ).lower(),
+                    )
+                ),
+            )
+        )
+        self.compileEngineComboBox.currentIndexChanged.connect(
+            lambda index: self.settings.setValue(
+                "compileEngine", self.compileEngineComboBox.itemData(index)
+            )
+        )
+        compileEngineLayout = QHBoxLayout()
+        compileEngineLayout.addWidget(QLabel("Compile with:"))
+        compileEngineLayout.addWidget(self.compileEngineComboBox)
+        layout.addLayout(
+            compileEngineLayout, 2, 1, alignment=Qt.AlignmentFlag.AlignRight
+        )
+
+        self.profilingCheckBox = QCheckBox("Profile exports and the server", self)
+        self.profilingCheckBox.setToolTip(
+            "Write a profile of each export, and of the server when Fontra Pak "
+            "quits. Profiling the server takes effect after a restart."
+        )
+        self.profilingCheckBox.setChecked(
+            self.settings.value("profiling", False, type=bool)
+        )
+        self.profilingCheckBox.toggled.connect(
+            lambda checked: self.settings.setValue("profiling", checked)
+        )
+        layout.addWidget(self.profilingCheckBox, 3, 0)
+
+        buttonMetrics = QPushButton("Server Metrics", self)
+        buttonMetrics.setToolTip("Show how long the editor's requests take")
+        buttonMetrics.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
+        buttonMetrics.clicked.connect(
+            lambda: webbrowser.open(
+                f"http://{server.host}:{server.port}{metricsViewerPath}"
+            )
+        )
+        layout.addWidget(buttonMetrics, 3, 1, alignment=Qt.AlignmentFlag.AlignRight)
+
+        layout.addWidget(QLabel(f"Fontra version {fontraVersion}"), 4, 0)
+
+        if sys.platform == "darwin":
+            downloadLink = "https://fontra-download.black-foundry.com/FontraPak.dmg"
+        elif sys.platform == "win32":
+            downloadLink = "https://fontra-download.black-foundry.com/FontraPak.zip"
+        else:
+            # We don't provide downloads for other platforms.
+            downloadLink = None
+
+        if downloadLink is not None:
+            buttonDownload = QPushButton("Download latest Fontra Pak", self)
+            buttonDownload.setSizePolicy(
+                QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed
+            )
+            buttonDownload.clicked.connect(lambda: webbrowser.open(downloadLink))
+            layout.addWidget(
+                buttonDownload, 4, 1, alignment=Qt.AlignmentFlag.AlignRight
+            )
+
+        widget = QWidget()
+        widget.setLayout(layout)
+        self.setCentralWidget(widget)
+
+        self.jobsPanel = ExportJobsPanel(exportPool, self.showExportDetails, self)
+        self.jobsDock = QDockWidget("Exports", self)
+        self.jobsDock.setObjectName("exportsDock")
+        self.jobsDock.setWidget(self.jobsPanel)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.jobsDock)
+        self.jobsDock.hide()
+
+        self.serverStatusLabel = QLabel("Starting server…")
+        self.statusBar().addPermanentWidget(self.serverStatusLabel)
+
+        self.show()
+
+    def closeEvent(self, event):
+        self.settings.setValue("size", self.size())
+        self.settings.setValue("pos", self.pos())
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.accept()
+            self.label.setStyleSheet(droppingCSS)
+        else:
+            event.ignore()
+
+    def dragLeaveEvent(self, event):
+        self.label.setStyleSheet("background-color: lightgray;")
+        self.label.setStyleSheet(neutralCSS)
+
+    def dropEvent(self, event):
+        self.label.setStyleSheet(neutralCSS)
+        files = [u.toLocalFile() for u in event.mimeData().urls()]
+        for path in files:
+            self.server.openFile(path)
+        event.acceptProposedAction()
+
+    @property
+    def activeFolder(self):
+        activeFolder = self.settings.value("activeFolder", os.path.expanduser("~"))
+        if not os.path.isdir(activeFolder):
+            activeFolder = os.path.expanduser("~")
+        return activeFolder
+
+    def newFont(self):
+        fontPath, fileType = QFileDialog.getSaveFileName(
+            self,
+            "New Font...",
+            os.path.join(self.activeFolder, "Untitled"),
+            ";;".join(fileTypesMapping),
+        )
+
+        if not fontPath:
+            # User cancelled
+            return
+
+        fontPath = getFontPath(fontPath, fileType, fileTypesMapping)
+
+        self.settings.setValue("activeFolder", os.path.dirname(fontPath))
+
+        # Create a new empty project on disk, without blocking the window on a
+        # slow file system
+        self.newFontButton.setEnabled(False)
+        self.statusBar().showMessage(f"Creating {os.path.basename(fontPath)}…")
+        self.asyncLoop.submit(
+            createNewFont(fontPath),
+            onDone=lambda result: self.newFontCreated(fontPath),
+            onError=lambda error: self.newFontCreated(fontPath, error),
+        )
+
+    def newFontCreated(self, fontPath, error=None):
+        self.newFontButton.setEnabled(True)
+        self.statusBar().clearMessage()
+        if error is not None:
+            showMessageDialog("The new font could not be saved", repr(error))
+            return
+
+        if os.path.exists(fontPath):
+            self.server.openFile(fontPath)
+
+    def messageFromServer(self, action, path, options):
+        handler = getattr(self, action, None)
+        if handler is None:
+            raise ValueError(f"unknown action: {action}")
+        return handler(path, options)
+
+    def serverReady(self, path, options):
+        self.server.setReady(options["readyTime"], options.get("liveExportToken"))
+        self.serverStatusLabel.setText(
+            f"Server ready ({self.server.startupLatency:.2f}s)"
+        )
+
+    def exportAs(self, path, options):
+        sourcePath = pathlib.Path(path)
+        fileExtension = options["format"]
+
+        wFlags = self.windowFlags()
+        self.setWindowFlags(wFlags | Qt.WindowType.WindowStaysOnTopHint)
+        self.show()
+        self.setWindowFlags(wFlags)
+        self.show()
+
+        destPath, fileType = QFileDialog.getSaveFileName(
+            self,
+            "Export font...",
+            os.path.join(self.activeFolder, sourcePath.stem),
+            exportExtensionMapping["." + fileExtension],
+        )
+
+        if not destPath:
+            # User cancelled
+            return
+
+        destPath = getFontPath(destPath, fileType, exportFileTypesMapping)
+
+        self.settings.setValue("activeFolder", os.path.dirname(destPath))
+
+        destPath = pathlib.Path(destPath)
+
+        if sourcePath == destPath:
+            showMessageDialog(
+                "Cannot export font",
+                "The destination file cannot be the same as the source file",
+            )
+            return
+
+        # The server has the project loaded: let the export read it from there
+        self.doExportAs(
+            sourcePath, destPath, fileExtension, self.server.getLiveSource(path)
+        )
+
+    def doExportAs(self, sourcePath, destPath, fileExtension, liveSource=None):
+        profilePath = (
+            getProfilePath("export")
+            if self.profilingCheckBox.isChecked() or isProfilingEnabled("export")
+            else None
+        )
+        exportJob = ExportJob(
+            sourcePath=sourcePath,
+            destPath=destPath,
+            fileExtension=fileExtension,
+            logFilePath=tempfile.NamedTemporaryFile().name,
+            compileEngine=self.compileEngineComboBox.currentData(),
+            profilePath=profilePath,
+            liveSource=liveSource,
+            fanOut=(
+                self.fanOutCheckBox.isChecked()
+                and fileExtension in fanOutFileExtensions
+            ),
+            onFinished=lambda exportJob: callInMainThread(
+                self.exportFinished, exportJob
+            ),
+            onProgress=lambda exportJob, event: callInMainThread(
+                self.jobsPanel.jobProgress, exportJob, event
+            ),
+        )
+        # An identical queued export may be returned instead
+        exportJob = self.exportPool.submit(exportJob)
+        self.jobsPanel.addJob(exportJob)
+        self.jobsDock.show()
+        self.jobsDock.raise_()
+
+    def exportFinished(self, exportJob):
+        self.jobsPanel.jobFinished(exportJob)
+        self.statusBar().showMessage(
+            f"Export of “{os.path.basename(exportJob.destPath)}” {exportJob.status}: "
+            f"startup {exportJob.startupTime:.2f}s, "
+            f"work {exportJob.workTime:.2f}s"
+        )
+
+    def showExportDetails(self, exportJob):
+        # The profile is missing if the export process crashed
+        profilePath = exportJob.profilePath
+        if profilePath is not None and not profilePath.exists():
+            profilePath = None
+
+        if exportJob.succeeded:
+            showMessageDialog(
+                "The font was exported",
+                f"Export took {formatDuration(exportJob.workTime)}.",
+                icon=QMessageBox.Icon.Information,
+                profilePath=profilePath,
+            )
+            return
+
+        logData = readLogTail(exportJob.logFilePath)
+        logLines = logData.splitlines()
+        if exportJob.status == "crashed":
+            infoText = (
+                "The export process stopped unexpectedly "
+                f"(exit code {exportJob.exitCode})"
+            )
+        elif exportJob.status == "cancelled":
+            infoText = "The export was cancelled."
+        else:
+            infoText = logLines[-1] if logLines else "The reason is not clear."
+        showMessageDialog(
+            "The font could not be exported",
+            infoText,
+            detailedText=logData,
+            profilePath=profilePath,
+        )
+
+
+defaultLineMetrics = {
+    "ascender": (750, 16),
+    "descender": (-250, -16),
+    "xHeight": (500, 16),
+    "capHeight": (750, 16),
+    "baseline": (0, -16),
+}
+
+
+PROJECT_GLYPH_SETS_CUSTOM_DATA_KEY = "fontra.projectGlyphSets"
+
+
+async def createNewFont(fontPath):
+    # Create a new empty project on disk
+    from fontra.backends import newFileSystemBackend
+    from fontra.core.classes import FontSource, LineMetric
+
+    defaultSource = FontSource(
+        name="Regular",
+        lineMetricsHorizontalLayout={
+            name: LineMetric(value=value, zone=zone)
+            for name, (value, zone) in defaultLineMetrics.items()
+        },
+    )
+
+    customData = {
+        PROJECT_GLYPH_SETS_CUSTOM_DATA_KEY: [
+            {
+                "name": "GF Latin Kernel",
+                "url": (
+                    "https://raw.githubusercontent.com/googlefonts/glyphsets/"
+                    + "main/data/results/txt/nice-names/GF_Latin_Kernel.txt"
+                ),
+                "dataFormat": "glyph-names",
+                "commentChars": "#",
+            },
+        ]
+    }
+
+    destBackend = newFileSystemBackend(fontPath)
+    await destBackend.putSources({secrets.token_hex(4): defaultSource})
+    await destBackend.putCustomData(customData)
+    await destBackend.aclose()
+
+
+def getProjectIdentifierParts(path):
+    path = pathlib.Path(path).resolve()
+    assert path.is_absolute()
+    parts = list(path.parts)
+    if not path.drive:
+        assert parts[0] == "/"
+        del parts[0]
+    return parts
+
+
+class ServerState:
+    """The GUI's view of the server process. Files opened before the server
+    reported that it is ready are queued, and opened in the browser once it is.
+    """
+
+    def __init__(self, host, port, serverBus):
+        self.host = host
+        self.port = port
+        self.serverBus = serverBus
+        self.startTime = time.time()
+        self.readyTime = None
+        self.liveExportToken = None
+        self.pendingPaths = []
+        self.readyCallbacks = []
+        self.fileOpenedCallbacks = []
+
+    @property
+    def isReady(self):
+        return self.readyTime is not None
+
+    @property
+    def startupLatency(self):
+        return self.readyTime - self.startTime if self.isReady else None
+
+    def openFile(self, path):
+        for callback in self.fileOpenedCallbacks:
+            callback(path)
+        # The server picks this up as soon as it runs, even before it is ready
+        self.serverBus.post(
+            "prefetchProject",
+            "/".join(getProjectIdentifierParts(path)),
+            {"dropTime": time.time()},
+        )
+        if self.isReady:
+            openFile(path, self.port)
+        else:
+            self.pendingPaths.append(path)
+
+    def setReady(self, readyTime, liveExportToken=None):
+        self.readyTime = readyTime
+        self.liveExportToken = liveExportToken
+        pendingPaths, self.pendingPaths = self.pendingPaths, []
+        for path in pendingPaths:
+            openFile(path, self.port)
+        for callback in self.readyCallbacks:
+            callback()
+
+    def getLiveSource(self, projectIdentifier):
+        # For ExportJob.liveSource
+        if self.liveExportToken is None:
+            return None
+        return dict(
+            serverURL=f"http://{self.host}:{self.port}",
+            token=self.liveExportToken,
+            projectIdentifier=projectIdentifier,
+        )
+
+
+def openFile(path, port):
+    parts = getProjectIdentifierParts(path)
+    path = "/".join(quote(part, safe="") for part in parts)
+
+    webbrowser.open(f"http://localhost:{port}/fontoverview.html?project={path}")
+
+
+def showMessageDialog(
+    message,
+    infoText,
+    detailedText=None,
+    icon=QMessageBox.Icon.Warning,
+    profilePath=None,
+):
+    dialog = QMessageBox()
+    if icon is not None:
+        dialog.setIcon(icon)
+    dialog.setText(message)
+    if profilePath is not None:
+        # Link to the profile, and put its top functions first in the details
+        profileURL = QUrl.fromLocalFile(os.fspath(profilePath)).toString()
+        infoText = (
+            f"{html.escape(infoText)}<br><br>"
+            f'Profile: <a href="{profileURL}">{html.escape(profilePath.name)}</a>'
+        )
+        dialog.setTextFormat(Qt.TextFormat.RichText)
+        summary = readSummary(profilePath)
+        if summary:
+            detailedText = "\n\n".join(filter(None, [summary, detailedText]))
+    dialog.setInformativeText(infoText)
+    if detailedText is not None:
+        dialog.setStyleSheet("QTextEdit { font-weight: regular; }")
+        dialog.setDetailedText(detailedText)
+    dialog.exec()
+
+
+def findFreeTCPPort(startPort=8000, host="localhost"):
+    # Same as fontra.core.server.findFreeTCPPort(), which would make us import
+    # the server in the GUI process
+    port = startPort
+    while True:
+        tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            tcp.bind((host, port))
+        except OSError:
+            port += 1
+        else:
+            return port
+        finally:
+            tcp.close()
+
+
+def measureFirstPage(host, port, startupTimes):
+    # Time loading the font overview page the way the browser would
+    try:
+        with urlopen(f"http://{host}:{port}/fontoverview.html", timeout=10) as page:
+            page.read()
+    except (URLError, OSError):
+        return
+    startupTimes["firstPage"] = time.time()
+
+
+def main(processStartTime=None, paths=(), singleInstance=None):
+    startupTimes = {"processStart": processStartTime or time.time()}
+
+    queue = multiprocessing.Queue()
+    serverQueue = multiprocessing.Queue()
+    host = "localhost"
+    port = findFreeTCPPort(host=host)
+    # Messages from the server are handled in the main thread, once the main
+    # window is there to handle them
+    serverBus = MessageBus(
+        serverQueue,
+        queue,
+        lambda action, path, options: mainWindow.messageFromServer(
+            action, path, options
+        ),
+        deliver=callInMainThread,
+    )
+    server = ServerState(host, port, serverBus)
+    profileServer = QSettings("xyz.fontra", "FontraPak").value(
+        "profiling", False, type=bool
+    ) or isProfilingEnabled("server")
+    serverProfilePath = getProfilePath("server") if profileServer else None
+    serverProcess = multiprocessing.Process(
+        target=runFontraServer,
+        args=(host, port, queue, serverQueue, serverProfilePath),
+    )
+    serverProcess.start()
+
+    app = FontraApplication(sys.argv, server)
+
+    exportPool = ExportWorkerPool()
+    asyncLoop = AsyncLoop()
+    asyncLoop.start()
+
+    def cleanup():
+        serverBus.close()
+        os.kill(serverProcess.pid, signal.SIGINT)
+        exportPool.shutdown()
+        asyncLoop.stop()
+        mainWindow.jobsPanel.clearAll()
+        if singleInstance is not None:
+            singleInstance.release()
+
+    app.aboutToQuit.connect(cleanup)
+
+    mainWindow = FontraMainWidget(server, exportPool, asyncLoop)
+    # Exports of this file will need its backend: have it ready by then
+    server.fileOpenedCallbacks.append(
+        lambda path: exportPool.preloadModules(getOptionalModules(path))
+    )
+    if serverProfilePath is not None:
+        mainWindow.statusBar().showMessage(
+            f"Profiling the server: written to {serverProfilePath} on quit"
+        )
+
+    serverBus.start()
+
+    def openForwardedPaths(paths):
+        for path in paths:
+            server.openFile(path)
+        mainWindow.raise_()
+        mainWindow.activateWindow()
+
+    if singleInstance is not None:
+        singleInstance.listen(openForwardedPaths)
+
+    for path in paths:
+        server.openFile(path)
+
+    mainWindow.show()
+    # Fires once the event loop runs, that is, once the window is painted
+    QTimer.singleShot(0, lambda: startupTimes.setdefault("windowShown", time.time()))
+
+    exportPool.start()
+
+    if "test-startup" in sys.argv:
+        # How long the window stops responding while the server comes up
+        stallMonitor = StallMonitor()
+        stallMonitor.start()
+
+        def delayedQuit():
+            if "quit" in startupTimes:
+                return
+            startupTimes["quit"] = time.time()
+            stallMonitor.stop()
+            startupTimes["guiStalls"] = stallMonitor.getStats()
+            startupTimes["messageLatency"] = {
+                action: stats["maxTime"]
+                for action, stats in serverBus.getStats().items()
+            }
+            print("startup-timing", json.dumps(startupTimes))
+            print("test-startup")
+            app.quit()
+
+        def measure():
+            measureFirstPage(host, port, startupTimes)
+            callInMainThread(delayedQuit)
+
+        def serverReady():
+            startupTimes["serverReady"] = server.readyTime
+            callInNewThread(measure, daemon=True)
+
+        server.readyCallbacks.append(serverReady)
+        # Don't wait forever for a server that doesn't come up
+        QTimer.singleShot(60000, delayedQuit)
+
+    sys.exit(app.exec())
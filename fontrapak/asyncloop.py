@@ -0,0 +1,150 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from .threads import callInNewThread
+
+logger = logging.getLogger(__name__)
+
+
+class CallInMainThreadScheduler(QObject):
+    # The call travels with the signal: emitted from another thread, it is
+    # queued and delivered by the Qt event loop
+    signal = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.signal.connect(self.receive)
+
+    def receive(self, call):
+        assert threading.current_thread() is threading.main_thread()
+        function, args, kwargs = call
+        function(*args, **kwargs)
+
+    def schedule(self, function, args, kwargs):
+        self.signal.emit((function, args, kwargs))
+
+
+_callInMainThreadScheduler = CallInMainThreadScheduler()
+
+
+def callInMainThread(function, *args, **kwargs):
+    _callInMainThreadScheduler.schedule(function, args, kwargs)
+
+
+class AsyncLoop:
+    """The GUI's asyncio event loop. It runs in a thread of its own, so the
+    Qt event loop keeps painting while coroutines wait for I/O. Results and
+    errors are passed to callbacks in the main thread.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = callInNewThread(self._run, daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        finally:
+            self.loop.close()
+
+    def submit(self, coro, onDone=None, onError=None):
+        """Run `coro` in the loop. `onDone` is called with its result, or
+        `onError` with its exception, in the main thread. Returns a
+        concurrent.futures.Future.
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+        def done(future):
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is None:
+                if onDone is not None:
+                    callInMainThread(onDone, future.result())
+            elif onError is not None:
+                callInMainThread(onError, error)
+            else:
+                logger.error("error in the GUI event loop", exc_info=error)
+
+        future.add_done_callback(done)
+        return future
+
+    def stop(self, timeout=2):
+        if self.loop is None or self.loop.is_closed():
+            return
+
+        async def cancelTasks():
+            tasks = [
+                task
+                for task in asyncio.all_tasks()
+                if task is not asyncio.current_task()
+            ]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(cancelTasks(), self.loop).result(timeout)
+        # Not the builtin TimeoutError before Python 3.11
+        except concurrent.futures.TimeoutError:
+            logger.warning("GUI event loop tasks didn't stop in time")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+
+
+class StallMonitor(QObject):
+    """Measures how long the Qt event loop goes without handling events: a
+    timer due every `interval` seconds notes how late it fires. Delays over
+    `threshold` count as stalls.
+    """
+
+    def __init__(self, interval=0.01, threshold=0.05, parent=None):
+        super().__init__(parent)
+        self.interval = interval
+        self.threshold = threshold
+        self.timer = QTimer(self)
+        self.timer.setInterval(round(interval * 1000))
+        self.timer.timeout.connect(self.tick)
+        self.reset()
+
+    def reset(self):
+        self.lastTick = time.perf_counter()
+        self.maxStall = 0.0
+        self.totalStall = 0.0
+        self.numStalls = 0
+
+    def start(self):
+        self.reset()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        # A stall may still be going on
+        self.tick()
+
+    def tick(self):
+        now = time.perf_counter()
+        stall = now - self.lastTick - self.interval
+        self.lastTick = now
+        if stall > self.threshold:
+            self.numStalls += 1
+            self.totalStall += stall
+            self.maxStall = max(self.maxStall, stall)
+
+    def getStats(self):
+        return dict(
+            maxStall=self.maxStall,
+            totalStall=self.totalStall,
+            numStalls=self.numStalls,
+        )
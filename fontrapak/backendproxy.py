@@ -0,0 +1,59 @@
+# Runtime-checkable protocols such as fontra's ReadableFontBackend look up
+# methods with inspect.getattr_static() as of Python 3.12, so forwarding via
+# __getattr__ alone would make our wrappers fail isinstance() checks.
+
+readMethodNames = [
+    "aclose",
+    "getGlyphMap",
+    "getGlyph",
+    "getAxes",
+    "getSources",
+    "getUnitsPerEm",
+    "getFontInfo",
+    "getKerning",
+    "getFeatures",
+    "getCustomData",
+    "getBackgroundImage",
+]
+
+writeMethodNames = [
+    "putGlyph",
+    "deleteGlyph",
+    "putAxes",
+    "putSources",
+    "putUnitsPerEm",
+    "putFontInfo",
+    "putKerning",
+    "putFeatures",
+    "putCustomData",
+    "putBackgroundImage",
+]
+
+
+def _forwardingMethod(methodName):
+    def method(self, *args, **kwargs):
+        return getattr(self.backend, methodName)(*args, **kwargs)
+
+    method.__name__ = methodName
+    return method
+
+
+class ReadableBackendProxy:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __getattr__(self, attrName):
+        if attrName == "backend":
+            raise AttributeError(attrName)
+        return getattr(self.backend, attrName)
+
+
+class BackendProxy(ReadableBackendProxy):
+    pass
+
+
+for _methodName in readMethodNames:
+    setattr(ReadableBackendProxy, _methodName, _forwardingMethod(_methodName))
+
+for _methodName in writeMethodNames:
+    setattr(BackendProxy, _methodName, _forwardingMethod(_methodName))
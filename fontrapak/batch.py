@@ -0,0 +1,435 @@
+import argparse
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, replace
+
+from .compileengines import compileEngines
+from .export import exportFontToPath, exportFontToPaths
+from .exportlog import readLogTail
+from .fanout import exportDiscreteInstances
+from .filetypes import binaryFileExtensions, fanOutFileExtensions
+from .memorylimit import getMemoryLimit, getSharedMemoryLimit
+from .progress import getTimingReportPath
+from .snapshot import getSourcePaths
+from .webfonts import getSubsetPath, parseSubsets
+
+batchFileExtensions = binaryFileExtensions + ["designspace", "fontra", "rcjk", "ufo"]
+
+
+def parseFormat(format):
+    # A single format, or a comma-separated list of binary formats, which are
+    # then exported in one job
+    fileExtensions = format.split(",")
+    for fileExtension in fileExtensions:
+        if fileExtension not in batchFileExtensions:
+            raise ValueError(f"unknown format: {fileExtension}")
+    if len(fileExtensions) > 1 and not set(fileExtensions) <= set(binaryFileExtensions):
+        raise ValueError(f"only binary formats can be combined: {format}")
+    return format
+
+
+@dataclass(kw_only=True)
+class BatchJob:
+    sourcePath: pathlib.Path
+    destPath: pathlib.Path
+    fileExtension: str
+    fanOut: bool = False
+    subsets: dict | None = None
+    compileEngine: str | None = None
+    memoryLimit: str | int | None = None
+
+    @property
+    def fileExtensions(self):
+        return self.fileExtension.split(",")
+
+    def getDestPaths(self):
+        return {
+            fileExtension: self.destPath.with_suffix("." + fileExtension)
+            for fileExtension in self.fileExtensions
+        }
+
+
+@dataclass(kw_only=True)
+class BatchResult:
+    job: BatchJob
+    status: str
+    elapsed: float = 0.0
+    numGlyphs: int = 0
+    logText: str = ""
+    note: str = ""
+
+    @property
+    def glyphsPerSecond(self):
+        return self.numGlyphs / self.elapsed if self.elapsed else 0.0
+
+
+def runBatchJob(job, logDir):
+    fd, logFilePath = tempfile.mkstemp(suffix=".log", dir=logDir)
+    os.close(fd)
+    start = time.perf_counter()
+    try:
+        if job.fanOut and job.fileExtension in fanOutFileExtensions:
+            report = exportDiscreteInstances(
+                job.sourcePath,
+                job.destPath,
+                job.fileExtension,
+                logFilePath,
+                compileEngine=job.compileEngine,
+                memoryLimit=job.memoryLimit,
+            )
+        elif len(job.fileExtensions) > 1 or job.subsets:
+            report = exportFontToPaths(
+                job.sourcePath,
+                job.getDestPaths(),
+                logFilePath,
+                subsets=job.subsets,
+                compileEngine=job.compileEngine,
+                memoryLimit=job.memoryLimit,
+            )
+        else:
+            report = exportFontToPath(
+                job.sourcePath,
+                job.destPath,
+                job.fileExtension,
+                logFilePath,
+                compileEngine=job.compileEngine,
+                memoryLimit=job.memoryLimit,
+            )
+        status = "done"
+    except Exception:
+        report = None
+        status = "failed"
+        with open(logFilePath, "a", encoding="utf-8") as logFile:
+            traceback.print_exc(file=logFile)
+    elapsed = time.perf_counter() - start
+
+    logText = readLogTail(logFilePath) if status != "done" else ""
+
+    note = ""
+    if report is None:
+        numGlyphs = 0
+    elif "instances" in report:
+        numGlyphs = sum(instance["glyphs"] for instance in report["instances"])
+        note = (
+            f"{len(report['instances'])} instances, {report['serialTime']:.2f}s "
+            f"serial, {report['speedup']:.1f}x"
+        )
+    else:
+        numGlyphs = max((stage["glyphs"] for stage in report["stages"]), default=0)
+    return BatchResult(
+        job=job,
+        status=status,
+        elapsed=elapsed,
+        numGlyphs=numGlyphs,
+        logText=logText,
+        note=note,
+    )
+
+
+def getModificationTime(path):
+    path = pathlib.Path(path)
+    if not path.exists():
+        return None
+    if not path.is_dir():
+        return path.stat().st_mtime
+    return max(
+        [path.stat().st_mtime]
+        + [
+            os.stat(os.path.join(dirPath, fileName)).st_mtime
+            for dirPath, _, fileNames in os.walk(path)
+            for fileName in fileNames
+        ]
+    )
+
+
+def getSourceModificationTime(sourcePath):
+    # None if the source, or one of a designspace's sources, is missing
+    if not pathlib.Path(sourcePath).exists():
+        return None
+    modTimes = [getModificationTime(path) for path in getSourcePaths(sourcePath)]
+    return None if None in modTimes else max(modTimes)
+
+
+def getOutputPaths(job):
+    # Every format and subset the job writes. Fan-out writes a font per
+    # discrete axis location instead, as listed in its timing report, or only
+    # the destination if there are no discrete axes. Returns None if not all
+    # outputs were written.
+    if not (job.fanOut and job.fileExtension in fanOutFileExtensions):
+        destPaths = list(job.getDestPaths().values())
+        return destPaths + [
+            getSubsetPath(destPath, subsetName)
+            for subsetName in job.subsets or {}
+            for destPath in destPaths
+        ]
+    try:
+        with open(getTimingReportPath(job.destPath), encoding="utf-8") as reportFile:
+            report = json.load(reportFile)
+    except (OSError, ValueError):
+        return None
+    instances = report.get("instances")
+    if instances is None:
+        return [job.destPath]
+    if any(instance["status"] != "done" for instance in instances):
+        return None
+    return [pathlib.Path(instance["destination"]) for instance in instances]
+
+
+def isUpToDate(job):
+    outputPaths = getOutputPaths(job)
+    if not outputPaths:
+        return False
+    outputModTimes = [getModificationTime(path) for path in outputPaths]
+    sourceModTime = getSourceModificationTime(job.sourcePath)
+    if None in outputModTimes or sourceModTime is None:
+        return False
+    return min(outputModTimes) >= sourceModTime
+
+
+def makeJob(sourcePath, fileExtension, outputDir=None, destPath=None):
+    fileExtension = parseFormat(fileExtension)
+    sourcePath = pathlib.Path(sourcePath).resolve()
+    if destPath is None:
+        destDir = pathlib.Path(outputDir) if outputDir else sourcePath.parent
+        destPath = destDir / f"{sourcePath.stem}.{fileExtension.split(',')[0]}"
+    destPath = pathlib.Path(destPath).resolve()
+    if destPath == sourcePath:
+        raise ValueError(f"destination is the same as the source: {sourcePath}")
+    return BatchJob(
+        sourcePath=sourcePath, destPath=destPath, fileExtension=fileExtension
+    )
+
+
+def readManifest(manifestPath, defaultFileExtension, outputDir):
+    # A JSON list of {"source": ..., "destination": ..., "format": ...} objects,
+    # where only "source" is required. Relative paths are relative to the
+    # manifest file.
+    manifestPath = pathlib.Path(manifestPath)
+    baseDir = manifestPath.parent
+    with open(manifestPath, encoding="utf-8") as manifestFile:
+        entries = json.load(manifestFile)
+
+    jobs = []
+    for entry in entries:
+        destPath = entry.get("destination")
+        fileExtension = entry.get("format")
+        if fileExtension is None:
+            fileExtension = (
+                pathlib.Path(destPath).suffix[1:] if destPath else defaultFileExtension
+            )
+        jobs.append(
+            makeJob(
+                baseDir / entry["source"],
+                fileExtension,
+                outputDir=outputDir,
+                destPath=baseDir / destPath if destPath else None,
+            )
+        )
+    return jobs
+
+
+def formatResult(result):
+    job = result.job
+    status = f"{result.status:8}"
+    if result.status == "skipped":
+        timing = " " * 38
+    else:
+        timing = (
+            f"{result.elapsed:8.2f}s {result.numGlyphs:8} glyphs "
+            f"{result.glyphsPerSecond:8.1f}/s"
+        )
+    line = f"{status}{timing}  {job.sourcePath.name} -> {job.destPath}"
+    return f"{line} ({result.note})" if result.note else line
+
+
+def formatSummary(results, wallTime):
+    counts = {
+        status: sum(result.status == status for result in results)
+        for status in ["done", "skipped", "failed"]
+    }
+    workTime = sum(result.elapsed for result in results)
+    numGlyphs = sum(result.numGlyphs for result in results)
+    return (
+        f"{counts['done']} done, {counts['skipped']} skipped, "
+        f"{counts['failed']} failed in {wallTime:.2f}s wall time "
+        f"({workTime:.2f}s of work, {workTime / wallTime if wallTime else 0:.1f}x); "
+        f"{numGlyphs} glyphs, {numGlyphs / wallTime if wallTime else 0:.1f} glyphs/s"
+    )
+
+
+def runBatch(jobs, *, numWorkers=None, force=False, printFunc=print):
+    start = time.perf_counter()
+    results = []
+    pendingJobs = []
+    for job in jobs:
+        if not job.sourcePath.exists():
+            # Whatever outputs are left, they are not up to date with anything
+            result = BatchResult(
+                job=job, status="failed", logText=f"source not found: {job.sourcePath}"
+            )
+            results.append(result)
+            printFunc(formatResult(result))
+            printFunc(result.logText)
+        elif not force and isUpToDate(job):
+            result = BatchResult(job=job, status="skipped")
+            results.append(result)
+            printFunc(formatResult(result))
+        else:
+            pendingJobs.append(job)
+
+    if pendingJobs:
+        numWorkers = min(numWorkers or os.cpu_count() or 1, len(pendingJobs))
+        with (
+            tempfile.TemporaryDirectory() as logDir,
+            ProcessPoolExecutor(max_workers=numWorkers) as executor,
+        ):
+            # The jobs running side by side share the memory limit
+            futures = [
+                executor.submit(
+                    runBatchJob,
+                    replace(
+                        job,
+                        memoryLimit=getSharedMemoryLimit(job.memoryLimit, numWorkers),
+                    ),
+                    logDir,
+                )
+                for job in pendingJobs
+            ]
+            try:
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+                    printFunc(formatResult(result))
+                    if result.logText:
+                        printFunc(result.logText)
+            except KeyboardInterrupt:
+                executor.shutdown(cancel_futures=True)
+                raise
+
+    return results, time.perf_counter() - start
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="Fontra Pak batch",
+        description="Convert or compile font sources without the GUI",
+    )
+    parser.add_argument("inputs", nargs="*", help="source font paths")
+    parser.add_argument(
+        "--manifest", help="JSON file listing jobs, as source/destination/format"
+    )
+    parser.add_argument(
+        "--format",
+        default="ttf",
+        type=parseFormat,
+        help=(
+            "output format for jobs that don't specify one: one of "
+            f"{', '.join(batchFileExtensions)}, or a comma-separated list of "
+            "binary formats to compile in one go (default: ttf)"
+        ),
+    )
+    parser.add_argument("--output-dir", help="folder for the outputs")
+    parser.add_argument(
+        "--engine",
+        choices=sorted(compileEngines),
+        default=None,
+        help=(
+            "compile engine for binary formats; fontra only writes ttf "
+            "(default: fontmake)"
+        ),
+    )
+    parser.add_argument(
+        "--memory-limit",
+        default=None,
+        help=(
+            "stop a job that uses more memory than this, for example 4G, or "
+            "'off' (default: 80%% of the physical memory)"
+        ),
+    )
+    parser.add_argument(
+        "--subset",
+        action="append",
+        default=[],
+        metavar="NAME=UNICODES",
+        help=(
+            "for binary formats: also write a subset of each output, for example "
+            "latin=U+0000-00FF,U+0131 (can be repeated)"
+        ),
+    )
+    parser.add_argument(
+        "--discrete-axes",
+        default="default",
+        choices=["default", "fan-out"],
+        help=(
+            "for ttf/otf: export only the default of discrete axes, or one font "
+            "per discrete axis location, in parallel (default: default)"
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="number of parallel jobs (default: the number of CPU cores)",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="also run jobs that are up to date"
+    )
+    parser.add_argument("--report", help="write the results as JSON to this path")
+    args = parser.parse_args(args)
+
+    try:
+        jobs = [
+            makeJob(inputPath, args.format, outputDir=args.output_dir)
+            for inputPath in args.inputs
+        ]
+        if args.manifest:
+            jobs += readManifest(args.manifest, args.format, args.output_dir)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    if not jobs:
+        parser.error("no inputs given")
+    try:
+        subsets = parseSubsets(args.subset)
+        getMemoryLimit(args.memory_limit)
+    except ValueError as e:
+        parser.error(str(e))
+    for job in jobs:
+        job.fanOut = args.discrete_axes == "fan-out"
+        job.compileEngine = args.engine
+        job.memoryLimit = args.memory_limit
+        if subsets and set(job.fileExtensions) <= set(binaryFileExtensions):
+            job.subsets = subsets
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    results, wallTime = runBatch(jobs, numWorkers=args.jobs, force=args.force)
+    print(formatSummary(results, wallTime))
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as reportFile:
+            json.dump(
+                dict(
+                    wallTime=wallTime,
+                    results=[
+                        asdict(result) | dict(glyphsPerSecond=result.glyphsPerSecond)
+                        for result in results
+                    ],
+                ),
+                reportFile,
+                indent=2,
+                default=os.fspath,
+            )
+
+    return 1 if any(result.status == "failed" for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
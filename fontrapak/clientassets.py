@@ -0,0 +1,229 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import pathlib
+import sys
+from importlib.resources import files
+
+from aiohttp import web
+
+from .diskcache import DiskCache
+from .paths import getCacheDir
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+bundledAssetsDirName = "fontrapak_assets"
+versionTokenFileName = "versiontoken.txt"
+
+compressibleExtensions = {".css", ".html", ".js", ".json", ".map", ".svg", ".txt"}
+# The server adds the version token to the references in these before serving
+rewrittenExtensions = {".css", ".html", ".js"}
+minCompressSize = 1024
+maxCompressedCacheSize = 256 * 1024**2
+
+# In order of preference
+compressionEncodings = {"br": ".br", "gzip": ".gz"} if brotli else {"gzip": ".gz"}
+
+immutableCacheControl = "public, max-age=31536000, immutable"
+
+
+def iterClientFiles(traversable=None, relativePath=()):
+    if traversable is None:
+        traversable = files("fontra.client")
+    for child in sorted(traversable.iterdir(), key=lambda child: child.name):
+        childPath = relativePath + (child.name,)
+        if child.is_dir():
+            yield from iterClientFiles(child, childPath)
+        else:
+            yield "/".join(childPath), child
+
+
+def computeClientVersionToken():
+    digest = hashlib.sha256()
+    for relativePath, traversable in iterClientFiles():
+        digest.update(relativePath.encode("utf-8") + b"\0")
+        digest.update(hashlib.sha256(traversable.read_bytes()).digest())
+    return digest.hexdigest()[:16]
+
+
+def getBundledAssetsDir():
+    if not getattr(sys, "frozen", False):
+        return None
+    return pathlib.Path(sys._MEIPASS) / bundledAssetsDirName
+
+
+def getClientVersionToken():
+    # The build writes the token into the bundle, so we don't have to hash the
+    # client files at each launch
+    bundledAssetsDir = getBundledAssetsDir()
+    if bundledAssetsDir is not None:
+        tokenPath = bundledAssetsDir / versionTokenFileName
+        if tokenPath.exists():
+            return tokenPath.read_text().strip()
+    return computeClientVersionToken()
+
+
+def compressData(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def contentKey(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def isCompressible(fileName, data):
+    return (
+        pathlib.PurePosixPath(fileName).suffix in compressibleExtensions
+        and len(data) >= minCompressSize
+    )
+
+
+def rewriteClientFile(relativePath, data, versionToken):
+    """Return a client file's data as the server serves it. The compressed
+    variants are looked up by the hash of what is served, so if this doesn't
+    match what the server does, they are merely not found.
+    """
+    if pathlib.PurePosixPath(relativePath).suffix not in rewrittenExtensions:
+        return data
+    from fontra.core.server import addVersionTokenToReferences
+
+    extension = pathlib.PurePosixPath(relativePath).suffix[1:]
+    text = addVersionTokenToReferences(data.decode("utf-8"), versionToken, extension)
+    return text.encode("utf-8")
+
+
+def iterServedClientFiles(versionToken):
+    # The client files as served: as they are, and with the version token
+    # added where the server does that
+    canRewrite = True
+    for relativePath, traversable in iterClientFiles():
+        data = traversable.read_bytes()
+        yield relativePath, data
+        if not canRewrite:
+            continue
+        try:
+            servedData = rewriteClientFile(relativePath, data, versionToken)
+        except (ImportError, AttributeError, TypeError) as e:
+            logger.warning(f"can't add the version token to client files: {e!r}")
+            canRewrite = False
+            continue
+        if servedData != data:
+            yield relativePath, servedData
+
+
+def writeBuildAssets(buildDir):
+    """Called by FontraPak.spec: write the client version token and the
+    precompressed client files, as the server serves them, to `buildDir`, to
+    be bundled.
+    """
+    buildDir = pathlib.Path(buildDir)
+    buildDir.mkdir(parents=True, exist_ok=True)
+    versionToken = computeClientVersionToken()
+    (buildDir / versionTokenFileName).write_text(versionToken + "\n")
+
+    servedFiles = [
+        (relativePath, data)
+        for relativePath, data in iterServedClientFiles(versionToken)
+        if isCompressible(relativePath, data)
+    ]
+    for encoding, suffix in compressionEncodings.items():
+        store = DiskCache(buildDir / encoding, maxSize=None, suffix=suffix)
+        for relativePath, data in servedFiles:
+            store.put(contentKey(data), compressData(data, encoding))
+
+    return versionToken
+
+
+class CompressedAssets:
+    # Compressed variants are looked up by the hash of the data served:
+    # first in the bundle, then in the user cache, where the ones we had to
+    # compress at runtime end up.
+
+    def __init__(self):
+        bundledAssetsDir = getBundledAssetsDir()
+        cacheDir = getCacheDir("compressed-assets")
+        self.stores = {}
+        for encoding, suffix in compressionEncodings.items():
+            stores = [
+                DiskCache(
+                    cacheDir / encoding, maxSize=maxCompressedCacheSize, suffix=suffix
+                )
+            ]
+            if bundledAssetsDir is not None:
+                stores.insert(
+                    0,
+                    DiskCache(bundledAssetsDir / encoding, maxSize=None, suffix=suffix),
+                )
+            self.stores[encoding] = stores
+            stores[-1].evict()
+        self.memoryCache = {}
+
+    async def get(self, data, encoding):
+        key = contentKey(data)
+        compressed = self.memoryCache.get((key, encoding))
+        if compressed is None:
+            # Reading the disk caches, let alone compressing, would hold up
+            # the server's other requests
+            compressed = await asyncio.to_thread(self._load, key, data, encoding)
+            self.memoryCache[key, encoding] = compressed
+        return compressed
+
+    def _load(self, key, data, encoding):
+        stores = self.stores[encoding]
+        for store in stores:
+            compressed = store.get(key)
+            if compressed is not None:
+                return compressed
+        compressed = compressData(data, encoding)
+        stores[-1].put(key, compressed)
+        return compressed
+
+
+def chooseEncoding(acceptEncoding):
+    accepted = {
+        part.split(";")[0].strip().lower() for part in acceptEncoding.split(",")
+    }
+    for encoding in compressionEncodings:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def makeClientAssetsMiddleware(versionToken):
+    compressedAssets = CompressedAssets()
+
+    @web.middleware
+    async def clientAssetsMiddleware(request, handler):
+        response = await handler(request)
+        if (
+            request.method != "GET"
+            or response.status != 200
+            or not isinstance(response, web.Response)
+            or not isinstance(response.body, bytes)
+        ):
+            return response
+
+        if versionToken in request.path_qs:
+            # The token is derived from the client files: a versioned URL
+            # always refers to the same content
+            response.headers["Cache-Control"] = immutableCacheControl
+
+        data = response.body
+        if isCompressible(request.path, data):
+            response.headers["Vary"] = "Accept-Encoding"
+            encoding = chooseEncoding(request.headers.get("Accept-Encoding", ""))
+            if encoding is not None:
+                response.body = await compressedAssets.get(data, encoding)
+                response.headers["Content-Encoding"] = encoding
+
+        return response
+
+    return clientAssetsMiddleware
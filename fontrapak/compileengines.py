@@ -0,0 +1,76 @@
+import logging
+import os
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+
+# Used when an export doesn't ask for a specific engine
+compileEngineEnvironmentVariable = "FONTRA_PAK_COMPILE_ENGINE"
+
+defaultCompileEngineName = "fontmake"
+
+
+@dataclass(kw_only=True)
+class CompileEngine:
+    name: str
+    outputAction: str
+    options: dict = field(default_factory=dict)
+    fileExtensions: tuple = ("ttf", "otf")
+    # The plugins doing the compiling, which export workers import ahead of
+    # the jobs that need them, see filetypes.getOptionalModules()
+    moduleNames: tuple = ()
+    # The packages whose versions key the export cache's outputs
+    distributionNames: tuple = ()
+    # The option that sets the compiler's log level, if it has one. Not part
+    # of `options`, which key the export cache: it doesn't change the output.
+    logLevelOption: str | None = None
+
+    def getOutputStep(self, destination, logLevel=None):
+        options = dict(self.options)
+        if self.logLevelOption is not None and logLevel is not None:
+            options[self.logLevelOption] = logLevel
+        step = dict(output=self.outputAction, destination=destination)
+        if options:
+            step["options"] = options
+        return step
+
+
+compileEngines = {
+    engine.name: engine
+    for engine in [
+        CompileEngine(
+            name="fontmake",
+            outputAction="compile-fontmake",
+            options={"overlaps-backend": "pathops"},
+            logLevelOption="verbose",
+            moduleNames=("fontmake.font_project",),
+            distributionNames=("fontmake", "ufo2ft"),
+        ),
+        # Much faster on large variable fonts, but only writes TrueType
+        CompileEngine(
+            name="fontra",
+            outputAction="compile-fontra",
+            fileExtensions=("ttf",),
+            moduleNames=("fontra_compile",),
+            distributionNames=("fontra-compile",),
+        ),
+    ]
+}
+
+
+def getCompileEngine(engineName=None, fileExtension="ttf"):
+    if engineName is None:
+        engineName = os.environ.get(
+            compileEngineEnvironmentVariable, defaultCompileEngineName
+        ).lower()
+    engine = compileEngines.get(engineName)
+    if engine is None:
+        raise ValueError(f"unknown compile engine: {engineName}")
+    if fileExtension not in engine.fileExtensions:
+        logger.info(
+            f"the {engineName} engine can't write {fileExtension}: "
+            f"using {defaultCompileEngineName} instead"
+        )
+        engine = compileEngines[defaultCompileEngineName]
+    return engine
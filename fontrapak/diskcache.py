@@ -0,0 +1,94 @@
+import os
+import pathlib
+import tempfile
+import time
+
+
+class DiskCache:
+    """A directory of files keyed by hex digests, evicted least recently used
+    first once over `maxSize` bytes, and evicted regardless once older than
+    `maxAge` seconds.
+    """
+
+    def __init__(self, cacheDir, *, maxSize, maxAge=None, suffix=""):
+        self.cacheDir = pathlib.Path(cacheDir)
+        self.maxSize = maxSize
+        self.maxAge = maxAge
+        self.suffix = suffix
+
+    def getPath(self, key):
+        return self.cacheDir / key[:2] / (key + self.suffix)
+
+    def get(self, key):
+        path = self.getPath(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        self._touch(path)
+        return data
+
+    def lookup(self, key):
+        path = self.getPath(key)
+        if not path.exists():
+            return None
+        self._touch(path)
+        return path
+
+    def put(self, key, data):
+        path = self.getPath(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file first, other processes may read the same key
+        fd, tempPath = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tempPath, path)
+
+    def delete(self, key):
+        self.getPath(key).unlink(missing_ok=True)
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def iterEntries(self):
+        for path in self.cacheDir.glob("??/*" + self.suffix):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield path, stat.st_size, stat.st_mtime
+
+    def totalSize(self):
+        return sum(size for _, size, _ in self.iterEntries())
+
+    def evict(self):
+        now = time.time()
+        entries = []
+        for path, size, mtime in self.iterEntries():
+            if self.maxAge is not None and now - mtime > self.maxAge:
+                _removeFile(path)
+            else:
+                entries.append((mtime, size, path))
+
+        if self.maxSize is None:
+            return
+
+        totalSize = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if totalSize <= self.maxSize:
+                break
+            if _removeFile(path):
+                totalSize -= size
+
+
+def _removeFile(path):
+    try:
+        path.unlink(missing_ok=True)
+    except OSError:
+        # Most likely still open elsewhere, on Windows
+        return False
+    return True
@@ -0,0 +1,438 @@
+import asyncio
+import os
+import pathlib
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from fontra.backends import getFileSystemBackend, newFileSystemBackend
+from fontra.core.classes import DiscreteFontAxis
+from fontra.workflow.workflow import Workflow
+
+from .compileengines import getCompileEngine
+from .exportcache import ExportCache, getExportCacheMode, getToolVersions
+from .exportlog import ExportLog, getExportLogLevel
+from .filetypes import binaryFileExtensions, getBaseFileExtension
+from .liveexport import LiveServerBackend, openLiveBackend
+from .memorylimit import BoundedGlyphBackend, MemoryMonitor, getMemoryLimit
+from .pipelinedcopy import aclosingSafely, copyFontPipelined
+from .profiling import getProfilePath, isProfilingEnabled, profiled
+from .progress import ExportProgress, GlyphProgressBackend, getTimingReportPath
+from .snapshot import SnapshotCache, allSnapshotExtensions
+from .webfonts import getSubsetPath, writeOutput
+
+
+@contextmanager
+def redirectedOutput(logFilePath, progressCallback=None):
+    # Stray output goes to the log file, log records through an ExportLog
+    logFile = open(logFilePath, "w", encoding="utf-8")
+    savedStdout, savedStderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = logFile
+    try:
+        with ExportLog(logFile, progressCallback) as exportLog:
+            yield exportLog
+    finally:
+        # We may be running in a long-lived export worker: restore the streams
+        # so the next job doesn't write to this job's log
+        sys.stdout, sys.stderr = savedStdout, savedStderr
+        logFile.close()
+
+
+def exportFontToPath(
+    sourcePath,
+    destPath,
+    fileExtension,
+    logFilePath,
+    progressCallback=None,
+    discreteLocation=None,
+    compileEngine=None,
+    memoryLimit=None,
+    profilePath=None,
+    liveSource=None,
+):
+    profilePath = getExportProfilePath(profilePath)
+    with (
+        redirectedOutput(logFilePath, progressCallback) as exportLog,
+        MemoryMonitor(getMemoryLimit(memoryLimit)) as memoryMonitor,
+    ):
+        progress = ExportProgress(progressCallback, memoryMonitor=memoryMonitor)
+        with profiled(profilePath):
+            asyncio.run(
+                memoryMonitor.run(
+                    exportFontToPathAsync(
+                        sourcePath,
+                        destPath,
+                        fileExtension,
+                        progress,
+                        discreteLocation=discreteLocation,
+                        compileEngine=compileEngine,
+                        liveSource=liveSource,
+                    )
+                )
+            )
+        return progress.writeReport(
+            getTimingReportPath(pathlib.Path(destPath)),
+            source=os.fspath(sourcePath),
+            destination=os.fspath(destPath),
+            format=fileExtension,
+            discreteLocation=discreteLocation,
+            compileEngine=compileEngine,
+            profile=profilePath and os.fspath(profilePath),
+            logging=exportLog.getStats(),
+        )
+
+
+def exportFontToPaths(
+    sourcePath,
+    destPaths,
+    logFilePath,
+    progressCallback=None,
+    subsets=None,
+    compileEngine=None,
+    memoryLimit=None,
+    profilePath=None,
+    liveSource=None,
+):
+    """Export to several binary formats in one go. `destPaths` maps file
+    extensions to destination paths. `subsets` optionally maps subset names to
+    lists of code points: each of these is also written in each format, next to
+    the full font. `memoryLimit` is as for getMemoryLimit(). `liveSource`
+    is as for openSourceBackend().
+    """
+    destPaths = {
+        fileExtension: pathlib.Path(destPath)
+        for fileExtension, destPath in destPaths.items()
+    }
+    profilePath = getExportProfilePath(profilePath)
+    with (
+        redirectedOutput(logFilePath, progressCallback) as exportLog,
+        MemoryMonitor(getMemoryLimit(memoryLimit)) as memoryMonitor,
+    ):
+        progress = ExportProgress(progressCallback, memoryMonitor=memoryMonitor)
+        with profiled(profilePath):
+            asyncio.run(
+                memoryMonitor.run(
+                    exportFontToPathsAsync(
+                        sourcePath,
+                        destPaths,
+                        progress,
+                        subsets,
+                        compileEngine,
+                        liveSource,
+                    )
+                )
+            )
+        return progress.writeReport(
+            getTimingReportPath(next(iter(destPaths.values()))),
+            source=os.fspath(sourcePath),
+            destinations={
+                fileExtension: os.fspath(destPath)
+                for fileExtension, destPath in destPaths.items()
+            },
+            subsets=sorted(subsets or {}),
+            compileEngine=compileEngine,
+            profile=profilePath and os.fspath(profilePath),
+            logging=exportLog.getStats(),
+        )
+
+
+def getExportProfilePath(profilePath):
+    # The app picks the path itself, so it knows where to find the profile
+    # even if the export fails
+    if profilePath is None and isProfilingEnabled("export"):
+        profilePath = getProfilePath("export")
+    return profilePath
+
+
+async def exportFontToPathAsync(
+    sourcePath,
+    destPath,
+    fileExtension,
+    progress=None,
+    discreteLocation=None,
+    compileEngine=None,
+    liveSource=None,
+):
+    sourcePath = pathlib.Path(sourcePath)
+    destPath = pathlib.Path(destPath)
+    if progress is None:
+        progress = ExportProgress()
+
+    with progress.stage("open"):
+        if discreteLocation is None:
+            sourceBackend = await openSourceBackend(sourcePath, liveSource)
+        else:
+            # We're one of several processes exporting the same source, which
+            # was snapshotted before we were started
+            sourceBackend = SnapshotCache(extensions=allSnapshotExtensions).openBackend(
+                sourcePath
+            )
+
+    if fileExtension in binaryFileExtensions:
+        async with aclosingSafely(sourceBackend.aclose):
+            await compileFontToPaths(
+                sourceBackend,
+                sourcePath.parent,
+                {fileExtension: destPath},
+                progress,
+                discreteLocation=discreteLocation,
+                compileEngine=compileEngine,
+                sourcePath=getDiskSourcePath(sourceBackend, sourcePath),
+            )
+    else:
+        destBackend = newFileSystemBackend(destPath)
+        async with (
+            aclosingSafely(sourceBackend.aclose),
+            aclosingSafely(destBackend.aclose),
+        ):
+            with progress.stage("copy"):
+                progress.setGlyphTotal(len(await sourceBackend.getGlyphMap()))
+                await copyFontPipelined(
+                    sourceBackend,
+                    destBackend,
+                    wrapDestBackend=lambda backend: GlyphProgressBackend(
+                        backend, progress, "putGlyph"
+                    ),
+                )
+
+
+async def exportFontToPathsAsync(
+    sourcePath, destPaths, progress, subsets=None, compileEngine=None, liveSource=None
+):
+    sourcePath = pathlib.Path(sourcePath)
+    with progress.stage("open"):
+        sourceBackend = await openSourceBackend(sourcePath, liveSource)
+
+    async with aclosingSafely(sourceBackend.aclose):
+        await compileFontToPaths(
+            sourceBackend,
+            sourcePath.parent,
+            destPaths,
+            progress,
+            subsets=subsets,
+            compileEngine=compileEngine,
+            sourcePath=getDiskSourcePath(sourceBackend, sourcePath),
+        )
+
+
+def getDiskSourcePath(sourceBackend, sourcePath):
+    # A live source may differ from what is on disk
+    return None if isinstance(sourceBackend, LiveServerBackend) else sourcePath
+
+
+async def openSourceBackend(sourcePath, liveSource=None):
+    """Open the source from the server that has it loaded if `liveSource` is
+    given, see liveexport.openLiveBackend(), and from disk otherwise, or if the
+    server can't provide it.
+    """
+    if liveSource is not None:
+        sourceBackend = await openLiveBackend(liveSource)
+        if sourceBackend is not None:
+            return sourceBackend
+    return getFileSystemBackend(sourcePath)
+
+
+async def compileFontToPaths(
+    sourceBackend,
+    parentDir,
+    destPaths,
+    progress,
+    discreteLocation=None,
+    subsets=None,
+    compileEngine=None,
+    sourcePath=None,
+):
+    # TTF and OTF are compiled at most once each, from the same source. WOFF,
+    # WOFF2 and subsets are derived from those, concurrently. `sourcePath` is
+    # given if `sourceBackend` reads it from disk, see ExportCache.setup().
+    baseFileExtensions = sorted(
+        {getBaseFileExtension(fileExtension) for fileExtension in destPaths}
+    )
+    with tempfile.TemporaryDirectory() as tempDir:
+        compiledPaths = {
+            fileExtension: pathlib.Path(tempDir) / f"compiled.{fileExtension}"
+            for fileExtension in baseFileExtensions
+        }
+        await compileFonts(
+            sourceBackend,
+            parentDir,
+            compiledPaths,
+            progress,
+            discreteLocation,
+            compileEngine,
+            sourcePath,
+        )
+
+        outputs = [
+            (fileExtension, destPath, None)
+            for fileExtension, destPath in destPaths.items()
+        ]
+        for subsetName, unicodes in (subsets or {}).items():
+            outputs += [
+                (fileExtension, getSubsetPath(destPath, subsetName), unicodes)
+                for fileExtension, destPath in destPaths.items()
+            ]
+
+        with progress.stage("write outputs"):
+            await asyncio.gather(
+                *(
+                    writeOutputAsync(
+                        compiledPaths[getBaseFileExtension(fileExtension)],
+                        destPath,
+                        fileExtension,
+                        unicodes,
+                        progress,
+                    )
+                    for fileExtension, destPath, unicodes in outputs
+                )
+            )
+
+
+async def writeOutputAsync(compiledPath, destPath, fileExtension, unicodes, progress):
+    start = time.perf_counter()
+    await asyncio.to_thread(
+        writeOutput, compiledPath, destPath, fileExtension, unicodes
+    )
+    progress.recordOutput(
+        step="write",
+        format=fileExtension,
+        path=os.fspath(destPath),
+        elapsed=time.perf_counter() - start,
+        size=destPath.stat().st_size,
+    )
+
+
+async def compileFonts(
+    sourceBackend,
+    parentDir,
+    compiledPaths,
+    progress,
+    discreteLocation=None,
+    compileEngine=None,
+    sourcePath=None,
+):
+    # We drop discrete axes and export the default, or the instance at
+    # `discreteLocation`: see fanout.py
+    axes = await sourceBackend.getAxes()
+    discreteAxisNames = [
+        axis.name for axis in axes.axes if isinstance(axis, DiscreteFontAxis)
+    ]
+
+    dropDiscreteAxes = (
+        [dict(filter="subset-axes", dropAxisNames=discreteAxisNames)]
+        if discreteAxisNames
+        else []
+    )
+
+    moveDefault = (
+        [dict(filter="move-default-location", newDefaultUserLocation=discreteLocation)]
+        if discreteLocation
+        else []
+    )
+
+    prepareSteps = (
+        moveDefault
+        + dropDiscreteAxes
+        + [
+            dict(filter="decompose-composites", onlyVariableComposites=True),
+        ]
+    )
+    filterSteps = [dict(filter="drop-unreachable-glyphs")]
+    engines = {
+        fileExtension: getCompileEngine(compileEngine, fileExtension)
+        for fileExtension in compiledPaths
+    }
+
+    logLevel = getExportLogLevel()
+
+    def getOutputSteps(fileExtensions):
+        return [
+            engines[fileExtension].getOutputStep(
+                compiledPaths[fileExtension].name, logLevel
+            )
+            for fileExtension in fileExtensions
+        ]
+
+    outputDir = next(iter(compiledPaths.values())).parent
+
+    def compileOutputs(fileExtensions):
+        return runWorkflow(
+            sourceBackend,
+            prepareSteps + filterSteps + getOutputSteps(fileExtensions),
+            parentDir,
+            outputDir,
+            {fileExtension: engines[fileExtension] for fileExtension in fileExtensions},
+            progress,
+        )
+
+    cacheMode = getExportCacheMode()
+    if cacheMode == "off":
+        with progress.stage("compile"):
+            await compileOutputs(list(compiledPaths))
+        return
+
+    # Each output is cached whole: if anything changed, it is compiled again
+    # from scratch
+    exportCache = ExportCache(verify=cacheMode == "verify")
+    with progress.stage("hash sources"):
+        await exportCache.setup(sourceBackend, prepareSteps, sourcePath)
+        outputKeys = {
+            fileExtension: await exportCache.getOutputKey(
+                "." + fileExtension,
+                filterSteps[0],
+                engines[fileExtension].outputAction,
+                engines[fileExtension].options,
+                getToolVersions(engines[fileExtension].distributionNames),
+            )
+            for fileExtension in compiledPaths
+        }
+
+    missingFileExtensions = [
+        fileExtension
+        for fileExtension, compiledPath in compiledPaths.items()
+        if not exportCache.restoreOutput(outputKeys[fileExtension], compiledPath)
+    ]
+    if missingFileExtensions:
+        with progress.stage("compile"):
+            await compileOutputs(missingFileExtensions)
+        for fileExtension in missingFileExtensions:
+            exportCache.storeOutput(
+                outputKeys[fileExtension], compiledPaths[fileExtension]
+            )
+
+    exportCache.finish()
+
+
+async def runWorkflow(inputBackend, steps, parentDir, outputDir, engines, progress):
+    # `engines` maps the file extension of each output step, in order, to its
+    # compile engine
+    continueOnError = False
+
+    progress.setGlyphTotal(len(await inputBackend.getGlyphMap()))
+    # The outputs pull glyphs through the workflow steps concurrently: keep
+    # the number in flight bounded, however many outputs and tasks there are
+    inputBackend = BoundedGlyphBackend(GlyphProgressBackend(inputBackend, progress))
+
+    workflow = Workflow(config=dict(steps=steps), parentDir=parentDir)
+
+    async def processOutput(output, fileExtension):
+        start = time.perf_counter()
+        await output.process(outputDir, continueOnError=continueOnError)
+        progress.recordOutput(
+            step="compile",
+            format=fileExtension,
+            engine=engines[fileExtension].name,
+            elapsed=time.perf_counter() - start,
+        )
+
+    async with workflow.endPoints(inputBackend) as endPoints:
+        assert endPoints.endPoint is not None
+        assert len(endPoints.outputs) == len(engines)
+
+        await asyncio.gather(
+            *(
+                processOutput(output, fileExtension)
+                for output, fileExtension in zip(endPoints.outputs, engines)
+            )
+        )
@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import importlib.metadata
+import io
+import json
+import logging
+import os
+import pathlib
+
+from fontra.core.classes import unstructure
+
+from .diskcache import DiskCache
+from .paths import getCacheDir
+from .snapshot import getSourceSignature
+
+logger = logging.getLogger(__name__)
+
+
+# Bump when the cached data or the way keys are computed changes
+cacheFormatVersion = 2
+
+# Packages whose upgrade may change any output. Those of the compile engines
+# are listed with the engines, see compileengines.py.
+toolDistributionNames = ["fontra", "fonttools"]
+
+defaultMaxCacheSize = 1024**3
+defaultMaxCacheAge = 30 * 24 * 60 * 60
+
+# "on" (default), "off" or "verify"
+exportCacheModeEnvironmentVariable = "FONTRA_PAK_EXPORT_CACHE"
+
+
+def getExportCacheMode():
+    mode = os.environ.get(exportCacheModeEnvironmentVariable, "on").lower()
+    return mode if mode in {"on", "off", "verify"} else "on"
+
+
+def hashData(*items):
+    digest = hashlib.sha256()
+    for item in items:
+        digest.update(
+            json.dumps(item, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        )
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def getToolVersions(distributionNames):
+    versions = {}
+    for distributionName in distributionNames:
+        try:
+            versions[distributionName] = importlib.metadata.version(distributionName)
+        except importlib.metadata.PackageNotFoundError:
+            versions[distributionName] = None
+    return versions
+
+
+class ExportCache:
+    """Caches binary exports whole. An output is keyed by the versions of the
+    tools that make it, its compile settings, and the content of the source:
+    the font-level data and every glyph. fontmake compiles the whole font in
+    one go, so if anything changed, the whole font is compiled again.
+
+    Hashing the content means reading every glyph. For a source read from
+    disk, the key is also stored under the source's file signature, so that
+    an unchanged source is looked up without reading it.
+    """
+
+    def __init__(
+        self,
+        cacheDir=None,
+        *,
+        maxSize=defaultMaxCacheSize,
+        maxAge=defaultMaxCacheAge,
+        verify=False,
+    ):
+        if cacheDir is None:
+            cacheDir = getCacheDir("export")
+        self.store = DiskCache(cacheDir, maxSize=maxSize, maxAge=maxAge)
+        self.verify = verify
+        self.fontKey = None
+        self.signatureKey = None
+        self.outputHits = 0
+        self.outputMisses = 0
+        self.mismatches = 0
+        self._glyphKeys = {}
+        self._expectedOutputs = {}
+
+    async def setup(self, sourceBackend, prepareSteps, sourcePath=None):
+        # `sourcePath` is given if `sourceBackend` reads it from disk as it is
+        self.sourceBackend = sourceBackend
+        self.prepareSteps = prepareSteps
+        self.toolVersions = getToolVersions(toolDistributionNames)
+        if sourcePath is not None and not self.verify:
+            sourcePath = pathlib.Path(sourcePath).resolve()
+            signature = await asyncio.to_thread(getSourceSignature, sourcePath)
+            self.signatureKey = hashData(
+                cacheFormatVersion,
+                self.toolVersions,
+                prepareSteps,
+                os.fspath(sourcePath),
+                signature,
+            )
+
+    async def getFontKey(self):
+        if self.fontKey is None:
+            sourceBackend = self.sourceBackend
+            self.fontKey = hashData(
+                cacheFormatVersion,
+                self.toolVersions,
+                self.prepareSteps,
+                unstructure(await sourceBackend.getAxes()),
+                unstructure(await sourceBackend.getSources()),
+                await sourceBackend.getUnitsPerEm(),
+                unstructure(await sourceBackend.getFontInfo()),
+                unstructure(await sourceBackend.getKerning()),
+                unstructure(await sourceBackend.getFeatures()),
+                await sourceBackend.getCustomData(),
+            )
+        return self.fontKey
+
+    async def getGlyphKey(self, glyphName):
+        key = self._glyphKeys.get(glyphName)
+        if key is None:
+            # Placeholder, so a component cycle can't recurse forever
+            self._glyphKeys[glyphName] = ""
+            fontKey = await self.getFontKey()
+            glyph = await self.sourceBackend.getGlyph(glyphName)
+            if glyph is None:
+                key = hashData(fontKey, glyphName, None)
+            else:
+                baseGlyphNames = sorted(
+                    {
+                        compo.name
+                        for layer in glyph.layers.values()
+                        for compo in layer.glyph.components
+                    }
+                )
+                baseGlyphKeys = [
+                    await self.getGlyphKey(baseGlyphName)
+                    for baseGlyphName in baseGlyphNames
+                ]
+                key = hashData(fontKey, glyphName, unstructure(glyph), baseGlyphKeys)
+            self._glyphKeys[glyphName] = key
+        return key
+
+    async def getOutputKey(self, *outputParameters):
+        signatureOutputKey = None
+        if self.signatureKey is not None:
+            signatureOutputKey = hashData(self.signatureKey, outputParameters)
+            data = self.store.get(signatureOutputKey)
+            if data is not None:
+                outputKey = data.decode("ascii")
+                if self.store.lookup(outputKey) is not None:
+                    return outputKey
+
+        glyphMap = await self.sourceBackend.getGlyphMap()
+        glyphKeys = [
+            (glyphName, codePoints, await self.getGlyphKey(glyphName))
+            for glyphName, codePoints in sorted(glyphMap.items())
+        ]
+        outputKey = hashData(await self.getFontKey(), outputParameters, glyphKeys)
+        if signatureOutputKey is not None:
+            self.store.put(signatureOutputKey, outputKey.encode("ascii"))
+        return outputKey
+
+    def restoreOutput(self, outputKey, destPath):
+        data = self.store.get(outputKey)
+        if data is None:
+            self.outputMisses += 1
+            return False
+        self.outputHits += 1
+        if self.verify:
+            # Do the full build anyway, and compare in storeOutput()
+            self._expectedOutputs[outputKey] = data
+            return False
+        destPath.write_bytes(data)
+        logger.info(f"restored {destPath.name} from the export cache")
+        return True
+
+    def storeOutput(self, outputKey, destPath):
+        data = destPath.read_bytes()
+        expectedOutput = self._expectedOutputs.pop(outputKey, None)
+        if expectedOutput is not None:
+            if not fontDataIsEquivalent(expectedOutput, data):
+                self.mismatches += 1
+                logger.warning(f"export cache mismatch for {destPath.name}")
+        self.store.put(outputKey, data)
+
+    def finish(self):
+        logger.info(
+            f"export cache: {self.outputHits} output hits, "
+            f"{self.outputMisses} output misses"
+            + (f", {self.mismatches} mismatches" if self.verify else "")
+        )
+        self.store.evict()
+
+
+def fontDataIsEquivalent(fontData1, fontData2):
+    from fontTools.ttLib import TTFont
+
+    font1 = TTFont(io.BytesIO(fontData1))
+    font2 = TTFont(io.BytesIO(fontData2))
+    tags = set(font1.reader.keys())
+    if tags != set(font2.reader.keys()):
+        return False
+    # The head table contains the modification timestamp
+    tags.discard("head")
+    return all(font1.reader[tag] == font2.reader[tag] for tag in tags)
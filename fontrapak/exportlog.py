@@ -0,0 +1,184 @@
+import collections
+import logging
+import os
+import time
+
+# The level of the log records written to the export log and shipped to the
+# app, and the verbosity fontmake runs at. More detailed records are kept in
+# a ring buffer, which is only written to the log if the export fails.
+exportLogLevelEnvironmentVariable = "FONTRA_PAK_EXPORT_LOG_LEVEL"
+
+defaultExportLogLevel = "INFO"
+defaultRingBufferSize = 2000
+defaultShipInterval = 0.25
+
+# Loggers whose DEBUG records are kept in the ring buffer. Other loggers, such
+# as fontTools', stay at the export log level, so that their debug calls don't
+# make records at all.
+ringBufferLoggerNames = ["fontra", "fontrapak"]
+
+logFormat = "%(asctime)s %(name)-17s %(levelname)-8s %(message)s"
+logDateFormat = "%H:%M:%S"
+
+
+def getExportLogLevel():
+    levelName = os.environ.get(
+        exportLogLevelEnvironmentVariable, defaultExportLogLevel
+    ).upper()
+    if not isinstance(logging.getLevelName(levelName), int):
+        levelName = defaultExportLogLevel
+    return levelName
+
+
+class TimedHandler(logging.Handler):
+    # Keeps track of the time spent handling records, in `loggingTime`
+
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.loggingTime = 0.0
+
+    def handle(self, record):
+        start = time.perf_counter()
+        try:
+            return super().handle(record)
+        finally:
+            self.loggingTime += time.perf_counter() - start
+
+
+class RingBufferHandler(TimedHandler):
+    def __init__(self, size=defaultRingBufferSize):
+        super().__init__(logging.DEBUG)
+        # Records are only formatted if they are ever written
+        self.records = collections.deque(maxlen=size)
+        self.numRecords = 0
+
+    def emit(self, record):
+        self.records.append(record)
+        self.numRecords += 1
+
+
+class ShippingHandler(TimedHandler):
+    """Writes records to the log file, and passes them on to `callback` in
+    batches, as a "log" event, at most every `shipInterval` seconds.
+    """
+
+    def __init__(self, logFile, callback=None, level=logging.INFO, shipInterval=0):
+        super().__init__(level)
+        self.logFile = logFile
+        self.callback = callback
+        self.shipInterval = shipInterval
+        self.pendingLines = []
+        self.lastShipTime = 0
+        self.numRecords = 0
+
+    def emit(self, record):
+        line = self.format(record)
+        self.logFile.write(line + "\n")
+        self.numRecords += 1
+        if self.callback is None:
+            return
+        self.pendingLines.append(line)
+        if time.perf_counter() - self.lastShipTime >= self.shipInterval:
+            self.ship()
+
+    def ship(self):
+        with self.lock:
+            lines, self.pendingLines = self.pendingLines, []
+            self.lastShipTime = time.perf_counter()
+        if lines and self.callback is not None:
+            self.callback(dict(event="log", lines=lines))
+
+
+class ExportLog:
+    """Routes log records in an export process: records at `level` and above
+    go to the log file and the app, the most recent records at any level from
+    the `ringBufferLoggerNames` loggers to a ring buffer that is dumped into
+    the log file if the export fails.
+    """
+
+    def __init__(
+        self,
+        logFile,
+        callback=None,
+        level=None,
+        ringBufferSize=defaultRingBufferSize,
+        shipInterval=defaultShipInterval,
+    ):
+        self.level = level or getExportLogLevel()
+        self.logFile = logFile
+        formatter = logging.Formatter(logFormat, logDateFormat)
+        self.shippingHandler = ShippingHandler(
+            logFile, callback, self.level, shipInterval
+        )
+        self.shippingHandler.setFormatter(formatter)
+        self.ringBufferHandler = RingBufferHandler(ringBufferSize)
+        self.ringBufferHandler.setFormatter(formatter)
+        self._savedLevels = {}
+
+    @property
+    def loggingTime(self):
+        return self.shippingHandler.loggingTime + self.ringBufferHandler.loggingTime
+
+    def getStats(self):
+        return dict(
+            level=self.level,
+            loggingTime=self.loggingTime,
+            records=self.ringBufferHandler.numRecords,
+            recordsWritten=self.shippingHandler.numRecords,
+        )
+
+    def __enter__(self):
+        rootLogger = logging.getLogger()
+        self._savedLevels = {
+            name: logging.getLogger(name).level
+            for name in [None] + ringBufferLoggerNames
+        }
+        rootLogger.setLevel(self.level)
+        for name in ringBufferLoggerNames:
+            logging.getLogger(name).setLevel(logging.DEBUG)
+        rootLogger.addHandler(self.ringBufferHandler)
+        rootLogger.addHandler(self.shippingHandler)
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        rootLogger = logging.getLogger()
+        rootLogger.removeHandler(self.shippingHandler)
+        rootLogger.removeHandler(self.ringBufferHandler)
+        for name, level in self._savedLevels.items():
+            logging.getLogger(name).setLevel(level)
+        if excType is not None and not issubclass(excType, KeyboardInterrupt):
+            self.dumpRingBuffer()
+        self.shippingHandler.ship()
+
+    def dumpRingBuffer(self):
+        records = [
+            record
+            for record in self.ringBufferHandler.records
+            if record.levelno < self.shippingHandler.level
+        ]
+        if not records:
+            return
+        self.logFile.write(
+            f"--- the last {len(records)} records below {self.level} level ---\n"
+        )
+        for record in records:
+            self.logFile.write(self.ringBufferHandler.format(record) + "\n")
+        self.logFile.write("---\n")
+        self.logFile.flush()
+
+
+def readLogTail(logFilePath, maxSize=256 * 1024):
+    # The end of a possibly huge log, without reading all of it
+    try:
+        with open(logFilePath, "rb") as logFile:
+            logFile.seek(0, os.SEEK_END)
+            size = logFile.tell()
+            logFile.seek(max(0, size - maxSize))
+            data = logFile.read()
+    except OSError:
+        return ""
+    text = data.decode("utf-8", errors="replace")
+    if size > maxSize:
+        # Drop the partial first line
+        text = "…\n" + text.partition("\n")[2]
+    return text
@@ -0,0 +1,463 @@
+import importlib
+import itertools
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from multiprocessing.connection import wait
+
+from .filetypes import getOptionalModules
+from .memory import formatBytes, getCurrentRSS, getPhysicalMemory
+from .memorylimit import getSharedMemoryLimit
+
+logger = logging.getLogger(__name__)
+
+
+# Imported by each worker before it accepts jobs, so jobs don't pay for it.
+# Plugins only some files need are imported once such a file comes along, see
+# ExportWorkerPool.preloadModules().
+warmModules = [
+    "fontra.backends",
+    "fontra.backends.copy",
+    "fontra.workflow.workflow",
+    "fontrapak.export",
+]
+
+defaultMaxJobsPerWorker = 20
+defaultMaxWorkerRSS = 2 * 1024**3
+# What we plan for per concurrent export, when capping the number of workers
+expectedJobMemory = 2 * 1024**3
+
+_jobIdCounter = itertools.count(1)
+
+
+def getDefaultMaxWorkers():
+    # One export per core, as far as the memory goes
+    maxWorkers = os.cpu_count() or 1
+    physicalMemory = getPhysicalMemory()
+    if physicalMemory is not None:
+        maxWorkers = min(maxWorkers, physicalMemory // expectedJobMemory)
+    return max(1, maxWorkers)
+
+
+@dataclass(kw_only=True)
+class ExportJob:
+    sourcePath: os.PathLike
+    destPath: os.PathLike
+    fileExtension: str
+    logFilePath: str
+    compileEngine: str | None = None
+    memoryLimit: str | int | None = None
+    profilePath: os.PathLike | None = None
+    # Where to read the source from instead of from disk, see liveexport.py
+    liveSource: dict | None = None
+    # Export one font per discrete axis location, see fanout.py. The source is
+    # then read from disk.
+    fanOut: bool = False
+    onFinished: object = None
+    onProgress: object = None
+    jobId: int = field(default_factory=lambda: next(_jobIdCounter))
+    # One of "pending", "starting" (sent to a worker that hasn't confirmed it
+    # yet), "running", "done", "failed", "cancelled", "crashed"
+    status: str = "pending"
+    # Cancelled while starting: the worker is interrupted once it has started
+    cancelRequested: bool = False
+    exitCode: int | None = None
+    submitTime: float = 0.0
+    startupTime: float = 0.0
+    workTime: float = 0.0
+    # How many identical requests were merged into this job
+    numRequests: int = 1
+
+    @property
+    def succeeded(self):
+        return self.status == "done"
+
+    @property
+    def isFinished(self):
+        return self.status not in {"pending", "starting", "running"}
+
+    def getMergeKey(self):
+        # Requests with the same key produce the same output
+        return (
+            os.fspath(self.sourcePath),
+            os.fspath(self.destPath),
+            self.fileExtension,
+            self.compileEngine,
+            self.memoryLimit,
+            self.fanOut,
+        )
+
+    def exportArgs(self):
+        return (self.sourcePath, self.destPath, self.fileExtension, self.logFilePath)
+
+    def exportOptions(self):
+        # Keyword arguments for exportFontToPath(), or, with fanOut, for
+        # fanout.exportDiscreteInstances()
+        options = dict(compileEngine=self.compileEngine, memoryLimit=self.memoryLimit)
+        if self.fanOut:
+            return dict(options, fanOut=True)
+        return dict(options, profilePath=self.profilePath, liveSource=self.liveSource)
+
+
+def importModules(moduleNames):
+    for moduleName in moduleNames:
+        try:
+            importlib.import_module(moduleName)
+        except ImportError:
+            pass
+
+
+def exportWorkerMain(connection, moduleNames=warmModules):
+    # SIGINT is only honoured while a job is running: it is our cancel signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    warmupStart = time.perf_counter()
+    importModules(moduleNames)
+    connection.send(("ready", time.perf_counter() - warmupStart))
+
+    from .export import exportFontToPath
+    from .fanout import exportDiscreteInstances
+
+    # Log records may be shipped from other threads than progress events
+    sendLock = threading.Lock()
+
+    def sendProgress(jobId, event):
+        with sendLock:
+            connection.send(("progress", jobId, event))
+
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        if message[0] == "warm":
+            importModules(message[1])
+            continue
+
+        jobId, exportArgs, exportOptions = message
+        exportFunction = (
+            exportDiscreteInstances
+            if exportOptions.pop("fanOut", False)
+            else exportFontToPath
+        )
+        logFilePath = exportArgs[-1]
+        workStart = time.perf_counter()
+        # Before "started": the pool only cancels once it received that
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        try:
+            connection.send(("started", jobId))
+            exportFunction(
+                *exportArgs,
+                **exportOptions,
+                progressCallback=lambda event: sendProgress(jobId, event),
+            )
+            status = "done"
+        except KeyboardInterrupt:
+            status = "cancelled"
+        except Exception:
+            status = "failed"
+            with open(logFilePath, "a", encoding="utf-8") as logFile:
+                traceback.print_exc(file=logFile)
+        finally:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        workTime = time.perf_counter() - workStart
+        connection.send(("finished", jobId, status, workTime, getCurrentRSS()))
+
+
+class ExportWorker:
+    def __init__(self, moduleNames=warmModules):
+        self.connection, childConnection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=exportWorkerMain, args=(childConnection, moduleNames)
+        )
+        self.process.start()
+        childConnection.close()
+        self.spawnTime = time.perf_counter()
+        self.warmupTime = None
+        self.job = None
+        self.numJobs = 0
+        self.rss = 0
+        self.retiring = False
+
+    @property
+    def isIdle(self):
+        return self.job is None and not self.retiring
+
+    def send(self, message):
+        try:
+            self.connection.send(message)
+        except OSError:
+            # The worker is gone; the monitor thread will notice its sentinel
+            pass
+
+    def retire(self):
+        self.retiring = True
+        self.send(None)
+
+
+class ExportWorkerPool:
+    def __init__(
+        self,
+        maxWorkers=None,
+        maxJobsPerWorker=defaultMaxJobsPerWorker,
+        maxWorkerRSS=defaultMaxWorkerRSS,
+        numWarmWorkers=1,
+    ):
+        self.maxWorkers = getDefaultMaxWorkers() if maxWorkers is None else maxWorkers
+        self.maxJobsPerWorker = maxJobsPerWorker
+        self.maxWorkerRSS = maxWorkerRSS
+        self.numWarmWorkers = numWarmWorkers
+        # Optional plugins asked for so far, which new workers import too
+        self.optionalModules = set()
+        self.workers = []
+        self.pendingJobs = []
+        self._lock = threading.RLock()
+        self._wakeupReader, self._wakeupWriter = multiprocessing.Pipe(duplex=False)
+        self._monitorThread = None
+        self._shuttingDown = False
+
+    def start(self):
+        with self._lock:
+            self._ensureWarmWorkers()
+        self._monitorThread = threading.Thread(target=self._monitor, daemon=True)
+        self._monitorThread.start()
+
+    def shutdown(self, timeout=2):
+        with self._lock:
+            self._shuttingDown = True
+            workers = list(self.workers)
+            for worker in workers:
+                worker.retire()
+        self._wakeup()
+        for worker in workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+        if self._monitorThread is not None:
+            self._monitorThread.join(timeout)
+
+    def submit(self, job):
+        """Queue `job`, and return it. If an identical job is still pending,
+        `job` is merged into it, and that job is returned instead. A running
+        job doesn't count: the source may have changed since it started.
+        """
+        self.preloadModules(
+            getOptionalModules(
+                job.sourcePath, job.destPath, compileEngine=job.compileEngine
+            )
+        )
+        with self._lock:
+            mergeKey = job.getMergeKey()
+            for pendingJob in self.pendingJobs:
+                if pendingJob.getMergeKey() == mergeKey:
+                    pendingJob.numRequests += 1
+                    return pendingJob
+            job.submitTime = time.perf_counter()
+            self.pendingJobs.append(job)
+            self._dispatch()
+        self._wakeup()
+        return job
+
+    def preloadModules(self, moduleNames):
+        """Have the workers import the optional plugins `moduleNames`, see
+        filetypes.getOptionalModules(), ahead of the jobs that need them.
+        """
+        with self._lock:
+            newModuleNames = sorted(set(moduleNames) - self.optionalModules)
+            if not newModuleNames:
+                return
+            self.optionalModules.update(newModuleNames)
+            for worker in self.workers:
+                if not worker.retiring:
+                    # A busy worker imports them once its job is done
+                    worker.send(("warm", newModuleNames))
+
+    def moveJob(self, job, index):
+        # Reprioritise a pending job: index 0 makes it the next one to run
+        with self._lock:
+            if job not in self.pendingJobs:
+                return False
+            self.pendingJobs.remove(job)
+            if index < 0:
+                index = len(self.pendingJobs) + 1 + index
+            self.pendingJobs.insert(max(0, index), job)
+            return True
+
+    @property
+    def numRunningJobs(self):
+        with self._lock:
+            return sum(worker.job is not None for worker in self.workers)
+
+    def cancel(self, job):
+        with self._lock:
+            if job in self.pendingJobs:
+                self.pendingJobs.remove(job)
+                job.status = "cancelled"
+                finishedJob = job
+            else:
+                finishedJob = None
+                for worker in self.workers:
+                    if worker.job is not job:
+                        continue
+                    if job.status == "starting":
+                        # Until the worker says it started, SIGINT may still
+                        # be ignored: deliver it once it did
+                        job.cancelRequested = True
+                    else:
+                        os.kill(worker.process.pid, signal.SIGINT)
+                    break
+        if finishedJob is not None:
+            self._notifyFinished(finishedJob)
+
+    def _wakeup(self):
+        self._wakeupWriter.send(None)
+
+    def _spawnWorker(self):
+        worker = ExportWorker(warmModules + sorted(self.optionalModules))
+        self.workers.append(worker)
+        return worker
+
+    def _ensureWarmWorkers(self):
+        if self._shuttingDown:
+            return
+        numIdle = sum(worker.isIdle for worker in self.workers)
+        while numIdle < self.numWarmWorkers and len(self.workers) < self.maxWorkers:
+            self._spawnWorker()
+            numIdle += 1
+
+    def _dispatch(self):
+        while self.pendingJobs and not self._shuttingDown:
+            worker = next((w for w in self.workers if w.isIdle), None)
+            if worker is None:
+                if len(self.workers) >= self.maxWorkers:
+                    break
+                worker = self._spawnWorker()
+            job = self.pendingJobs.pop(0)
+            job.status = "starting"
+            worker.job = job
+            # The jobs running side by side share the memory limit
+            exportOptions = job.exportOptions()
+            exportOptions["memoryLimit"] = getSharedMemoryLimit(
+                job.memoryLimit, self.maxWorkers
+            )
+            worker.send((job.jobId, job.exportArgs(), exportOptions))
+        self._ensureWarmWorkers()
+
+    def _monitor(self):
+        while True:
+            with self._lock:
+                if self._shuttingDown and not self.workers:
+                    break
+                waitables = {self._wakeupReader: None}
+                for worker in self.workers:
+                    waitables[worker.connection] = worker
+                    waitables[worker.process.sentinel] = worker
+
+            for ready in wait(list(waitables)):
+                worker = waitables[ready]
+                if worker is None:
+                    self._wakeupReader.recv()
+                elif ready is worker.connection:
+                    if not self._receiveFromWorker(worker):
+                        self._workerExited(worker)
+                else:
+                    self._workerExited(worker)
+
+    def _receiveFromWorker(self, worker):
+        try:
+            message = worker.connection.recv()
+        except (EOFError, OSError):
+            return False
+
+        finishedJob = None
+        progressJob = None
+        with self._lock:
+            match message:
+                case ("ready", warmupTime):
+                    worker.warmupTime = warmupTime
+                    logger.info(
+                        f"export worker {worker.process.pid} warmed up "
+                        f"in {warmupTime:.2f}s"
+                    )
+                case ("started", jobId):
+                    job = worker.job
+                    if job is not None and job.jobId == jobId:
+                        job.status = "running"
+                        if job.cancelRequested:
+                            os.kill(worker.process.pid, signal.SIGINT)
+                        job.startupTime = time.perf_counter() - job.submitTime
+                        progressJob = job
+                        event = dict(event="jobStarted")
+                case ("progress", jobId, event):
+                    job = worker.job
+                    if job is not None and job.jobId == jobId:
+                        progressJob = job
+                case ("finished", jobId, status, workTime, rss):
+                    finishedJob = worker.job
+                    worker.job = None
+                    worker.numJobs += 1
+                    worker.rss = rss
+                    finishedJob.status = status
+                    finishedJob.workTime = workTime
+                    self._maybeRecycle(worker, status)
+                    self._dispatch()
+
+        if progressJob is not None and progressJob.onProgress is not None:
+            progressJob.onProgress(progressJob, event)
+        if finishedJob is not None:
+            self._notifyFinished(finishedJob)
+        return True
+
+    def _maybeRecycle(self, worker, status):
+        reason = None
+        if status == "cancelled":
+            reason = "job was cancelled"
+        elif worker.numJobs >= self.maxJobsPerWorker:
+            reason = f"{worker.numJobs} jobs done"
+        elif worker.rss > self.maxWorkerRSS:
+            reason = f"memory use is {formatBytes(worker.rss)}"
+        if reason is not None:
+            logger.info(f"recycling export worker {worker.process.pid}: {reason}")
+            worker.retire()
+
+    def _workerExited(self, worker):
+        worker.process.join()
+        with self._lock:
+            if worker not in self.workers:
+                return
+        # Messages sent right before exiting may still be in the pipe
+        while worker.connection.poll() and self._receiveFromWorker(worker):
+            pass
+        with self._lock:
+            self.workers.remove(worker)
+            worker.connection.close()
+            crashedJob = worker.job
+            if crashedJob is not None:
+                crashedJob.status = "crashed"
+                crashedJob.exitCode = worker.process.exitcode
+            self._dispatch()
+
+        if crashedJob is not None:
+            logger.warning(
+                f"export worker {worker.process.pid} exited with code "
+                f"{worker.process.exitcode} during job {crashedJob.jobId}"
+            )
+            self._notifyFinished(crashedJob)
+
+    def _notifyFinished(self, job):
+        logger.info(
+            f"export job {job.jobId} {job.status}: "
+            f"startup {job.startupTime:.2f}s, work {job.workTime:.2f}s "
+            f"({os.path.basename(job.destPath)})"
+        )
+        if job.onFinished is not None:
+            job.onFinished(job)
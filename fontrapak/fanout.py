@@ -0,0 +1,210 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import pathlib
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from .export import exportFontToPath
+from .memorylimit import getSharedMemoryLimit
+from .progress import getTimingReportPath
+from .snapshot import SnapshotCache, allSnapshotExtensions
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(kw_only=True)
+class DiscreteInstance:
+    location: dict
+    destPath: pathlib.Path
+    logFilePath: str
+
+
+def getValueName(axis, value):
+    for valueLabel in axis.valueLabels:
+        if valueLabel.value == value:
+            return valueLabel.name.replace(" ", "")
+    return f"{axis.name}{value:g}"
+
+
+def getDiscreteInstances(discreteAxes, destPath, logFilePath):
+    """One instance per combination of discrete axis values, each written next
+    to `destPath`, as <stem>-<value names><suffix>.
+    """
+    destPath = pathlib.Path(destPath)
+    instances = []
+    for values in itertools.product(*(axis.values for axis in discreteAxes)):
+        nameParts = [
+            getValueName(axis, value) for axis, value in zip(discreteAxes, values)
+        ]
+        suffix = "-" + "-".join(nameParts)
+        instances.append(
+            DiscreteInstance(
+                location={
+                    axis.name: value for axis, value in zip(discreteAxes, values)
+                },
+                destPath=destPath.with_name(destPath.stem + suffix + destPath.suffix),
+                logFilePath=logFilePath + suffix,
+            )
+        )
+    return instances
+
+
+async def prepareSource(sourcePath):
+    # Parse the source once, leaving a snapshot for the instance processes to
+    # open instead of parsing it again. Returns the discrete axes, read from
+    # the snapshot once it is written, so the source isn't parsed twice.
+    from fontra.core.classes import DiscreteFontAxis
+
+    snapshotCache = SnapshotCache(extensions=allSnapshotExtensions)
+    await snapshotCache.ensureSnapshot(sourcePath)
+    sourceBackend = snapshotCache.openBackend(sourcePath)
+    try:
+        axes = await sourceBackend.getAxes()
+    finally:
+        await sourceBackend.aclose()
+        # Should the snapshot have failed, openBackend() tried again
+        await snapshotCache.flush()
+    return [axis for axis in axes.axes if isinstance(axis, DiscreteFontAxis)]
+
+
+def exportInstance(
+    sourcePath, fileExtension, instance, compileEngine=None, memoryLimit=None
+):
+    start = time.perf_counter()
+    try:
+        report = exportFontToPath(
+            sourcePath,
+            instance.destPath,
+            fileExtension,
+            instance.logFilePath,
+            discreteLocation=instance.location,
+            compileEngine=compileEngine,
+            memoryLimit=memoryLimit,
+        )
+    except Exception:
+        with open(instance.logFilePath, "a", encoding="utf-8") as logFile:
+            traceback.print_exc(file=logFile)
+        report = None
+    return dict(
+        location=instance.location,
+        destination=os.fspath(instance.destPath),
+        status="done" if report is not None else "failed",
+        totalTime=time.perf_counter() - start,
+        glyphs=(
+            max((stage["glyphs"] for stage in report["stages"]), default=0)
+            if report is not None
+            else 0
+        ),
+    )
+
+
+def exportDiscreteInstances(
+    sourcePath,
+    destPath,
+    fileExtension,
+    logFilePath,
+    *,
+    progressCallback=None,
+    numWorkers=None,
+    compileEngine=None,
+    memoryLimit=None,
+):
+    """Export every discrete axis location of `sourcePath` to its own binary
+    font, compiling them in parallel. Without discrete axes, this is the same
+    as exportFontToPath(). Raises an exception if any instance failed, after
+    appending the instance logs to `logFilePath`. `progressCallback` gets
+    an "instances" event each time an instance is done.
+    """
+    sourcePath = pathlib.Path(sourcePath)
+    destPath = pathlib.Path(destPath)
+    start = time.perf_counter()
+    if progressCallback is not None:
+        progressCallback(dict(event="stageStarted", stage="open"))
+    discreteAxes = asyncio.run(prepareSource(sourcePath))
+    if not discreteAxes:
+        return exportFontToPath(
+            sourcePath,
+            destPath,
+            fileExtension,
+            logFilePath,
+            progressCallback=progressCallback,
+            compileEngine=compileEngine,
+            memoryLimit=memoryLimit,
+        )
+
+    instances = getDiscreteInstances(discreteAxes, destPath, logFilePath)
+    numWorkers = min(numWorkers or os.cpu_count() or 1, len(instances))
+    # The instance processes run side by side: they share the limit
+    instanceMemoryLimit = getSharedMemoryLimit(memoryLimit, numWorkers)
+    results = []
+
+    def sendProgress():
+        if progressCallback is not None:
+            progressCallback(
+                dict(event="instances", done=len(results), total=len(instances))
+            )
+
+    sendProgress()
+    with ProcessPoolExecutor(max_workers=numWorkers) as executor:
+        futures = [
+            executor.submit(
+                exportInstance,
+                sourcePath,
+                fileExtension,
+                instance,
+                compileEngine,
+                instanceMemoryLimit,
+            )
+            for instance in instances
+        ]
+        try:
+            for future in as_completed(futures):
+                results.append(future.result())
+                sendProgress()
+        except KeyboardInterrupt:
+            # Cancelled: the instances that are running finish, no more start
+            executor.shutdown(cancel_futures=True)
+            raise
+    wallTime = time.perf_counter() - start
+
+    # Instance processes each measure their own time: their sum is what a
+    # serial export would have taken
+    serialTime = sum(result["totalTime"] for result in results)
+    report = dict(
+        source=os.fspath(sourcePath),
+        format=fileExtension,
+        wallTime=wallTime,
+        serialTime=serialTime,
+        speedup=serialTime / wallTime if wallTime else 0,
+        numWorkers=numWorkers,
+        instances=sorted(results, key=lambda result: result["destination"]),
+    )
+    with open(getTimingReportPath(destPath), "w", encoding="utf-8") as reportFile:
+        json.dump(report, reportFile, indent=2)
+        reportFile.write("\n")
+    logger.info(
+        f"exported {len(instances)} instances in {wallTime:.2f}s wall time, "
+        f"{serialTime:.2f}s serial ({report['speedup']:.1f}x)"
+    )
+
+    with open(logFilePath, "a", encoding="utf-8") as logFile:
+        for instance in instances:
+            if os.path.exists(instance.logFilePath):
+                with open(instance.logFilePath, encoding="utf-8") as instanceLog:
+                    logFile.write(f"--- {instance.destPath.name}\n")
+                    logFile.write(instanceLog.read())
+                os.unlink(instance.logFilePath)
+
+    failed = [result for result in results if result["status"] != "done"]
+    if failed:
+        names = ", ".join(pathlib.Path(result["destination"]).name for result in failed)
+        raise RuntimeError(
+            f"{len(failed)} of {len(instances)} instances failed: {names}"
+        )
+
+    return report
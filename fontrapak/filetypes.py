@@ -0,0 +1,63 @@
+import os
+
+from .compileengines import getCompileEngine
+
+fileTypes = [
+    # name, extension
+    ("Designspace", "designspace"),
+    ("Fontra", "fontra"),
+    ("RoboCJK", "rcjk"),
+    ("Unified Font Object", "ufo"),
+]
+
+fileTypesMapping = {
+    f"{name} (*.{extension})": f".{extension}" for name, extension in fileTypes
+}
+
+exportFileTypes = [
+    # name, extension
+    ("TrueType", "ttf"),
+    ("OpenType", "otf"),
+    ("WOFF", "woff"),
+    ("WOFF2", "woff2"),
+] + fileTypes
+
+exportFileTypesMapping = {
+    f"{name} (*.{extension})": f".{extension}" for name, extension in exportFileTypes
+}
+
+exportExtensionMapping = {v: k for k, v in exportFileTypesMapping.items()}
+
+# What can be exported with one font per discrete axis location, see fanout.py
+fanOutFileExtensions = ["ttf", "otf"]
+
+# Plugins that are only imported once a file that needs them is opened or
+# exported, by file extension: the backends for source formats. Binary formats
+# need the plugins of the engine compiling them instead, see compileengines.py.
+optionalModules = {
+    "glyphs": ["fontra_glyphs"],
+    "glyphspackage": ["fontra_glyphs"],
+    "rcjk": ["fontra_rcjk"],
+}
+
+# The format compiled for each binary format: WOFF and WOFF2 are derived from a
+# compiled TrueType font, see webfonts.writeOutput()
+compiledFileExtensions = {"ttf": "ttf", "otf": "otf", "woff": "ttf", "woff2": "ttf"}
+
+binaryFileExtensions = list(compiledFileExtensions)
+
+
+def getBaseFileExtension(fileExtension):
+    # The compiled format a binary output is made from
+    return compiledFileExtensions[fileExtension]
+
+
+def getOptionalModules(*paths, compileEngine=None):
+    moduleNames = set()
+    for path in paths:
+        extension = os.path.splitext(os.fspath(path))[1].lstrip(".").lower()
+        moduleNames.update(optionalModules.get(extension, ()))
+        if extension in compiledFileExtensions:
+            engine = getCompileEngine(compileEngine, getBaseFileExtension(extension))
+            moduleNames.update(engine.moduleNames)
+    return sorted(moduleNames)
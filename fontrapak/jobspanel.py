@@ -0,0 +1,258 @@
+import os
+import time
+
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtWidgets import (
+    QAbstractItemView,
+    QHBoxLayout,
+    QHeaderView,
+    QProgressBar,
+    QPushButton,
+    QTreeWidget,
+    QTreeWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from .progress import formatDuration
+
+maxLogLineLength = 100
+
+exportStageLabels = {
+    "open": "Opening the source",
+    "hash sources": "Checking the export cache",
+    "compile": "Compiling",
+    "copy": "Copying glyphs",
+    "write outputs": "Writing the output files",
+}
+
+jobStatusLabels = {
+    "pending": "Queued",
+    "starting": "Starting",
+    "running": "Running",
+    "done": "Done",
+    "failed": "Failed",
+    "cancelled": "Cancelled",
+    "crashed": "Crashed",
+}
+
+fileColumn, formatColumn, statusColumn, progressColumn, timeColumn = range(5)
+
+
+class JobRow:
+    def __init__(self, job, item, progressBar):
+        self.job = job
+        self.item = item
+        self.progressBar = progressBar
+        self.stageLabel = ""
+        self.stageStartTime = time.perf_counter()
+        self.startTime = None
+        self.logLine = ""
+
+
+class ExportJobsPanel(QWidget):
+    """Lists the queued, running and finished exports, with their progress.
+    Queued jobs can be moved to the front or cancelled; `showJobDetails` is
+    called for a finished job on request.
+    """
+
+    def __init__(self, exportPool, showJobDetails, parent=None):
+        super().__init__(parent)
+        self.exportPool = exportPool
+        self.showJobDetails = showJobDetails
+        self.rows = {}
+
+        self.tree = QTreeWidget(self)
+        self.tree.setColumnCount(5)
+        self.tree.setHeaderLabels(["File", "Format", "Status", "Progress", "Time"])
+        self.tree.setRootIsDecorated(False)
+        self.tree.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.tree.header().setSectionResizeMode(
+            fileColumn, QHeaderView.ResizeMode.Stretch
+        )
+        self.tree.itemSelectionChanged.connect(self.updateButtons)
+        self.tree.itemDoubleClicked.connect(lambda item, column: self.showDetails())
+
+        self.runNextButton = QPushButton("Run Next", self)
+        self.runNextButton.setToolTip("Run the selected queued export first")
+        self.runNextButton.clicked.connect(self.runNext)
+        self.cancelButton = QPushButton("Cancel", self)
+        self.cancelButton.clicked.connect(self.cancelJob)
+        self.detailsButton = QPushButton("Details…", self)
+        self.detailsButton.clicked.connect(self.showDetails)
+        self.clearButton = QPushButton("Clear Finished", self)
+        self.clearButton.clicked.connect(self.clearFinished)
+
+        buttonLayout = QHBoxLayout()
+        for button in [self.runNextButton, self.cancelButton, self.detailsButton]:
+            buttonLayout.addWidget(button)
+        buttonLayout.addStretch()
+        buttonLayout.addWidget(self.clearButton)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.tree)
+        layout.addLayout(buttonLayout)
+
+        # Running jobs' times tick even when there's no progress to report
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.updateTimes)
+        self.timer.start(1000)
+
+        self.updateButtons()
+
+    def addJob(self, job):
+        row = self.rows.get(job.jobId)
+        if row is not None:
+            # An identical request was merged into this queued job
+            row.item.setToolTip(fileColumn, f"Requested {job.numRequests} times")
+            return
+        item = QTreeWidgetItem(
+            [os.path.basename(job.destPath), job.fileExtension, "", "", ""]
+        )
+        item.setToolTip(fileColumn, os.fspath(job.destPath))
+        item.setData(fileColumn, Qt.ItemDataRole.UserRole, job.jobId)
+        self.tree.addTopLevelItem(item)
+        row = self.rows[job.jobId] = JobRow(job, item, self.addProgressBar(item))
+        self.updateRow(row)
+
+    def addProgressBar(self, item):
+        progressBar = QProgressBar(self.tree)
+        progressBar.setTextVisible(False)
+        self.tree.setItemWidget(item, progressColumn, progressBar)
+        return progressBar
+
+    def jobProgress(self, job, event):
+        row = self.rows.get(job.jobId)
+        if row is None:
+            return
+
+        match event["event"]:
+            case "jobStarted":
+                row.startTime = time.perf_counter()
+            case "log":
+                # The latest log record, shipped while the export runs
+                row.logLine = event["lines"][-1]
+                if len(row.logLine) > maxLogLineLength:
+                    row.logLine = row.logLine[: maxLogLineLength - 1] + "…"
+                row.item.setToolTip(statusColumn, row.logLine)
+            case "stageStarted":
+                row.stageLabel = exportStageLabels.get(event["stage"], event["stage"])
+                row.stageStartTime = time.perf_counter()
+                row.item.setText(statusColumn, f"{row.stageLabel}…")
+                row.progressBar.setRange(0, 0)
+            case "glyphs":
+                done, total = event["done"], event["total"]
+                if done and done < total:
+                    elapsed = time.perf_counter() - row.stageStartTime
+                    timeLeft = formatDuration(elapsed / done * (total - done))
+                    row.progressBar.setRange(0, total)
+                    row.progressBar.setValue(done)
+                    row.item.setText(
+                        statusColumn,
+                        f"{row.stageLabel}: {done} of {total} glyphs, "
+                        f"about {timeLeft} left",
+                    )
+                else:
+                    # All glyphs are read, the compiler is doing the rest
+                    row.progressBar.setRange(0, 0)
+                    row.item.setText(statusColumn, f"{row.stageLabel}…")
+            case "instances":
+                # A fan-out export: one font per discrete axis location
+                done, total = event["done"], event["total"]
+                row.progressBar.setRange(0, total)
+                row.progressBar.setValue(done)
+                row.item.setText(statusColumn, f"Compiling: {done} of {total} fonts")
+
+    def jobFinished(self, job):
+        row = self.rows.get(job.jobId)
+        if row is not None:
+            self.updateRow(row)
+        self.updateButtons()
+
+    def updateRow(self, row):
+        job = row.job
+        if job.status != "running" or not row.item.text(statusColumn):
+            row.item.setText(statusColumn, jobStatusLabels.get(job.status, job.status))
+        if job.isFinished:
+            row.progressBar.setRange(0, 1)
+            row.progressBar.setValue(1 if job.succeeded else 0)
+            row.item.setText(timeColumn, formatDuration(job.workTime))
+            if not job.succeeded and job.status != "cancelled":
+                row.item.setForeground(statusColumn, Qt.GlobalColor.red)
+        elif job.status == "pending":
+            row.progressBar.setRange(0, 1)
+            row.progressBar.setValue(0)
+
+    def updateTimes(self):
+        now = time.perf_counter()
+        for row in self.rows.values():
+            if row.job.status == "running" and row.startTime is not None:
+                row.item.setText(timeColumn, formatDuration(now - row.startTime))
+        self.updateButtons()
+
+    def selectedRow(self):
+        items = self.tree.selectedItems()
+        if not items:
+            return None
+        return self.rows.get(items[0].data(fileColumn, Qt.ItemDataRole.UserRole))
+
+    def updateButtons(self):
+        row = self.selectedRow()
+        status = row.job.status if row is not None else None
+        self.runNextButton.setEnabled(status == "pending")
+        self.cancelButton.setEnabled(status in {"pending", "starting", "running"})
+        self.detailsButton.setEnabled(row is not None and row.job.isFinished)
+        self.clearButton.setEnabled(
+            any(row.job.isFinished for row in self.rows.values())
+        )
+
+    def runNext(self):
+        row = self.selectedRow()
+        if row is None or not self.exportPool.moveJob(row.job, 0):
+            return
+        # Keep the list in the order the queue will run in
+        index = self.tree.indexOfTopLevelItem(row.item)
+        firstPendingIndex = min(
+            self.tree.indexOfTopLevelItem(r.item)
+            for r in self.rows.values()
+            if r.job.status == "pending"
+        )
+        if index > firstPendingIndex:
+            progressBar = row.progressBar
+            self.tree.takeTopLevelItem(index)
+            self.tree.insertTopLevelItem(firstPendingIndex, row.item)
+            # The item widget doesn't survive the move
+            row.progressBar = self.addProgressBar(row.item)
+            progressBar.deleteLater()
+            self.updateRow(row)
+            self.tree.setCurrentItem(row.item)
+
+    def cancelJob(self):
+        row = self.selectedRow()
+        if row is not None:
+            self.exportPool.cancel(row.job)
+
+    def showDetails(self):
+        row = self.selectedRow()
+        if row is not None and row.job.isFinished:
+            self.showJobDetails(row.job)
+
+    def clearFinished(self):
+        for jobId, row in list(self.rows.items()):
+            if row.job.isFinished:
+                self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(row.item))
+                del self.rows[jobId]
+                removeJobFiles(row.job)
+        self.updateButtons()
+
+    def clearAll(self):
+        for row in self.rows.values():
+            removeJobFiles(row.job)
+        self.rows.clear()
+        self.tree.clear()
+
+
+def removeJobFiles(job):
+    if os.path.exists(job.logFilePath):
+        os.unlink(job.logFilePath)
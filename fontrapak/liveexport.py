@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+import secrets
+from urllib.parse import quote
+
+from .server import isLocalRequest
+
+logger = logging.getLogger(__name__)
+
+
+# Served by the server process to export processes, which read the project
+# from its loaded FontHandler instead of parsing it again from disk
+liveFontPath = "/fontrapak/live/font"
+liveGlyphsPath = "/fontrapak/live/glyphs"
+liveTokenHeader = "X-Fontra-Pak-Token"
+
+maxGlyphBatchSize = 256
+
+
+def makeLiveExportToken():
+    return secrets.token_hex(16)
+
+
+def makeLiveExportMiddleware(projectManager, token):
+    from aiohttp import web
+    from fontra.core.classes import unstructure
+
+    def dumps(data):
+        return json.dumps(data, separators=(",", ":"))
+
+    async def getFont(fontHandler):
+        (
+            glyphMap,
+            axes,
+            sources,
+            unitsPerEm,
+            fontInfo,
+            kerning,
+            features,
+            customData,
+        ) = await asyncio.gather(
+            fontHandler.getGlyphMap(),
+            fontHandler.getAxes(),
+            fontHandler.getSources(),
+            fontHandler.getUnitsPerEm(),
+            fontHandler.getFontInfo(),
+            fontHandler.getKerning(),
+            fontHandler.getFeatures(),
+            fontHandler.getCustomData(),
+        )
+        return dict(
+            glyphMap=glyphMap,
+            axes=unstructure(axes),
+            sources=unstructure(sources),
+            unitsPerEm=unitsPerEm,
+            fontInfo=unstructure(fontInfo),
+            kerning=unstructure(kerning),
+            features=unstructure(features),
+            customData=customData,
+        )
+
+    async def getGlyphs(fontHandler, glyphNames):
+        glyphs = await asyncio.gather(
+            *(fontHandler.getGlyph(glyphName) for glyphName in glyphNames)
+        )
+        return {
+            glyphName: unstructure(glyph) if glyph is not None else None
+            for glyphName, glyph in zip(glyphNames, glyphs)
+        }
+
+    @web.middleware
+    async def liveExportMiddleware(request, handler):
+        if request.path not in {liveFontPath, liveGlyphsPath}:
+            return await handler(request)
+        if not isLocalRequest(request) or request.headers.get(liveTokenHeader) != token:
+            raise web.HTTPForbidden()
+
+        projectIdentifier = request.query.get("project")
+        if not projectIdentifier:
+            raise web.HTTPBadRequest()
+        try:
+            fontHandler = await projectManager.getFontHandler(projectIdentifier)
+        except FileNotFoundError:
+            raise web.HTTPNotFound()
+
+        if request.path == liveFontPath:
+            data = await getFont(fontHandler)
+        else:
+            glyphNames = (await request.json())["glyphNames"]
+            data = await getGlyphs(fontHandler, glyphNames)
+        return web.json_response(data, dumps=dumps)
+
+    return liveExportMiddleware
+
+
+class LiveServerBackend:
+    """A read-only backend that reads a project from the Fontra Pak server
+    that has it open. Concurrent getGlyph() calls are sent as one request.
+    """
+
+    # Its HTTP session belongs to the loop connect() ran on: it must not be
+    # driven from another thread's loop, see pipelinedcopy.ThreadedBackend
+    isLoopBound = True
+
+    def __init__(self, serverURL, token, projectIdentifier):
+        self.serverURL = serverURL
+        self.token = token
+        self.projectIdentifier = projectIdentifier
+        self._session = None
+        self._font = None
+        self._pendingGlyphs = {}
+        self._flushHandle = None
+        self._tasks = set()
+        self.numRequests = 0
+
+    def _getURL(self, path):
+        return f"{self.serverURL}{path}?project={quote(self.projectIdentifier)}"
+
+    async def connect(self):
+        # Fetches the font-level data, so a server that's gone is noticed
+        # before the export gets going
+        import aiohttp
+        from fontra.core.classes import (
+            Axes,
+            FontInfo,
+            FontSource,
+            Kerning,
+            OpenTypeFeatures,
+            structure,
+        )
+
+        self._session = aiohttp.ClientSession(headers={liveTokenHeader: self.token})
+        try:
+            data = await self._request("GET", liveFontPath)
+        except BaseException:
+            await self.aclose()
+            raise
+        self._font = dict(
+            glyphMap=data["glyphMap"],
+            axes=structure(data["axes"], Axes),
+            sources=structure(data["sources"], dict[str, FontSource]),
+            unitsPerEm=data["unitsPerEm"],
+            fontInfo=structure(data["fontInfo"], FontInfo),
+            kerning=structure(data["kerning"], dict[str, Kerning]),
+            features=structure(data["features"], OpenTypeFeatures),
+            customData=data["customData"],
+        )
+
+    async def _request(self, method, path, payload=None):
+        self.numRequests += 1
+        async with self._session.request(
+            method, self._getURL(path), json=payload
+        ) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def aclose(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def getGlyphMap(self):
+        return self._font["glyphMap"]
+
+    async def getAxes(self):
+        return self._font["axes"]
+
+    async def getSources(self):
+        return self._font["sources"]
+
+    async def getUnitsPerEm(self):
+        return self._font["unitsPerEm"]
+
+    async def getFontInfo(self):
+        return self._font["fontInfo"]
+
+    async def getKerning(self):
+        return self._font["kerning"]
+
+    async def getFeatures(self):
+        return self._font["features"]
+
+    async def getCustomData(self):
+        return self._font["customData"]
+
+    async def getBackgroundImage(self, imageIdentifier):
+        return None
+
+    async def getGlyph(self, glyphName):
+        future = self._pendingGlyphs.get(glyphName)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pendingGlyphs[glyphName] = loop.create_future()
+            if self._flushHandle is None:
+                # Collect the names asked for in this loop iteration
+                self._flushHandle = loop.call_soon(self._flushGlyphRequests)
+        return await asyncio.shield(future)
+
+    def _flushGlyphRequests(self):
+        self._flushHandle = None
+        pendingGlyphs, self._pendingGlyphs = self._pendingGlyphs, {}
+        glyphNames = list(pendingGlyphs)
+        while glyphNames:
+            batchNames = glyphNames[:maxGlyphBatchSize]
+            del glyphNames[:maxGlyphBatchSize]
+            batch = {glyphName: pendingGlyphs[glyphName] for glyphName in batchNames}
+            task = asyncio.create_task(self._fetchGlyphs(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetchGlyphs(self, futures):
+        from fontra.core.classes import VariableGlyph, structure
+
+        try:
+            data = await self._request(
+                "POST", liveGlyphsPath, dict(glyphNames=list(futures))
+            )
+        except BaseException as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        for glyphName, future in futures.items():
+            glyphData = data.get(glyphName)
+            if not future.done():
+                future.set_result(
+                    structure(glyphData, VariableGlyph)
+                    if glyphData is not None
+                    else None
+                )
+
+
+async def openLiveBackend(liveSource):
+    """Return a LiveServerBackend for `liveSource`, a dict with serverURL,
+    token and projectIdentifier, or None if the server can't provide the
+    project.
+    """
+    backend = LiveServerBackend(**liveSource)
+    try:
+        await backend.connect()
+    except Exception as e:
+        logger.warning(f"can't read the project from the server: {e!r}")
+        return None
+    logger.info(f"reading '{backend.projectIdentifier}' from the server")
+    return backend
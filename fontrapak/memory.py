@@ -0,0 +1,257 @@
+import os
+import sys
+
+if sys.platform == "win32":
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    def _getMemoryCounters():
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(),
+            ctypes.byref(counters),
+            counters.cb,
+        )
+        return counters
+
+    def getCurrentRSS():
+        return _getMemoryCounters().WorkingSetSize
+
+    def getPeakRSS():
+        return _getMemoryCounters().PeakWorkingSetSize
+
+    def getPeakChildRSS():
+        # Not tracked for child processes on Windows
+        return None
+
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    TH32CS_SNAPPROCESS = 0x2
+    INVALID_HANDLE_VALUE = wintypes.HANDLE(-1).value
+
+    class PROCESSENTRY32W(ctypes.Structure):
+        _fields_ = [
+            ("dwSize", wintypes.DWORD),
+            ("cntUsage", wintypes.DWORD),
+            ("th32ProcessID", wintypes.DWORD),
+            ("th32DefaultHeapID", ctypes.c_size_t),
+            ("th32ModuleID", wintypes.DWORD),
+            ("cntThreads", wintypes.DWORD),
+            ("th32ParentProcessID", wintypes.DWORD),
+            ("pcPriClassBase", ctypes.c_long),
+            ("dwFlags", wintypes.DWORD),
+            ("szExeFile", ctypes.c_wchar * 260),
+        ]
+
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    _kernel32.OpenProcess.restype = wintypes.HANDLE
+    _kernel32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+    _kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+
+    def getProcessRSS(pid=None):
+        if pid is None:
+            return getCurrentRSS()
+        processHandle = _kernel32.OpenProcess(
+            PROCESS_QUERY_LIMITED_INFORMATION, False, pid
+        )
+        if not processHandle:
+            return None
+        try:
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            if not ctypes.windll.psapi.GetProcessMemoryInfo(
+                wintypes.HANDLE(processHandle), ctypes.byref(counters), counters.cb
+            ):
+                return None
+            return counters.WorkingSetSize
+        finally:
+            _kernel32.CloseHandle(processHandle)
+
+    def getChildPIDs(pid=None):
+        # From a Toolhelp snapshot of all processes and their parents
+        if pid is None:
+            pid = os.getpid()
+        snapshotHandle = _kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
+        if snapshotHandle in (None, INVALID_HANDLE_VALUE):
+            return []
+        childPIDs = []
+        try:
+            entry = PROCESSENTRY32W()
+            entry.dwSize = ctypes.sizeof(entry)
+            hasEntry = _kernel32.Process32FirstW(
+                wintypes.HANDLE(snapshotHandle), ctypes.byref(entry)
+            )
+            while hasEntry:
+                if entry.th32ParentProcessID == pid and entry.th32ProcessID != pid:
+                    childPIDs.append(entry.th32ProcessID)
+                hasEntry = _kernel32.Process32NextW(
+                    wintypes.HANDLE(snapshotHandle), ctypes.byref(entry)
+                )
+        finally:
+            _kernel32.CloseHandle(snapshotHandle)
+        return childPIDs
+
+    class MEMORYSTATUSEX(ctypes.Structure):
+        _fields_ = [
+            ("dwLength", wintypes.DWORD),
+            ("dwMemoryLoad", wintypes.DWORD),
+            ("ullTotalPhys", ctypes.c_ulonglong),
+            ("ullAvailPhys", ctypes.c_ulonglong),
+            ("ullTotalPageFile", ctypes.c_ulonglong),
+            ("ullAvailPageFile", ctypes.c_ulonglong),
+            ("ullTotalVirtual", ctypes.c_ulonglong),
+            ("ullAvailVirtual", ctypes.c_ulonglong),
+            ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+        ]
+
+    def getPhysicalMemory():
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(status)
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return None
+        return status.ullTotalPhys
+
+else:
+    import resource
+
+    # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    _maxRSSFactor = 1 if sys.platform == "darwin" else 1024
+
+    def getPeakRSS():
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _maxRSSFactor
+
+    def getPeakChildRSS():
+        # Of the largest terminated and waited-for child process
+        return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * _maxRSSFactor
+
+    def getCurrentRSS():
+        rss = getProcessRSS()
+        # Neither procfs nor libproc: the peak is the best cheap approximation
+        return getPeakRSS() if rss is None else rss
+
+    if sys.platform == "darwin":
+        import ctypes
+        import ctypes.util
+
+        PROC_PIDTASKINFO = 4
+
+        class proc_taskinfo(ctypes.Structure):
+            _fields_ = [
+                ("pti_virtual_size", ctypes.c_uint64),
+                ("pti_resident_size", ctypes.c_uint64),
+                ("pti_total_user", ctypes.c_uint64),
+                ("pti_total_system", ctypes.c_uint64),
+                ("pti_threads_user", ctypes.c_uint64),
+                ("pti_threads_system", ctypes.c_uint64),
+                ("pti_policy", ctypes.c_int32),
+                ("pti_faults", ctypes.c_int32),
+                ("pti_pageins", ctypes.c_int32),
+                ("pti_cow_faults", ctypes.c_int32),
+                ("pti_messages_sent", ctypes.c_int32),
+                ("pti_messages_received", ctypes.c_int32),
+                ("pti_syscalls_mach", ctypes.c_int32),
+                ("pti_syscalls_unix", ctypes.c_int32),
+                ("pti_csw", ctypes.c_int32),
+                ("pti_threadnum", ctypes.c_int32),
+                ("pti_numrunning", ctypes.c_int32),
+                ("pti_priority", ctypes.c_int32),
+            ]
+
+        _libproc = ctypes.CDLL(ctypes.util.find_library("proc") or "libproc.dylib")
+
+        def getProcessRSS(pid=None):
+            taskInfo = proc_taskinfo()
+            size = _libproc.proc_pidinfo(
+                pid or os.getpid(),
+                PROC_PIDTASKINFO,
+                ctypes.c_uint64(0),
+                ctypes.byref(taskInfo),
+                ctypes.sizeof(taskInfo),
+            )
+            if size < ctypes.sizeof(taskInfo):
+                return None
+            return taskInfo.pti_resident_size
+
+        def getChildPIDs(pid=None):
+            maxChildren = 64
+            while True:
+                buffer = (ctypes.c_int * maxChildren)()
+                numChildren = _libproc.proc_listchildpids(
+                    pid or os.getpid(), buffer, ctypes.sizeof(buffer)
+                )
+                if numChildren <= 0:
+                    return []
+                if numChildren < maxChildren:
+                    # The buffer is zeroed, so unused entries are dropped
+                    return [childPID for childPID in buffer if childPID]
+                maxChildren *= 4
+
+    else:
+
+        def getProcessRSS(pid=None):
+            try:
+                with open(f"/proc/{pid or 'self'}/statm") as f:
+                    residentPages = int(f.read().split()[1])
+            except (OSError, ValueError, IndexError):
+                return None
+            return residentPages * os.sysconf("SC_PAGE_SIZE")
+
+        def getChildPIDs(pid=None):
+            # Needs procfs: without it, process tree figures are our own
+            taskDir = f"/proc/{pid or 'self'}/task"
+            childPIDs = []
+            try:
+                for threadID in os.listdir(taskDir):
+                    with open(f"{taskDir}/{threadID}/children") as f:
+                        childPIDs.extend(int(childPID) for childPID in f.read().split())
+            except (OSError, ValueError):
+                pass
+            return childPIDs
+
+    def getPhysicalMemory():
+        try:
+            return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        except (OSError, ValueError):
+            return None
+
+
+def getDescendantPIDs(pid=None):
+    descendantPIDs = []
+    pendingPIDs = getChildPIDs(pid)
+    while pendingPIDs:
+        childPID = pendingPIDs.pop()
+        # Reused PIDs (Windows) can make parent links loop
+        if childPID in descendantPIDs or childPID == pid:
+            continue
+        descendantPIDs.append(childPID)
+        pendingPIDs.extend(getChildPIDs(childPID))
+    return descendantPIDs
+
+
+def getProcessTreeRSS():
+    # Our own RSS plus that of the processes we started, such as fontmake
+    return getCurrentRSS() + sum(
+        getProcessRSS(childPID) or 0 for childPID in getDescendantPIDs()
+    )
+
+
+def formatBytes(numBytes):
+    for unit in ["B", "KB", "MB"]:
+        if numBytes < 1024:
+            return f"{numBytes:.0f} {unit}"
+        numBytes /= 1024
+    return f"{numBytes:.1f} GB"
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import os
+import re
+import signal
+import threading
+
+from .backendproxy import ReadableBackendProxy
+from .memory import formatBytes, getDescendantPIDs, getPhysicalMemory, getProcessTreeRSS
+
+logger = logging.getLogger(__name__)
+
+
+# For example "6G" or "6144M"; "off" disables the limit
+memoryLimitEnvironmentVariable = "FONTRA_PAK_MEMORY_LIMIT"
+
+# Without an explicit limit, exports stop before they push the machine into
+# swap. The limit is shared by the exports that run side by side, see
+# getSharedMemoryLimit().
+defaultMemoryLimitFraction = 0.8
+
+defaultSampleInterval = 0.1
+
+# getGlyph() calls in flight at any one time, over all workflow outputs
+defaultMaxPendingGlyphs = 32
+
+_byteSizeUnits = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+class MemoryLimitExceeded(Exception):
+    pass
+
+
+def parseByteSize(text):
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*", text.upper())
+    if match is None:
+        raise ValueError(f"expected a size such as 512M or 4G, got {text!r}")
+    number, unit = match.groups()
+    return int(float(number) * _byteSizeUnits[unit])
+
+
+def getMemoryLimit(memoryLimit=None):
+    """Return the memory limit in bytes, or None for no limit. `memoryLimit`
+    may be a number of bytes, a size string such as "4G", or "off". If it is
+    None, the environment variable or the default is used.
+    """
+    if memoryLimit is None:
+        memoryLimit = os.environ.get(memoryLimitEnvironmentVariable)
+    if memoryLimit is None:
+        physicalMemory = getPhysicalMemory()
+        if physicalMemory is None:
+            return None
+        return int(physicalMemory * defaultMemoryLimitFraction)
+    if isinstance(memoryLimit, str):
+        if memoryLimit.strip().lower() in {"off", "none", "0"}:
+            return None
+        memoryLimit = parseByteSize(memoryLimit)
+    return memoryLimit or None
+
+
+def getSharedMemoryLimit(memoryLimit, numExports):
+    """Return the limit for each of `numExports` exports that run side by side,
+    so that together they stay within `memoryLimit`, as for getMemoryLimit().
+    """
+    memoryLimit = getMemoryLimit(memoryLimit)
+    return "off" if memoryLimit is None else memoryLimit // max(1, numExports)
+
+
+class MemoryMonitor:
+    """Samples the RSS of this process and its descendants on a thread of its
+    own, keeping track of the overall peak and the peak per stage.
+
+    When the limit is exceeded, the processes we started (fontmake) are
+    terminated, the task in run() is cancelled and re-raised as
+    MemoryLimitExceeded, and check() raises it too, for code that doesn't
+    reach an await in time.
+    """
+
+    def __init__(self, limit=None, interval=defaultSampleInterval):
+        self.limit = limit
+        self.interval = interval
+        self.stage = None
+        self.rss = 0
+        self.peakRSS = 0
+        self.stagePeakRSS = 0
+        self.exceeded = None
+        self._loop = None
+        self._task = None
+        self._initialDescendantPIDs = set()
+        self._stopEvent = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self._initialDescendantPIDs = set(getDescendantPIDs())
+        self.sample()
+        self._thread = threading.Thread(
+            target=self._sampleLoop, name="fontra-pak-memory-monitor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.sample()
+
+    def startStage(self, stage):
+        self.stage = stage
+        self.stagePeakRSS = self.rss
+
+    def _sampleLoop(self):
+        while not self._stopEvent.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        rss = getProcessTreeRSS()
+        self.rss = rss
+        self.peakRSS = max(self.peakRSS, rss)
+        self.stagePeakRSS = max(self.stagePeakRSS, rss)
+        if self.limit is not None and rss > self.limit and self.exceeded is None:
+            self.exceeded = (rss, self.stage)
+            logger.error(self.getDiagnostic())
+            self._stopExport()
+        return rss
+
+    def getDiagnostic(self):
+        rss, stage = self.exceeded
+        return (
+            f"The export was stopped during the “{stage}” stage: it used "
+            f"{formatBytes(rss)} of memory, more than the limit of "
+            f"{formatBytes(self.limit)}. Close other applications, or set "
+            f"{memoryLimitEnvironmentVariable} to change the limit."
+        )
+
+    def _stopExport(self):
+        for pid in getDescendantPIDs():
+            if pid not in self._initialDescendantPIDs:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+        if self._loop is not None and self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+    def check(self):
+        if self.exceeded is not None:
+            raise MemoryLimitExceeded(self.getDiagnostic())
+
+    async def run(self, coro):
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        try:
+            return await coro
+        except (asyncio.CancelledError, Exception):
+            if self.exceeded is None:
+                raise
+            raise MemoryLimitExceeded(self.getDiagnostic()) from None
+        finally:
+            self._loop = self._task = None
+
+
+class BoundedGlyphBackend(ReadableBackendProxy):
+    """Limits the number of getGlyph() calls in flight, so that workflow steps
+    and outputs pulling glyphs concurrently don't start reading the whole font
+    at once. It doesn't bound the memory the glyphs hold once read: that is
+    what MemoryMonitor enforces.
+    """
+
+    def __init__(self, backend, maxPendingGlyphs=defaultMaxPendingGlyphs):
+        super().__init__(backend)
+        self._slots = asyncio.Semaphore(maxPendingGlyphs)
+
+    async def getGlyph(self, glyphName, *args, **kwargs):
+        async with self._slots:
+            return await self.backend.getGlyph(glyphName, *args, **kwargs)
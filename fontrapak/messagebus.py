@@ -0,0 +1,279 @@
+import collections
+import inspect
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .servermetrics import CallMetrics
+from .threads import callInNewThread
+
+logger = logging.getLogger(__name__)
+
+
+# This module is imported by the GUI and the server process: it must not
+# import Qt or the server
+
+defaultMaxInFlight = 1000
+defaultMaxBatchSize = 100
+
+# What travels over the queues: lists of (kind, messageId, action, path,
+# options, sendTime) tuples
+postKind = "post"
+requestKind = "request"
+responseKind = "response"
+errorKind = "error"
+ackKind = "ack"
+
+
+class MessageBusFull(Exception):
+    pass
+
+
+class MessageBusClosed(Exception):
+    pass
+
+
+class RemoteError(Exception):
+    pass
+
+
+class MessageBus:
+    """One end of a two-way channel between the GUI and the server process,
+    over a pair of multiprocessing queues.
+
+    Messages are (action, path, options) triples, passed to `handler` on the
+    other end. Messages sent in a burst travel as one batch, and a batch that
+    arrives is handed to `deliver(function, *args)` at once: the GUI passes
+    callInMainThread(), so a burst wakes up the main thread only once.
+
+    Each end lets at most `maxInFlight` messages go unhandled by the other
+    end; more are kept in the outbox until the other end catches up. A full
+    outbox makes post() block, or raise MessageBusFull if `block` is False.
+
+    The time from sending a message to handling it is recorded per action,
+    see getStats().
+    """
+
+    def __init__(
+        self,
+        sendQueue,
+        receiveQueue,
+        handler,
+        deliver=None,
+        maxInFlight=defaultMaxInFlight,
+        maxBatchSize=defaultMaxBatchSize,
+    ):
+        self.sendQueue = sendQueue
+        self.receiveQueue = receiveQueue
+        self.handler = handler
+        self.deliver = deliver or (lambda function, *args: function(*args))
+        self.maxInFlight = maxInFlight
+        self.maxBatchSize = maxBatchSize
+        self._condition = threading.Condition()
+        self._outbox = collections.deque()
+        # Acks and responses, which don't wait for the other end
+        self._controlOutbox = collections.deque()
+        self._inFlight = 0
+        self._closing = False
+        self._messageIds = itertools.count(1)
+        self._pendingRequests = {}
+        self._threads = []
+        self._tasks = set()
+        self.stats = {}
+        self.numBatchesSent = 0
+        self.numBatchesReceived = 0
+
+    def start(self):
+        self._threads = [
+            callInNewThread(self._sendLoop, daemon=True),
+            callInNewThread(self._receiveLoop, daemon=True),
+        ]
+
+    def close(self, timeout=2):
+        # Sends what is in the outbox, as far as the other end lets us
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self.receiveQueue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        for future in self._pendingRequests.values():
+            future.set_exception(MessageBusClosed())
+        self._pendingRequests.clear()
+
+    def post(self, action, path=None, options=None, block=True, timeout=None):
+        self._enqueue(
+            postKind, next(self._messageIds), action, path, options, block, timeout
+        )
+
+    def request(self, action, path=None, options=None, block=True, timeout=None):
+        """Send a message, and return a concurrent.futures.Future for the
+        handler's result on the other end. The future is resolved in the
+        receiving thread.
+        """
+        messageId = next(self._messageIds)
+        future = Future()
+        future.action = action
+        future.sendTime = time.time()
+        self._pendingRequests[messageId] = future
+        try:
+            self._enqueue(requestKind, messageId, action, path, options, block, timeout)
+        except BaseException:
+            del self._pendingRequests[messageId]
+            raise
+        return future
+
+    def _enqueue(self, kind, messageId, action, path, options, block, timeout):
+        message = (kind, messageId, action, path, options, time.time())
+        with self._condition:
+            if self._closing:
+                raise MessageBusClosed()
+            if len(self._outbox) >= self.maxInFlight:
+                if not block or not self._condition.wait_for(
+                    lambda: len(self._outbox) < self.maxInFlight or self._closing,
+                    timeout,
+                ):
+                    raise MessageBusFull(action)
+            self._outbox.append(message)
+            self._condition.notify_all()
+
+    def _sendControl(self, message):
+        with self._condition:
+            self._controlOutbox.append(message)
+            self._condition.notify_all()
+
+    def _canSend(self):
+        return self._controlOutbox or (
+            self._outbox and self._inFlight < self.maxInFlight
+        )
+
+    def _sendLoop(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._canSend() or self._closing)
+                if not self._canSend():
+                    # Closing, and nothing more the other end lets us send
+                    break
+                batch = list(self._controlOutbox)
+                self._controlOutbox.clear()
+                numMessages = min(
+                    len(self._outbox),
+                    self.maxInFlight - self._inFlight,
+                    self.maxBatchSize,
+                )
+                batch.extend(self._outbox.popleft() for _ in range(numMessages))
+                self._inFlight += numMessages
+                # Room in the outbox for blocked senders
+                self._condition.notify_all()
+            self.sendQueue.put(batch)
+            self.numBatchesSent += 1
+
+    def _receiveLoop(self):
+        closing = False
+        while not closing:
+            batch = self.receiveQueue.get()
+            if batch is None:
+                break
+            # Take in the rest of a burst, for a single delivery
+            while len(batch) < self.maxBatchSize:
+                try:
+                    more = self.receiveQueue.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    closing = True
+                    break
+                batch.extend(more)
+            self.numBatchesReceived += 1
+
+            messages = []
+            for message in batch:
+                kind = message[0]
+                if kind == ackKind:
+                    self._receiveAck(message[4])
+                elif kind in {responseKind, errorKind}:
+                    self._receiveResponse(message)
+                else:
+                    messages.append(message)
+            if messages:
+                self.deliver(self._handleMessages, messages)
+
+    def _receiveAck(self, numMessages):
+        with self._condition:
+            self._inFlight -= numMessages
+            self._condition.notify_all()
+
+    def _receiveResponse(self, message):
+        kind, messageId, action, _, result, sendTime = message
+        future = self._pendingRequests.pop(messageId, None)
+        if future is None:
+            return
+        self._recordLatency(
+            f"{future.action} (round trip)", time.time() - future.sendTime
+        )
+        if kind == errorKind:
+            future.set_exception(RemoteError(result))
+        else:
+            future.set_result(result)
+
+    def _handleMessages(self, messages):
+        # Called through `deliver`, in the thread that runs the handler
+        for kind, messageId, action, path, options, sendTime in messages:
+            self._recordLatency(action, time.time() - sendTime)
+            try:
+                result = self.handler(action, path, options)
+            except Exception as e:
+                self._reply(kind, messageId, action, error=e)
+                continue
+            if inspect.isawaitable(result):
+                # The server's handlers are coroutines
+                self._replyWhenDone(kind, messageId, action, result)
+            else:
+                self._reply(kind, messageId, action, result)
+        self._sendControl((ackKind, None, None, None, len(messages), time.time()))
+
+    def _replyWhenDone(self, kind, messageId, action, awaitable):
+        import asyncio
+
+        task = asyncio.ensure_future(awaitable)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        def done(task):
+            if task.cancelled():
+                self._reply(kind, messageId, action, error=asyncio.CancelledError())
+            elif task.exception() is not None:
+                self._reply(kind, messageId, action, error=task.exception())
+            else:
+                self._reply(kind, messageId, action, task.result())
+
+        task.add_done_callback(done)
+
+    def _reply(self, kind, messageId, action, result=None, error=None):
+        if error is not None:
+            if kind == requestKind:
+                self._sendControl(
+                    (errorKind, messageId, action, None, repr(error), time.time())
+                )
+            else:
+                logger.error(f"error handling '{action}'", exc_info=error)
+        elif kind == requestKind:
+            self._sendControl(
+                (responseKind, messageId, action, None, result, time.time())
+            )
+
+    def _recordLatency(self, name, latency):
+        callMetrics = self.stats.get(name)
+        if callMetrics is None:
+            callMetrics = self.stats[name] = CallMetrics()
+        callMetrics.calls += 1
+        callMetrics.add(latency)
+
+    def getStats(self):
+        return {
+            name: callMetrics.asDict()
+            for name, callMetrics in sorted(self.stats.items())
+        }
@@ -0,0 +1,17 @@
+import os
+import pathlib
+import sys
+
+
+def getCacheDir(*subDirs):
+    if sys.platform == "darwin":
+        baseDir = pathlib.Path("~/Library/Caches").expanduser() / "FontraPak"
+    elif sys.platform == "win32":
+        localAppData = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        baseDir = pathlib.Path(localAppData) / "FontraPak" / "Cache"
+    else:
+        xdgCacheHome = os.environ.get("XDG_CACHE_HOME") or "~/.cache"
+        baseDir = pathlib.Path(xdgCacheHome).expanduser() / "fontra-pak"
+    cacheDir = baseDir.joinpath(*subDirs)
+    cacheDir.mkdir(parents=True, exist_ok=True)
+    return cacheDir
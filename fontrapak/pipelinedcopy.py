@@ -0,0 +1,167 @@
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+
+from .backendproxy import BackendProxy, readMethodNames, writeMethodNames
+
+logger = logging.getLogger(__name__)
+
+
+defaultNumCopyTasks = 8
+defaultMaxPendingWrites = 64
+
+
+class ThreadedBackend:
+    """Runs all of a backend's coroutines on an event loop in its own thread.
+
+    Backends are not thread-safe, but they don't need to be: all calls are
+    serialized on that one thread. With `maxPendingWrites`, putGlyph() returns
+    as soon as the write is queued, so the caller can read the next glyphs
+    while earlier ones are being written. Errors from such writes are raised
+    by the next call to putGlyph() or flush().
+    """
+
+    def __init__(self, backend, threadName, maxPendingWrites=0):
+        self.backend = backend
+        self.maxPendingWrites = maxPendingWrites
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name=threadName, daemon=True
+        )
+        self._thread.start()
+        self._pendingWrites = set()
+        self._writeSlots = None
+        self._writeError = None
+
+    def __getattr__(self, attrName):
+        attr = getattr(self.backend, attrName)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        async def method(*args, **kwargs):
+            return await self._submit(attr(*args, **kwargs))
+
+        return method
+
+    def _submit(self, coro):
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    async def putGlyph(self, *args, **kwargs):
+        if not self.maxPendingWrites:
+            return await self._submit(self.backend.putGlyph(*args, **kwargs))
+
+        self._raiseWriteError()
+        if self._writeSlots is None:
+            self._writeSlots = asyncio.Semaphore(self.maxPendingWrites)
+        await self._writeSlots.acquire()
+        future = self._submit(self.backend.putGlyph(*args, **kwargs))
+        self._pendingWrites.add(future)
+        future.add_done_callback(self._writeDone)
+
+    def _writeDone(self, future):
+        self._pendingWrites.discard(future)
+        self._writeSlots.release()
+        if not future.cancelled() and self._writeError is None:
+            self._writeError = future.exception()
+
+    def _raiseWriteError(self):
+        if self._writeError is not None:
+            error, self._writeError = self._writeError, None
+            raise error
+
+    async def flush(self):
+        if self._pendingWrites:
+            await asyncio.wait(list(self._pendingWrites))
+        self._raiseWriteError()
+
+    async def shutdown(self):
+        try:
+            await self.flush()
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+
+def _threadedMethod(methodName):
+    async def method(self, *args, **kwargs):
+        return await self._submit(getattr(self.backend, methodName)(*args, **kwargs))
+
+    method.__name__ = methodName
+    return method
+
+
+for _methodName in readMethodNames + writeMethodNames:
+    if _methodName != "putGlyph":
+        setattr(ThreadedBackend, _methodName, _threadedMethod(_methodName))
+
+
+@asynccontextmanager
+async def aclosingSafely(closeFunc):
+    """Awaits `closeFunc()` on leaving the block. Should the block raise, an
+    error from `closeFunc()` is logged instead of raised, so it doesn't take
+    the place of the error that caused it.
+    """
+    try:
+        yield
+    except BaseException:
+        try:
+            await closeFunc()
+        except Exception:
+            logger.exception("error while closing after an earlier error")
+        raise
+    await closeFunc()
+
+
+async def copyFontPipelined(
+    sourceBackend,
+    destBackend,
+    *,
+    numTasks=defaultNumCopyTasks,
+    maxPendingWrites=defaultMaxPendingWrites,
+    wrapDestBackend=None,
+):
+    # Reads happen on a reader thread, writes on a writer thread, and copyFont
+    # runs `numTasks` glyph copy tasks on the calling thread. A source that is
+    # bound to the calling loop, such as liveexport.LiveServerBackend, is read
+    # on it directly: it doesn't block it anyway. The caller stays responsible
+    # for closing both backends.
+    from fontra.backends.copy import copyFont
+
+    start = time.perf_counter()
+    async with AsyncExitStack() as exitStack:
+        if not getattr(sourceBackend, "isLoopBound", False):
+            sourceBackend = ThreadedBackend(sourceBackend, "fontra-pak-copy-reader")
+            await exitStack.enter_async_context(aclosingSafely(sourceBackend.shutdown))
+        threadedDest = ThreadedBackend(
+            destBackend, "fontra-pak-copy-writer", maxPendingWrites=maxPendingWrites
+        )
+        await exitStack.enter_async_context(aclosingSafely(threadedDest.shutdown))
+        countingDest = GlyphCountingBackend(threadedDest)
+        await copyFont(
+            sourceBackend,
+            wrapDestBackend(countingDest) if wrapDestBackend else countingDest,
+            numTasks=numTasks,
+        )
+        await threadedDest.flush()
+
+    elapsed = time.perf_counter() - start
+    glyphsPerSecond = countingDest.numGlyphs / elapsed if elapsed else 0
+    logger.info(
+        f"copied {countingDest.numGlyphs} glyphs in {elapsed:.2f}s "
+        f"({glyphsPerSecond:.1f} glyphs/s)"
+    )
+    return glyphsPerSecond
+
+
+class GlyphCountingBackend(BackendProxy):
+    def __init__(self, backend):
+        super().__init__(backend)
+        self.numGlyphs = 0
+
+    async def putGlyph(self, *args, **kwargs):
+        await self.backend.putGlyph(*args, **kwargs)
+        self.numGlyphs += 1
@@ -0,0 +1,74 @@
+import cProfile
+import io
+import logging
+import os
+import pathlib
+import pstats
+import time
+from contextlib import contextmanager
+
+from .paths import getCacheDir
+
+logger = logging.getLogger(__name__)
+
+
+# A comma-separated list of what to profile: "export", "server", or "all"
+profilingEnvironmentVariable = "FONTRA_PAK_PROFILE"
+
+profilingTargets = ["export", "server"]
+
+defaultNumTopFunctions = 25
+
+
+def isProfilingEnabled(target):
+    value = os.environ.get(profilingEnvironmentVariable, "").lower()
+    targets = {item.strip() for item in value.split(",")}
+    return target in targets or bool(targets & {"all", "1", "on"})
+
+
+def getProfilePath(target):
+    # Timestamped, so successive runs don't overwrite each other
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    return getCacheDir("profiles") / f"{target}-{timestamp}-{os.getpid()}.prof"
+
+
+def getSummaryPath(profilePath):
+    return pathlib.Path(profilePath).with_suffix(".txt")
+
+
+def readSummary(profilePath):
+    try:
+        return getSummaryPath(profilePath).read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def formatTopFunctions(profiler, numFunctions=defaultNumTopFunctions):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(numFunctions)
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(numFunctions)
+    return stream.getvalue()
+
+
+@contextmanager
+def profiled(profilePath):
+    """Run the body under cProfile if `profilePath` is not None. The stats are
+    written to `profilePath`, for snakeviz or pstats, and the top functions to
+    a .txt file next to it, also when the body raises.
+    """
+    if profilePath is None:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profilePath)
+        getSummaryPath(profilePath).write_text(
+            formatTopFunctions(profiler), encoding="utf-8"
+        )
+        logger.info(f"profile written to {profilePath}")
@@ -0,0 +1,148 @@
+import json
+import time
+from contextlib import contextmanager
+
+from .backendproxy import BackendProxy
+from .memory import getCurrentRSS, getPeakRSS
+
+
+class ExportProgress:
+    def __init__(self, callback=None, minInterval=0.1, memoryMonitor=None):
+        self.callback = callback
+        self.memoryMonitor = memoryMonitor
+        self.minInterval = minInterval
+        self.startTime = time.perf_counter()
+        self.stages = []
+        self.outputs = []
+        self.currentStage = None
+        self.glyphsDone = 0
+        self.glyphsTotal = 0
+        self._glyphNamesSeen = set()
+        self._lastGlyphEventTime = 0
+
+    def _send(self, event):
+        if self.callback is not None:
+            self.callback(event)
+
+    @contextmanager
+    def stage(self, name):
+        self.currentStage = name
+        self.glyphsDone = self.glyphsTotal = 0
+        self._glyphNamesSeen = set()
+        self._send(dict(event="stageStarted", stage=name))
+        stageStart = time.perf_counter()
+        rssBefore = self._getRSS()
+        if self.memoryMonitor is not None:
+            self.memoryMonitor.startStage(name)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - stageStart
+            record = dict(
+                stage=name,
+                elapsed=elapsed,
+                glyphs=self.glyphsDone,
+                glyphsPerSecond=self.glyphsDone / elapsed if elapsed else 0,
+                rssBefore=rssBefore,
+                rssAfter=self._getRSS(),
+                peakRSS=(
+                    getPeakRSS()
+                    if self.memoryMonitor is None
+                    else self.memoryMonitor.stagePeakRSS
+                ),
+            )
+            self.stages.append(record)
+            self.currentStage = None
+            self._send(dict(event="stageFinished", **record))
+
+    def _getRSS(self):
+        # With a memory monitor, figures include the processes we started
+        if self.memoryMonitor is None:
+            return getCurrentRSS()
+        return self.memoryMonitor.sample()
+
+    def recordOutput(self, **record):
+        self.outputs.append(record)
+
+    def setGlyphTotal(self, glyphsTotal):
+        self.glyphsTotal = glyphsTotal
+        self._sendGlyphEvent()
+
+    def glyphDone(self, glyphName):
+        if self.memoryMonitor is not None:
+            self.memoryMonitor.check()
+        if glyphName in self._glyphNamesSeen:
+            return
+        self._glyphNamesSeen.add(glyphName)
+        self.glyphsDone = min(self.glyphsDone + 1, self.glyphsTotal)
+        now = time.perf_counter()
+        if (
+            now - self._lastGlyphEventTime >= self.minInterval
+            or self.glyphsDone == self.glyphsTotal
+        ):
+            self._lastGlyphEventTime = now
+            self._sendGlyphEvent()
+
+    def _sendGlyphEvent(self):
+        self._send(
+            dict(
+                event="glyphs",
+                stage=self.currentStage,
+                done=self.glyphsDone,
+                total=self.glyphsTotal,
+            )
+        )
+
+    def getReport(self, **info):
+        return dict(
+            info,
+            totalTime=time.perf_counter() - self.startTime,
+            peakRSS=(
+                getPeakRSS()
+                if self.memoryMonitor is None
+                else self.memoryMonitor.peakRSS
+            ),
+            memoryLimit=(
+                None if self.memoryMonitor is None else self.memoryMonitor.limit
+            ),
+            stages=self.stages,
+            outputs=self.outputs,
+        )
+
+    def writeReport(self, reportPath, **info):
+        report = self.getReport(**info)
+        with open(reportPath, "w", encoding="utf-8") as reportFile:
+            json.dump(report, reportFile, indent=2)
+            reportFile.write("\n")
+        return report
+
+
+class GlyphProgressBackend(BackendProxy):
+    # Counts glyphs read (methodName="getGlyph") or written ("putGlyph")
+
+    def __init__(self, backend, progress, methodName="getGlyph"):
+        super().__init__(backend)
+        self.progress = progress
+        self.methodName = methodName
+
+    async def getGlyph(self, glyphName, *args, **kwargs):
+        glyph = await self.backend.getGlyph(glyphName, *args, **kwargs)
+        if self.methodName == "getGlyph":
+            self.progress.glyphDone(glyphName)
+        return glyph
+
+    async def putGlyph(self, glyphName, *args, **kwargs):
+        await self.backend.putGlyph(glyphName, *args, **kwargs)
+        if self.methodName == "putGlyph":
+            self.progress.glyphDone(glyphName)
+
+
+def getTimingReportPath(destPath):
+    return destPath.parent / (destPath.name + ".timing.json")
+
+
+def formatDuration(seconds):
+    seconds = round(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    return f"{seconds // 60}m {seconds % 60:02}s"
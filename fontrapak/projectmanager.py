@@ -0,0 +1,155 @@
+import asyncio
+import functools
+import logging
+import pathlib
+import time
+
+from fontra.core.fonthandler import FontHandler
+from fontra.filesystem.projectmanager import FileSystemProjectManager
+
+from .filetypes import exportFileTypes
+from .snapshot import SnapshotCache
+
+logger = logging.getLogger(__name__)
+
+# A prefetched project the browser hasn't asked for by then is closed again,
+# as the user may have dropped it on another app, or quit
+prefetchExpiryTime = 60
+
+
+def getProjectPath(projectIdentifier):
+    projectPath = pathlib.Path(projectIdentifier)
+    if not projectPath.is_absolute():
+        projectPath = "/" / projectPath
+    return projectPath
+
+
+class FontraPakProjectManager(FileSystemProjectManager):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.snapshotCache = SnapshotCache()
+        self.openingTasks = {}
+        self.prefetchTimes = {}
+        # Projects the browser asked for, whose FontHandler stays open until
+        # its connections are closed
+        self.claimedProjects = set()
+        self.prefetchExpiryTasks = set()
+        self.appBus = None
+        self.metrics = None
+
+    def getSupportedExportFormats(self):
+        return [typ for (_name, typ) in exportFileTypes]
+
+    async def getRemoteSubject(self, projectIdentifier, token):
+        requestTime = time.time()
+        self.claimedProjects.add(projectIdentifier)
+        try:
+            fontHandler = await self.getFontHandler(projectIdentifier)
+        except BaseException:
+            self.claimedProjects.discard(projectIdentifier)
+            raise
+        self.logPrefetchSavings(projectIdentifier, requestTime)
+        if self.metrics is not None:
+            return self.metrics.wrapRemoteSubject(fontHandler)
+        return fontHandler
+
+    async def getFontHandler(self, projectIdentifier):
+        fontHandler = self.fontHandlers.get(projectIdentifier)
+        if fontHandler is not None:
+            return fontHandler
+        # A prefetch and the browser may ask for the same project at the same
+        # time: make sure they share one FontHandler
+        task = self.openingTasks.get(projectIdentifier)
+        if task is None:
+            task = asyncio.create_task(self.openFontHandler(projectIdentifier))
+            self.openingTasks[projectIdentifier] = task
+            task.add_done_callback(
+                lambda task: self.openingTasks.pop(projectIdentifier, None)
+            )
+        return await asyncio.shield(task)
+
+    async def openFontHandler(self, projectIdentifier):
+        # Same as FileSystemProjectManager.getRemoteSubject(), except that the
+        # backend is opened through the snapshot cache
+        projectPath = getProjectPath(projectIdentifier)
+        if not projectPath.exists():
+            raise FileNotFoundError(projectIdentifier)
+        backend = self.snapshotCache.openBackend(projectPath)
+
+        logger.info(f"new FontHandler for '{projectIdentifier}'")
+        fontHandler = FontHandler(
+            backend=backend,
+            projectIdentifier=projectIdentifier,
+            metaInfoProvider=self,
+            readOnly=self.readOnly,
+            allConnectionsClosedCallback=functools.partial(
+                self.closeFontHandler, projectIdentifier
+            ),
+        )
+        await fontHandler.startTasks()
+        self.fontHandlers[projectIdentifier] = fontHandler
+        return fontHandler
+
+    async def closeFontHandler(self, projectIdentifier):
+        self.claimedProjects.discard(projectIdentifier)
+        fontHandler = self.fontHandlers.pop(projectIdentifier, None)
+        if fontHandler is None:
+            return
+        logger.info(f"closing FontHandler for '{projectIdentifier}'")
+        await fontHandler.aclose()
+
+    async def prefetchProject(self, projectIdentifier, options):
+        dropTime = options["dropTime"]
+        startTime = time.time()
+        try:
+            fontHandler = await self.getFontHandler(projectIdentifier)
+            await asyncio.gather(
+                fontHandler.getAxes(),
+                fontHandler.getSources(),
+                fontHandler.getGlyphMap(),
+            )
+        except Exception as e:
+            logger.warning(f"could not prefetch '{projectIdentifier}': {e!r}")
+            return
+        finally:
+            task = asyncio.create_task(self.expirePrefetch(projectIdentifier))
+            self.prefetchExpiryTasks.add(task)
+            task.add_done_callback(self.prefetchExpiryTasks.discard)
+        readyTime = time.time()
+        self.prefetchTimes[projectIdentifier] = startTime, readyTime
+        logger.info(
+            f"prefetched '{projectIdentifier}': drop-to-ready latency "
+            f"{readyTime - dropTime:.2f}s, of which loading {readyTime - startTime:.2f}s"
+        )
+
+    async def expirePrefetch(self, projectIdentifier):
+        await asyncio.sleep(prefetchExpiryTime)
+        if projectIdentifier in self.claimedProjects:
+            return
+        self.prefetchTimes.pop(projectIdentifier, None)
+        if projectIdentifier in self.fontHandlers:
+            logger.info(f"'{projectIdentifier}' was prefetched but never opened")
+            await self.closeFontHandler(projectIdentifier)
+
+    def logPrefetchSavings(self, projectIdentifier, requestTime):
+        prefetchTimes = self.prefetchTimes.pop(projectIdentifier, None)
+        if prefetchTimes is None:
+            return
+        startTime, readyTime = prefetchTimes
+        # Whatever loading happened before the browser asked is time saved
+        saved = min(readyTime, requestTime) - startTime
+        logger.info(f"prefetching '{projectIdentifier}' saved {saved:.2f}s")
+
+    def messageFromApp(self, action, projectIdentifier, options):
+        # The app bus runs the returned coroutine, and answers requests with
+        # its result
+        handler = getattr(self, action, None)
+        if handler is None:
+            raise ValueError(f"unknown action: {action}")
+        return handler(projectIdentifier, options)
+
+    async def exportAs(self, fontHandler, options):
+        # Doesn't wait for the app: the user is still to pick a destination
+        self.appBus.post(
+            "exportAs", fontHandler.projectIdentifier, options, block=False
+        )
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+
+from .profiling import profiled
+
+# This module is imported by the GUI process, which must not pay for importing
+# the server: keep the heavy imports inside runFontraServer()
+
+localAddresses = {"127.0.0.1", "::1"}
+
+
+def isLocalRequest(request):
+    # For our own endpoints, which are not meant for other machines
+    return request.remote in localAddresses
+
+
+def runFontraServer(host, port, queue, serverQueue, profilePath=None):
+    from fontra.core.server import FontraServer
+
+    from .clientassets import getClientVersionToken, makeClientAssetsMiddleware
+    from .liveexport import makeLiveExportMiddleware, makeLiveExportToken
+    from .messagebus import MessageBus
+    from .projectmanager import FontraPakProjectManager
+    from .servermetrics import ServerMetrics
+
+    logging.basicConfig(
+        format="%(asctime)s %(name)-17s %(levelname)-8s %(message)s",
+        level=logging.INFO,
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    manager = FontraPakProjectManager(None)
+    manager.metrics = ServerMetrics()
+    versionToken = getClientVersionToken()
+    server = FontraServer(
+        host=host,
+        httpPort=port,
+        projectManager=manager,
+        versionToken=versionToken,
+    )
+    server.setup()
+    server.httpApp.middlewares.append(makeClientAssetsMiddleware(versionToken))
+    # Lets export processes read projects from us: only they get the token
+    liveExportToken = makeLiveExportToken()
+    server.httpApp.middlewares.append(
+        makeLiveExportMiddleware(manager, liveExportToken)
+    )
+    # Outermost, so the timings include the other middlewares
+    server.httpApp.middlewares.insert(0, manager.metrics.makeMiddleware())
+
+    readyTasks = set()
+
+    async def startAppChannel(app):
+        loop = asyncio.get_running_loop()
+        # Messages from the app are handled in the event loop
+        manager.appBus = MessageBus(
+            queue,
+            serverQueue,
+            manager.messageFromApp,
+            deliver=loop.call_soon_threadsafe,
+        )
+        manager.appBus.start()
+        manager.metrics.messageBus = manager.appBus
+        # on_startup runs before the server listens: tell the app we're ready
+        # only once a connection succeeds
+        task = asyncio.create_task(signalReady())
+        readyTasks.add(task)
+        task.add_done_callback(readyTasks.discard)
+
+    async def signalReady():
+        while True:
+            try:
+                _, writer = await asyncio.open_connection(host, port)
+            except OSError:
+                await asyncio.sleep(0.01)
+            else:
+                writer.close()
+                break
+        manager.appBus.post(
+            "serverReady",
+            None,
+            {"readyTime": time.time(), "liveExportToken": liveExportToken},
+        )
+
+    server.httpApp.on_startup.append(startAppChannel)
+    # The profile is written when the server stops, that is, when the app quits
+    with profiled(profilePath):
+        server.run(showLaunchBanner=False)
@@ -0,0 +1,349 @@
+import bisect
+import json
+import time
+
+from .server import isLocalRequest
+
+# Imported by the GUI process for the viewer URL: aiohttp is only imported
+# when the middleware is made, in the server process
+
+metricsPath = "/fontrapak/metrics"
+metricsViewerPath = "/fontrapak/metrics.html"
+
+# Upper bounds in seconds; the last bucket counts everything slower
+latencyBucketBounds = [
+    0.001,
+    0.002,
+    0.005,
+    0.01,
+    0.02,
+    0.05,
+    0.1,
+    0.2,
+    0.5,
+    1,
+    2,
+    5,
+    10,
+]
+
+# Sizing a payload means serializing it once more: only do it for every Nth
+# call of each method (None: never)
+defaultSizeSampleInterval = 10
+
+
+class Histogram:
+    def __init__(self, bounds=latencyBucketBounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+
+    def getPercentile(self, fraction):
+        # The upper bound of the bucket holding the percentile, or None if it's
+        # in the overflow bucket
+        total = sum(self.counts)
+        if not total:
+            return 0
+        threshold = fraction * total
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= threshold:
+                return bound
+        return None
+
+
+class SizeStats:
+    def __init__(self):
+        self.samples = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, size):
+        self.samples += 1
+        self.total += size
+        self.max = max(self.max, size)
+
+    def asDict(self):
+        return dict(
+            samples=self.samples,
+            mean=self.total / self.samples if self.samples else 0,
+            max=self.max,
+        )
+
+
+class CallMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.inFlight = 0
+        self.maxInFlight = 0
+        self.totalTime = 0.0
+        self.maxTime = 0.0
+        self.latency = Histogram()
+        self.requestSize = SizeStats()
+        self.responseSize = SizeStats()
+
+    def start(self):
+        self.calls += 1
+        self.inFlight += 1
+        self.maxInFlight = max(self.maxInFlight, self.inFlight)
+        return time.perf_counter()
+
+    def finish(self, startTime, failed=False):
+        self.inFlight -= 1
+        self.add(time.perf_counter() - startTime, failed)
+
+    def add(self, elapsed, failed=False):
+        # For timings measured elsewhere, such as message latencies
+        self.errors += failed
+        self.totalTime += elapsed
+        self.maxTime = max(self.maxTime, elapsed)
+        self.latency.add(elapsed)
+
+    def asDict(self):
+        return dict(
+            calls=self.calls,
+            errors=self.errors,
+            inFlight=self.inFlight,
+            maxInFlight=self.maxInFlight,
+            totalTime=self.totalTime,
+            meanTime=self.totalTime / self.calls if self.calls else 0,
+            maxTime=self.maxTime,
+            p50=self.latency.getPercentile(0.5),
+            p95=self.latency.getPercentile(0.95),
+            histogram=dict(bounds=self.latency.bounds, counts=self.latency.counts),
+            requestSize=self.requestSize.asDict(),
+            responseSize=self.responseSize.asDict(),
+        )
+
+
+def getPayloadSize(value):
+    # The size of the JSON the remote object connection sends
+    from fontra.core.classes import unstructure
+
+    return len(json.dumps(unstructure(value), separators=(",", ":")))
+
+
+class ServerMetrics:
+    def __init__(self, sizeSampleInterval=defaultSizeSampleInterval):
+        self.startTime = time.time()
+        self.sizeSampleInterval = sizeSampleInterval
+        self.remoteMethods = {}
+        self.httpRequests = {}
+        # The MessageBus to the app, for its message latencies
+        self.messageBus = None
+
+    def getCallMetrics(self, table, name):
+        callMetrics = table.get(name)
+        if callMetrics is None:
+            callMetrics = table[name] = CallMetrics()
+        return callMetrics
+
+    async def measureRemoteCall(self, methodName, method, args, kwargs):
+        callMetrics = self.getCallMetrics(self.remoteMethods, methodName)
+        sampleSizes = (
+            self.sizeSampleInterval is not None
+            and callMetrics.calls % self.sizeSampleInterval == 0
+        )
+        startTime = callMetrics.start()
+        failed = True
+        try:
+            result = await method(*args, **kwargs)
+            failed = False
+        finally:
+            callMetrics.finish(startTime, failed)
+        if sampleSizes:
+            callMetrics.requestSize.add(getPayloadSize(list(args)))
+            callMetrics.responseSize.add(getPayloadSize(result))
+        return result
+
+    def wrapRemoteSubject(self, subject):
+        return InstrumentedRemoteSubject(subject, self)
+
+    def getSnapshot(self):
+        return dict(
+            uptime=time.time() - self.startTime,
+            remoteMethods={
+                name: callMetrics.asDict()
+                for name, callMetrics in sorted(self.remoteMethods.items())
+            },
+            httpRequests={
+                name: callMetrics.asDict()
+                for name, callMetrics in sorted(self.httpRequests.items())
+            },
+            appMessages=(
+                self.messageBus.getStats() if self.messageBus is not None else {}
+            ),
+        )
+
+    def makeMiddleware(self):
+        from aiohttp import web
+
+        @web.middleware
+        async def metricsMiddleware(request, handler):
+            if request.path in {metricsPath, metricsViewerPath}:
+                if not isLocalRequest(request):
+                    raise web.HTTPForbidden()
+                if request.path == metricsPath:
+                    return web.json_response(self.getSnapshot())
+                return web.Response(text=metricsViewerHTML, content_type="text/html")
+
+            if request.headers.get("Upgrade", "").lower() == "websocket":
+                # Lives as long as the connection: the remote calls made over
+                # it are measured one by one instead
+                return await handler(request)
+
+            resource = request.match_info.route.resource
+            route = resource.canonical if resource is not None else "(unmatched)"
+            callMetrics = self.getCallMetrics(
+                self.httpRequests, f"{request.method} {route}"
+            )
+            startTime = callMetrics.start()
+            failed = True
+            try:
+                response = await handler(request)
+                failed = response.status >= 500
+            except web.HTTPException as e:
+                failed = e.status >= 500
+                raise
+            finally:
+                callMetrics.finish(startTime, failed)
+            if request.content_length:
+                callMetrics.requestSize.add(request.content_length)
+            if isinstance(response, web.Response) and isinstance(response.body, bytes):
+                callMetrics.responseSize.add(len(response.body))
+            return response
+
+        return metricsMiddleware
+
+
+class InstrumentedRemoteSubject:
+    """Wraps the subject of a remote object connection, a FontHandler, timing
+    each remote method call made through it.
+    """
+
+    def __init__(self, subject, metrics):
+        self.subject = subject
+        self.metrics = metrics
+
+    def __getattr__(self, attrName):
+        if attrName == "subject":
+            raise AttributeError(attrName)
+        attr = getattr(self.subject, attrName)
+        if not getattr(attr, "fontraRemoteMethod", False):
+            return attr
+
+        async def method(*args, **kwargs):
+            return await self.metrics.measureRemoteCall(attrName, attr, args, kwargs)
+
+        method.fontraRemoteMethod = True
+        method.__name__ = attrName
+        return method
+
+
+metricsViewerHTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Fontra Pak server metrics</title>
+<style>
+body { font-family: system-ui, sans-serif; font-size: 13px; margin: 1.5em; }
+table { border-collapse: collapse; margin-bottom: 2em; }
+th, td { padding: 0.25em 0.75em; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+thead th { border-bottom: 1px solid gray; cursor: pointer; }
+tbody tr:nth-child(odd) { background-color: #f3f3f3; }
+.slow { color: #c00; }
+</style>
+</head>
+<body>
+<h2>Remote calls</h2>
+<table id="remoteMethods"></table>
+<h2>HTTP requests</h2>
+<table id="httpRequests"></table>
+<h2>Messages from the app (time from sending to handling)</h2>
+<table id="appMessages"></table>
+<p id="status"></p>
+<script>
+const columns = [
+  ["name", "Name", null],
+  ["calls", "Calls", null],
+  ["errors", "Errors", null],
+  ["inFlight", "In flight", null],
+  ["maxInFlight", "Max in flight", null],
+  ["meanTime", "Mean", formatTime],
+  ["p50", "p50 ≤", formatTime],
+  ["p95", "p95 ≤", formatTime],
+  ["maxTime", "Max", formatTime],
+  ["totalTime", "Total", formatTime],
+  ["requestSize", "Request size", (size) => formatSize(size.mean)],
+  ["responseSize", "Response size", (size) => formatSize(size.mean)],
+];
+let sortKey = "totalTime";
+
+function formatTime(seconds) {
+  if (seconds === null) return "> 10 s";
+  return seconds < 1 ? `${(seconds * 1000).toFixed(1)} ms` : `${seconds.toFixed(2)} s`;
+}
+
+function formatSize(size) {
+  if (!size) return "";
+  return size < 1024 ? `${size.toFixed(0)} B` : `${(size / 1024).toFixed(1)} KB`;
+}
+
+function sortValue(row) {
+  const value = row[sortKey];
+  return typeof value === "object" && value !== null ? value.mean : value;
+}
+
+function renderTable(table, metrics) {
+  const rows = Object.entries(metrics).map(([name, row]) => ({ name, ...row }));
+  rows.sort((a, b) =>
+    sortKey === "name" ? a.name.localeCompare(b.name) : sortValue(b) - sortValue(a)
+  );
+  const head = columns
+    .map(([key, label]) => `<th data-key="${key}">${label}</th>`)
+    .join("");
+  const body = rows
+    .map((row) => {
+      const cells = columns.map(([key, , format]) => {
+        const text = format ? format(row[key]) : row[key];
+        const slow = key === "p95" && (row.p95 === null || row.p95 >= 0.5);
+        return `<td class="${slow ? "slow" : ""}">${text}</td>`;
+      });
+      return `<tr>${cells.join("")}</tr>`;
+    })
+    .join("");
+  table.innerHTML = `<thead><tr>${head}</tr></thead><tbody>${body}</tbody>`;
+  for (const th of table.querySelectorAll("th")) {
+    th.onclick = () => {
+      sortKey = th.dataset.key;
+      update();
+    };
+  }
+}
+
+async function update() {
+  try {
+    const response = await fetch("/fontrapak/metrics");
+    const metrics = await response.json();
+    renderTable(document.getElementById("remoteMethods"), metrics.remoteMethods);
+    renderTable(document.getElementById("httpRequests"), metrics.httpRequests);
+    renderTable(document.getElementById("appMessages"), metrics.appMessages);
+    document.getElementById("status").textContent =
+      `Server up for ${Math.round(metrics.uptime)} s; updated ` +
+      new Date().toLocaleTimeString();
+  } catch (error) {
+    document.getElementById("status").textContent = `Server not reachable: ${error}`;
+  }
+}
+
+update();
+setInterval(update, 2000);
+</script>
+</body>
+</html>
+"""
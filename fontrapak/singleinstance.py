@@ -0,0 +1,116 @@
+import getpass
+import json
+import os
+import pathlib
+import time
+
+from PyQt6.QtCore import QDir, QLockFile
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+
+# Only QtCore and QtNetwork are imported here: a second launch has to get its
+# files to the running instance and exit without loading anything else.
+
+
+def getInstanceName():
+    try:
+        userName = getpass.getuser()
+    except Exception:
+        userName = "user"
+    return f"xyz.fontra.FontraPak-{userName}"
+
+
+def encodeMessage(message):
+    return json.dumps(message).encode("utf-8") + b"\n"
+
+
+def decodeMessage(line):
+    return json.loads(bytes(line).decode("utf-8"))
+
+
+class SingleInstance:
+    """A lock that only one running Fontra Pak holds, and a local socket on
+    which that instance receives the files that later launches forward to it.
+    """
+
+    def __init__(self, instanceName=None):
+        if instanceName is None:
+            instanceName = getInstanceName()
+        self.instanceName = instanceName
+        self.lockFile = QLockFile(os.path.join(QDir.tempPath(), instanceName + ".lock"))
+        # Only consider the lock stale if its process is gone
+        self.lockFile.setStaleLockTime(0)
+        self.localServer = None
+        self.connections = []
+
+    def acquire(self):
+        return self.lockFile.tryLock(0)
+
+    def release(self):
+        if self.localServer is not None:
+            self.localServer.close()
+        self.lockFile.unlock()
+
+    def forward(self, paths, timeout=3):
+        """Send `paths` to the running instance. Return False if it doesn't
+        answer within `timeout` seconds.
+        """
+        paths = [os.fspath(pathlib.Path(path).resolve()) for path in paths]
+        # The running instance may hold the lock but not listen yet
+        deadline = time.monotonic() + timeout
+        while True:
+            socket = QLocalSocket()
+            socket.connectToServer(self.instanceName)
+            if socket.waitForConnected(100):
+                break
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+
+        timeoutMS = int(timeout * 1000)
+        socket.write(encodeMessage({"action": "open", "paths": paths}))
+        if not socket.waitForBytesWritten(timeoutMS):
+            return False
+        while not socket.canReadLine():
+            if not socket.waitForReadyRead(timeoutMS):
+                return False
+        reply = decodeMessage(socket.readLine())
+        socket.disconnectFromServer()
+        return reply.get("status") == "ok"
+
+    def listen(self, openPaths):
+        """Call `openPaths(paths)` for each forwarded launch. Must be called
+        from the main thread, after the lock was acquired.
+        """
+        # A crashed instance may have left its socket behind
+        QLocalServer.removeServer(self.instanceName)
+        self.localServer = QLocalServer()
+        self.localServer.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.localServer.newConnection.connect(lambda: self._newConnection(openPaths))
+        return self.localServer.listen(self.instanceName)
+
+    def _newConnection(self, openPaths):
+        while self.localServer.hasPendingConnections():
+            socket = self.localServer.nextPendingConnection()
+            self.connections.append(socket)
+            socket.readyRead.connect(
+                lambda socket=socket: self._readMessages(socket, openPaths)
+            )
+            socket.disconnected.connect(
+                lambda socket=socket: self._closeConnection(socket)
+            )
+
+    def _readMessages(self, socket, openPaths):
+        while socket.canReadLine():
+            try:
+                message = decodeMessage(socket.readLine())
+            except ValueError:
+                socket.write(encodeMessage({"status": "error"}))
+                continue
+            if message.get("action") == "open":
+                openPaths(message.get("paths", []))
+            socket.write(encodeMessage({"status": "ok"}))
+
+    def _closeConnection(self, socket):
+        if socket in self.connections:
+            self.connections.remove(socket)
+        socket.deleteLater()
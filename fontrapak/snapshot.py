@@ -0,0 +1,443 @@
+import asyncio
+import hashlib
+import logging
+import os
+import pathlib
+import pickle
+import struct
+import tempfile
+import time
+import zlib
+
+from .backendproxy import writeMethodNames
+from .diskcache import DiskCache
+from .paths import getCacheDir
+
+logger = logging.getLogger(__name__)
+
+
+# Bump when the snapshot file layout changes
+snapshotFormatVersion = 2
+snapshotMagic = b"FONTRAPAK-SNAPSHOT\n"
+snapshotHeaderFormat = "<Q"
+
+# Formats that are slow to parse, and that the server therefore snapshots
+snapshotExtensions = {".glyphs", ".glyphspackage", ".otf", ".ttf", ".woff", ".woff2"}
+# Any source format: fan-out snapshots the source so that its instance
+# processes don't each parse it again
+allSnapshotExtensions = snapshotExtensions | {
+    ".designspace",
+    ".fontra",
+    ".rcjk",
+    ".ufo",
+}
+
+defaultMaxSnapshotCacheSize = 2 * 1024**3
+
+fontDataMethodNames = [
+    "getGlyphMap",
+    "getAxes",
+    "getSources",
+    "getUnitsPerEm",
+    "getFontInfo",
+    "getKerning",
+    "getFeatures",
+    "getCustomData",
+]
+
+
+def getSourcePaths(sourcePath):
+    # The files and folders a source is read from: a designspace's sources may
+    # be anywhere
+    sourcePath = pathlib.Path(sourcePath)
+    paths = [sourcePath]
+    if sourcePath.suffix.lower() == ".designspace":
+        from fontTools.designspaceLib import DesignSpaceDocument
+
+        doc = DesignSpaceDocument.fromfile(sourcePath)
+        paths += sorted(
+            {pathlib.Path(source.path) for source in doc.sources if source.path}
+        )
+    return paths
+
+
+def getSourceSignature(sourcePath):
+    signature = []
+    for path in getSourcePaths(sourcePath):
+        if not path.is_dir():
+            stat = path.stat()
+            signature.append((os.fspath(path), stat.st_mtime_ns, stat.st_size))
+            continue
+        for dirPath, dirNames, fileNames in os.walk(path):
+            dirNames.sort()
+            for fileName in sorted(fileNames):
+                filePath = os.path.join(dirPath, fileName)
+                stat = os.stat(filePath)
+                signature.append((filePath, stat.st_mtime_ns, stat.st_size))
+    return signature
+
+
+def getSnapshotKey(path):
+    from fontra import __version__ as fontraVersion
+
+    path = pathlib.Path(path).resolve()
+    keyData = (snapshotFormatVersion, fontraVersion, os.fspath(path))
+    keyData += tuple(getSourceSignature(path))
+    return hashlib.sha256(repr(keyData).encode("utf-8")).hexdigest()
+
+
+def _packRecord(obj):
+    return zlib.compress(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+
+class SnapshotReader:
+    def __init__(self, snapshotPath):
+        self.file = open(snapshotPath, "rb")
+        try:
+            if self.file.read(len(snapshotMagic)) != snapshotMagic:
+                raise ValueError(f"not a snapshot file: {snapshotPath}")
+            headerSize = struct.calcsize(snapshotHeaderFormat)
+            (indexOffset,) = struct.unpack(
+                snapshotHeaderFormat, self.file.read(headerSize)
+            )
+            self.file.seek(indexOffset)
+            index = pickle.loads(zlib.decompress(self.file.read()))
+        except BaseException:
+            self.file.close()
+            raise
+        self.fontDataRecords = index["fontData"]
+        self.glyphRecords = index["glyphs"]
+        self.isWritable = index["isWritable"]
+        self.isWatchable = index["isWatchable"]
+
+    def readRecord(self, record):
+        offset, length = record
+        self.file.seek(offset)
+        return pickle.loads(zlib.decompress(self.file.read(length)))
+
+    def close(self):
+        self.file.close()
+
+
+class SnapshotWriter:
+    def __init__(self, snapshotPath):
+        self.file = open(snapshotPath, "wb")
+        self.file.write(snapshotMagic)
+        self.file.write(struct.pack(snapshotHeaderFormat, 0))
+        self.fontDataRecords = {}
+        self.glyphRecords = {}
+
+    def _writeRecord(self, obj):
+        data = _packRecord(obj)
+        offset = self.file.tell()
+        self.file.write(data)
+        return offset, len(data)
+
+    def addFontData(self, methodName, value):
+        self.fontDataRecords[methodName] = self._writeRecord(value)
+
+    def addGlyph(self, glyphName, glyph):
+        self.glyphRecords[glyphName] = self._writeRecord(glyph)
+
+    def finish(self, isWritable, isWatchable=False):
+        indexOffset = self._writeRecord(
+            dict(
+                fontData=self.fontDataRecords,
+                glyphs=self.glyphRecords,
+                isWritable=isWritable,
+                isWatchable=isWatchable,
+            )
+        )[0]
+        self.file.seek(len(snapshotMagic))
+        self.file.write(struct.pack(snapshotHeaderFormat, indexOffset))
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+
+def getFullReloadPattern(glyphNames):
+    # Everything a FontHandler has loaded: the font data, and `glyphNames`
+    reloadPattern = {
+        methodName[3].lower() + methodName[4:]: None
+        for methodName in fontDataMethodNames
+    }
+    reloadPattern["glyphs"] = {glyphName: None for glyphName in sorted(glyphNames)}
+    return reloadPattern
+
+
+def openRealBackend(projectPath):
+    from fontra.backends import getFileSystemBackend
+
+    return getFileSystemBackend(projectPath)
+
+
+class SnapshotBackend:
+    # Serves everything from a snapshot file, reading glyphs lazily. The real
+    # backend is only loaded when something is asked that the snapshot doesn't
+    # have, or, for WritableSnapshotBackend, on the first write, or once the
+    # source changed on disk.
+
+    # Seconds between checks of the source for external changes
+    sourcePollInterval = 2.0
+
+    def __init__(self, projectPath, reader, onInvalidate=None):
+        self.projectPath = projectPath
+        self.reader = reader
+        # Called once the source changed on disk: the snapshot is then outdated
+        self.onInvalidate = onInvalidate
+        self._realBackend = None
+        self._realBackendLock = None
+        self._watchTask = None
+
+    async def _getRealBackend(self):
+        # Parsed in a thread, so the server's loop isn't held up meanwhile
+        if self._realBackendLock is None:
+            self._realBackendLock = asyncio.Lock()
+        async with self._realBackendLock:
+            if self._realBackend is None:
+                logger.info(
+                    f"loading {self.projectPath} in full, bypassing its snapshot"
+                )
+                self._realBackend = await asyncio.to_thread(
+                    openRealBackend, self.projectPath
+                )
+        return self._realBackend
+
+    async def watchExternalChanges(self, callback):
+        if not self.reader.isWatchable or self._watchTask is not None:
+            return
+        self._watchTask = asyncio.create_task(self._watchSource(callback))
+
+    async def _watchSource(self, callback):
+        # Loading the real backend just to watch it would parse the whole
+        # source on every open, which is what the snapshot saves. Instead, the
+        # source's signature is polled until it changes. Then the real backend
+        # is loaded, everything is reloaded from it, and it watches from then
+        # on, telling exactly what changed.
+        signature = await asyncio.to_thread(getSourceSignature, self.projectPath)
+        while self._realBackend is None:
+            await asyncio.sleep(self.sourcePollInterval)
+            try:
+                newSignature = await asyncio.to_thread(
+                    getSourceSignature, self.projectPath
+                )
+            except OSError:
+                # Being rewritten: look again later
+                continue
+            if newSignature != signature:
+                logger.info(f"{self.projectPath.name} changed on disk")
+                glyphNames = set(self.reader.glyphRecords)
+                realBackend = await self._getRealBackend()
+                self._invalidate()
+                glyphNames.update(await realBackend.getGlyphMap())
+                await callback(None, getFullReloadPattern(glyphNames))
+                break
+        # Otherwise, a write loaded the real backend: it watches from now on
+
+        async def externalChangeCallback(*args):
+            self._invalidate()
+            await callback(*args)
+
+        await self._realBackend.watchExternalChanges(externalChangeCallback)
+        logger.info(f"watching {self.projectPath.name} for external changes")
+
+    def _invalidate(self):
+        if self.onInvalidate is not None:
+            self.onInvalidate()
+            self.onInvalidate = None
+
+    async def _getFontData(self, methodName):
+        if self._realBackend is not None:
+            return await getattr(self._realBackend, methodName)()
+        return self.reader.readRecord(self.reader.fontDataRecords[methodName])
+
+    async def getGlyphMap(self):
+        return await self._getFontData("getGlyphMap")
+
+    async def getAxes(self):
+        return await self._getFontData("getAxes")
+
+    async def getSources(self):
+        return await self._getFontData("getSources")
+
+    async def getUnitsPerEm(self):
+        return await self._getFontData("getUnitsPerEm")
+
+    async def getFontInfo(self):
+        return await self._getFontData("getFontInfo")
+
+    async def getKerning(self):
+        return await self._getFontData("getKerning")
+
+    async def getFeatures(self):
+        return await self._getFontData("getFeatures")
+
+    async def getCustomData(self):
+        return await self._getFontData("getCustomData")
+
+    async def getGlyph(self, glyphName):
+        if self._realBackend is not None:
+            return await self._realBackend.getGlyph(glyphName)
+        record = self.reader.glyphRecords.get(glyphName)
+        return self.reader.readRecord(record) if record is not None else None
+
+    async def getBackgroundImage(self, imageIdentifier):
+        realBackend = await self._getRealBackend()
+        return await realBackend.getBackgroundImage(imageIdentifier)
+
+    async def aclose(self):
+        if self._watchTask is not None:
+            self._watchTask.cancel()
+        self.reader.close()
+        if self._realBackend is not None:
+            await self._realBackend.aclose()
+
+
+class WritableSnapshotBackend(SnapshotBackend):
+    pass
+
+
+def _writeThroughMethod(methodName):
+    async def method(self, *args, **kwargs):
+        realBackend = await self._getRealBackend()
+        return await getattr(realBackend, methodName)(*args, **kwargs)
+
+    method.__name__ = methodName
+    return method
+
+
+for _methodName in writeMethodNames:
+    setattr(WritableSnapshotBackend, _methodName, _writeThroughMethod(_methodName))
+
+
+def writeSnapshotFile(backend, snapshotPath):
+    # With an event loop of its own: call it from a thread the backend is not
+    # used from otherwise, see writeProjectSnapshot()
+    asyncio.run(_writeSnapshotFile(backend, snapshotPath))
+
+
+def writeProjectSnapshot(projectPath, snapshotPath):
+    # Runs in a thread, on a private instance of the backend. Backends aren't
+    # thread-safe: the one the server uses must not be read from here.
+    async def writeSnapshot():
+        backend = openRealBackend(projectPath)
+        try:
+            await _writeSnapshotFile(backend, snapshotPath)
+        finally:
+            await backend.aclose()
+
+    asyncio.run(writeSnapshot())
+
+
+async def _writeSnapshotFile(backend, snapshotPath):
+    writer = SnapshotWriter(snapshotPath)
+    try:
+        await _addSnapshotData(writer, backend)
+        writer.finish(
+            isWritable=hasattr(backend, "putGlyph"),
+            isWatchable=hasattr(backend, "watchExternalChanges"),
+        )
+    finally:
+        writer.close()
+
+
+async def _addSnapshotData(writer, backend):
+    for methodName in fontDataMethodNames:
+        writer.addFontData(methodName, await getattr(backend, methodName)())
+    for glyphName in await backend.getGlyphMap():
+        glyph = await backend.getGlyph(glyphName)
+        if glyph is not None:
+            writer.addGlyph(glyphName, glyph)
+
+
+class SnapshotCache:
+    def __init__(
+        self,
+        cacheDir=None,
+        maxSize=defaultMaxSnapshotCacheSize,
+        extensions=snapshotExtensions,
+    ):
+        if cacheDir is None:
+            cacheDir = getCacheDir("snapshots")
+        self.store = DiskCache(cacheDir, maxSize=maxSize, suffix=".snapshot")
+        # The formats we snapshot; others are opened as they are
+        self.extensions = extensions
+        self._writeTasks = set()
+
+    def openBackend(self, projectPath):
+        projectPath = pathlib.Path(projectPath)
+        if projectPath.suffix.lower() not in self.extensions:
+            return openRealBackend(projectPath)
+
+        start = time.perf_counter()
+        key = getSnapshotKey(projectPath)
+        snapshotPath = self.store.lookup(key)
+        if snapshotPath is not None:
+            try:
+                reader = SnapshotReader(snapshotPath)
+            except Exception as e:
+                logger.warning(f"discarding unreadable snapshot {snapshotPath}: {e!r}")
+                self.store.delete(key)
+            else:
+                backendClass = (
+                    WritableSnapshotBackend if reader.isWritable else SnapshotBackend
+                )
+                logger.info(
+                    f"opened {projectPath.name} from its snapshot "
+                    f"in {time.perf_counter() - start:.2f}s"
+                )
+                return backendClass(
+                    projectPath, reader, onInvalidate=lambda: self.invalidate(key)
+                )
+
+        backend = openRealBackend(projectPath)
+        logger.info(f"parsed {projectPath.name} in {time.perf_counter() - start:.2f}s")
+        task = asyncio.get_running_loop().create_task(
+            self.writeSnapshot(key, projectPath)
+        )
+        self._writeTasks.add(task)
+        task.add_done_callback(self._writeTasks.discard)
+        return backend
+
+    def invalidate(self, key):
+        try:
+            self.store.delete(key)
+        except OSError:
+            # Still open, on Windows. The source's new signature gives it a new
+            # key anyway: the old snapshot is only left to be evicted.
+            pass
+
+    async def ensureSnapshot(self, projectPath):
+        # Write the snapshot of `projectPath` unless there is one already
+        projectPath = pathlib.Path(projectPath)
+        key = await asyncio.to_thread(getSnapshotKey, projectPath)
+        if self.store.lookup(key) is None:
+            await self.writeSnapshot(key, projectPath)
+
+    async def flush(self):
+        # Wait for the snapshots of the backends opened so far to be written
+        if self._writeTasks:
+            await asyncio.wait(list(self._writeTasks))
+
+    async def writeSnapshot(self, key, projectPath):
+        snapshotPath = self.store.getPath(key)
+        snapshotPath.parent.mkdir(parents=True, exist_ok=True)
+        fd, tempPath = tempfile.mkstemp(dir=snapshotPath.parent)
+        os.close(fd)
+        try:
+            await asyncio.to_thread(writeProjectSnapshot, projectPath, tempPath)
+            if await asyncio.to_thread(getSnapshotKey, projectPath) != key:
+                # Modified while we read it: what we read may not match what
+                # is on disk now, nor what was there before
+                logger.info(f"not snapshotting {projectPath.name}: it was modified")
+                return
+            os.replace(tempPath, snapshotPath)
+        except Exception as e:
+            logger.warning(f"could not write a snapshot of {projectPath}: {e!r}")
+            return
+        finally:
+            if os.path.exists(tempPath):
+                os.unlink(tempPath)
+        logger.info(f"wrote snapshot of {projectPath.name}")
+        self.store.evict()
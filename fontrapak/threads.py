@@ -0,0 +1,7 @@
+import threading
+
+
+def callInNewThread(function, *args, daemon=None, **kwargs):
+    thread = threading.Thread(target=function, args=args, kwargs=kwargs, daemon=daemon)
+    thread.start()
+    return thread
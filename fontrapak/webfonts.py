@@ -0,0 +1,50 @@
+import shutil
+
+from fontTools.subset import Options, Subsetter, load_font, parse_unicodes, save_font
+from fontTools.ttLib import TTFont
+
+# Formats we derive from a compiled font, see filetypes.compiledFileExtensions
+flavoredFileExtensions = {"woff": "woff", "woff2": "woff2"}
+
+
+def getSubsetPath(destPath, subsetName):
+    return destPath.with_name(f"{destPath.stem}-{subsetName}{destPath.suffix}")
+
+
+def parseSubsets(subsetSpecs):
+    """Parse NAME=UNICODES strings, for example "latin=U+0000-00FF,U+0131",
+    into a {name: [codePoint, ...]} dict.
+    """
+    subsets = {}
+    for subsetSpec in subsetSpecs:
+        name, sep, unicodes = subsetSpec.partition("=")
+        if not sep or not name:
+            raise ValueError(f"expected NAME=UNICODES, got {subsetSpec!r}")
+        subsets[name] = parse_unicodes(unicodes)
+    return subsets
+
+
+def writeOutput(compiledPath, destPath, fileExtension, unicodes=None):
+    """Write `destPath` in format `fileExtension` from the compiled font at
+    `compiledPath`, subsetted to `unicodes` if given.
+    """
+    flavor = flavoredFileExtensions.get(fileExtension)
+    if unicodes is not None:
+        options = Options()
+        options.flavor = flavor
+        options.layout_features = ["*"]
+        options.name_IDs = ["*"]
+        options.notdef_outline = True
+        font = load_font(compiledPath, options)
+        subsetter = Subsetter(options)
+        subsetter.populate(unicodes=unicodes)
+        subsetter.subset(font)
+        save_font(font, destPath, options)
+        font.close()
+    elif flavor is None:
+        shutil.copyfile(compiledPath, destPath)
+    else:
+        font = TTFont(compiledPath)
+        font.flavor = flavor
+        font.save(destPath)
+        font.close()
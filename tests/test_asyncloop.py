@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+QtWidgets = pytest.importorskip("PyQt6.QtWidgets")
+
+from fontrapak.asyncloop import AsyncLoop, StallMonitor, callInMainThread  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication(
+        ["test", "-platform", "offscreen"]
+    )
+
+
+@pytest.fixture
+def asyncLoop():
+    asyncLoop = AsyncLoop()
+    asyncLoop.start()
+    yield asyncLoop
+    asyncLoop.stop()
+
+
+def processEventsUntil(app, condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def test_callInMainThread(app):
+    threadNames = []
+
+    def call():
+        callInMainThread(lambda: threadNames.append(threading.current_thread().name))
+
+    thread = threading.Thread(target=call)
+    thread.start()
+    thread.join()
+    processEventsUntil(app, lambda: threadNames)
+    assert threadNames == [threading.main_thread().name]
+
+
+def test_asyncLoopResults(app, asyncLoop):
+    results = []
+
+    async def succeed():
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def fail():
+        raise ValueError("failed")
+
+    asyncLoop.submit(succeed(), onDone=results.append)
+    asyncLoop.submit(fail(), onError=results.append)
+    processEventsUntil(app, lambda: len(results) == 2)
+    assert 42 in results
+    assert any(isinstance(result, ValueError) for result in results)
+
+
+def test_asyncLoopDoesNotStallGUI(app, asyncLoop):
+    results = []
+
+    async def slowIO():
+        # A slow file system: blocking calls, and waits
+        time.sleep(0.2)
+        await asyncio.sleep(0.2)
+        return "done"
+
+    stallMonitor = StallMonitor()
+    stallMonitor.start()
+    asyncLoop.submit(slowIO(), onDone=results.append)
+    processEventsUntil(app, lambda: results)
+    stallMonitor.stop()
+    assert results == ["done"]
+    assert stallMonitor.maxStall < 0.1, stallMonitor.getStats()
+
+    # What the same work costs when run in the main thread
+    stallMonitor.start()
+    QtWidgets.QApplication.processEvents()
+    time.sleep(0.2)
+    stallMonitor.stop()
+    assert stallMonitor.numStalls == 1
+    assert stallMonitor.maxStall > 0.1
+
+
+def test_asyncLoopStopCancelsTasks(app, asyncLoop):
+    started = threading.Event()
+    cancelled = threading.Event()
+
+    async def waitForever():
+        started.set()
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    future = asyncLoop.submit(waitForever())
+    assert started.wait(5)
+    asyncLoop.stop()
+    assert cancelled.is_set()
+    assert future.cancelled()
+    assert not asyncLoop.thread.is_alive()
+
+
+def test_asyncLoop_stopTimesOut(caplog):
+    asyncLoop = AsyncLoop()
+    asyncLoop.start()
+
+    async def ignoreCancel():
+        while True:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                pass
+
+    asyncLoop.submit(ignoreCancel())
+    asyncLoop.stop(timeout=0.1)
+    assert "didn't stop in time" in caplog.text
@@ -0,0 +1,126 @@
+import json
+import os
+import time
+
+import pytest
+
+pytest.importorskip("fontra.backends")
+
+from fontrapak.batch import (  # noqa: E402
+    isUpToDate,
+    main,
+    makeJob,
+    readManifest,
+    runBatch,
+)
+
+
+def test_readManifest(tmp_path):
+    manifestPath = tmp_path / "jobs.json"
+    manifestPath.write_text(
+        json.dumps(
+            [
+                {"source": "A.ufo"},
+                {"source": "B.designspace", "destination": "out/B.otf"},
+                {"source": "C.glyphs", "format": "fontra"},
+            ]
+        )
+    )
+    jobs = readManifest(manifestPath, "ttf", None)
+    assert [(job.destPath.name, job.fileExtension) for job in jobs] == [
+        ("A.ttf", "ttf"),
+        ("B.otf", "otf"),
+        ("C.fontra", "fontra"),
+    ]
+    assert jobs[1].destPath == (tmp_path / "out" / "B.otf").resolve()
+
+
+def test_isUpToDate(tmp_path):
+    sourcePath = tmp_path / "A.ufo"
+    sourcePath.mkdir()
+    (sourcePath / "fontinfo.plist").write_text("")
+    job = makeJob(sourcePath, "ttf")
+    assert not isUpToDate(job)
+
+    job.destPath.write_bytes(b"")
+    assert isUpToDate(job)
+
+    future = time.time() + 10
+    os.utime(sourcePath / "fontinfo.plist", (future, future))
+    assert not isUpToDate(job)
+
+
+def test_isUpToDate_allFormatsAndSubsets(tmp_path):
+    sourcePath = tmp_path / "A.ufo"
+    sourcePath.mkdir()
+    (sourcePath / "fontinfo.plist").write_text("")
+    job = makeJob(sourcePath, "ttf,woff2")
+    job.subsets = {"latin": [65]}
+    outputPaths = [
+        tmp_path / fileName
+        for fileName in ["A.ttf", "A.woff2", "A-latin.ttf", "A-latin.woff2"]
+    ]
+    for path in outputPaths:
+        path.write_bytes(b"")
+    assert isUpToDate(job)
+
+    # Any missing output makes the job run
+    for path in outputPaths[1:]:
+        path.unlink()
+        assert not isUpToDate(job)
+        path.write_bytes(b"")
+
+
+def test_runBatch_missingSource(tmp_path):
+    sourcePath = tmp_path / "A.ufo"
+    sourcePath.mkdir()
+    job = makeJob(sourcePath, "ttf")
+    job.destPath.write_bytes(b"")
+    sourcePath.rmdir()
+    results, _ = runBatch([job], printFunc=lambda line: None)
+    assert [result.status for result in results] == ["failed"]
+    assert "source not found" in results[0].logText
+
+
+def test_isUpToDate_fanOut(tmp_path):
+    sourcePath = tmp_path / "A.ufo"
+    sourcePath.mkdir()
+    (sourcePath / "fontinfo.plist").write_text("")
+    job = makeJob(sourcePath, "ttf")
+    job.fanOut = True
+    # Fan-out writes A-Upright.ttf and A-Italic.ttf, and no A.ttf
+    instancePaths = [tmp_path / "A-Upright.ttf", tmp_path / "A-Italic.ttf"]
+    assert not isUpToDate(job)
+
+    for path in instancePaths:
+        path.write_bytes(b"")
+    (tmp_path / "A.ttf.timing.json").write_text(
+        json.dumps(
+            dict(
+                instances=[
+                    dict(destination=str(path), status="done") for path in instancePaths
+                ]
+            )
+        )
+    )
+    assert isUpToDate(job)
+
+    instancePaths[1].unlink()
+    assert not isUpToDate(job)
+
+
+def test_main_usageErrors(tmp_path, capsys):
+    sourcePath = tmp_path / "A.ttf"
+    sourcePath.write_bytes(b"")
+    manifestPath = tmp_path / "jobs.json"
+    manifestPath.write_text(json.dumps([{"source": "B.ufo", "format": "png"}]))
+
+    for args in [
+        [os.fspath(sourcePath), "--format", "ttf"],
+        ["--manifest", os.fspath(manifestPath)],
+        ["--manifest", os.fspath(tmp_path / "missing.json")],
+    ]:
+        with pytest.raises(SystemExit) as excinfo:
+            main(args)
+        assert excinfo.value.code == 2
+    assert "unknown format: png" in capsys.readouterr().err
@@ -0,0 +1,116 @@
+import asyncio
+import gzip
+import threading
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from fontrapak import clientassets
+from fontrapak.clientassets import (
+    chooseEncoding,
+    makeClientAssetsMiddleware,
+    writeBuildAssets,
+)
+from fontrapak.paths import getCacheDir
+
+scriptData = b"console.log('hello');\n" * 100
+
+
+def test_chooseEncoding():
+    assert chooseEncoding("gzip, deflate, br") in {"br", "gzip"}
+    assert chooseEncoding("gzip;q=1.0") == "gzip"
+    assert chooseEncoding("identity") is None
+    assert chooseEncoding("") is None
+
+
+def test_clientAssetsMiddleware(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path))
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+    compressThreads = []
+    compressData = clientassets.compressData
+
+    def recordingCompressData(data, encoding):
+        compressThreads.append(threading.current_thread())
+        return compressData(data, encoding)
+
+    monkeypatch.setattr(clientassets, "compressData", recordingCompressData)
+
+    async def scriptHandler(request):
+        return web.Response(body=scriptData, content_type="text/javascript")
+
+    async def run():
+        app = web.Application(middlewares=[makeClientAssetsMiddleware("abcd1234")])
+        app.router.add_get("/{path:.*}", scriptHandler)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.get(
+                "/core/app.js?abcd1234",
+                headers={"Accept-Encoding": "gzip"},
+                auto_decompress=False,
+            )
+            assert response.headers["Content-Encoding"] == "gzip"
+            assert "immutable" in response.headers["Cache-Control"]
+            assert gzip.decompress(await response.read()) == scriptData
+
+            response = await client.get(
+                "/core/app.js", headers={"Accept-Encoding": "identity"}
+            )
+            assert "Content-Encoding" not in response.headers
+            assert "Cache-Control" not in response.headers
+            assert await response.read() == scriptData
+
+    asyncio.run(run())
+    # Compressed once, off the event loop's thread
+    assert len(compressThreads) == 1
+    assert compressThreads[0] is not threading.main_thread()
+
+
+def test_precompressedRewrittenAsset(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "cache"))
+    monkeypatch.setenv("HOME", str(tmp_path / "cache"))
+
+    clientDir = tmp_path / "client"
+    (clientDir / "core").mkdir(parents=True)
+    (clientDir / "core" / "app.js").write_bytes(
+        b"import { x } from './x.js';\n" + scriptData
+    )
+
+    def iterClientFiles():
+        yield "core/app.js", clientDir / "core" / "app.js"
+
+    def rewriteClientFile(relativePath, data, versionToken):
+        # Stands in for the server's rewrite
+        return data.replace(b".js'", f".js?{versionToken}'".encode())
+
+    buildDir = tmp_path / "build"
+    monkeypatch.setattr(clientassets, "iterClientFiles", iterClientFiles)
+    monkeypatch.setattr(clientassets, "rewriteClientFile", rewriteClientFile)
+    versionToken = writeBuildAssets(buildDir)
+    monkeypatch.setattr(clientassets, "getBundledAssetsDir", lambda: buildDir)
+
+    async def scriptHandler(request):
+        data = (clientDir / request.match_info["path"]).read_bytes()
+        return web.Response(
+            body=rewriteClientFile(request.match_info["path"], data, versionToken),
+            content_type="text/javascript",
+        )
+
+    async def run():
+        app = web.Application(middlewares=[makeClientAssetsMiddleware(versionToken)])
+        app.router.add_get("/{path:.*}", scriptHandler)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.get(
+                f"/core/app.js?{versionToken}",
+                headers={"Accept-Encoding": "gzip"},
+                auto_decompress=False,
+            )
+            return await response.read()
+
+    body = asyncio.run(run())
+    assert f"./x.js?{versionToken}".encode() in gzip.decompress(body)
+    bundledVariants = [path.read_bytes() for path in buildDir.rglob("*.gz")]
+    assert len(bundledVariants) == 2 and body in bundledVariants
+    # Served from the bundle: nothing was compressed at request time
+    assert not any(getCacheDir("compressed-assets").rglob("*.*"))
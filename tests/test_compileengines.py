@@ -0,0 +1,33 @@
+import pytest
+
+from fontrapak.compileengines import (
+    compileEngineEnvironmentVariable,
+    compileEngines,
+    getCompileEngine,
+)
+
+
+def test_getCompileEngine(monkeypatch):
+    monkeypatch.delenv(compileEngineEnvironmentVariable, raising=False)
+    assert getCompileEngine().name == "fontmake"
+    assert getCompileEngine("fontra", "ttf").name == "fontra"
+    # fontra-compile doesn't write CFF
+    assert getCompileEngine("fontra", "otf").name == "fontmake"
+
+    monkeypatch.setenv(compileEngineEnvironmentVariable, "fontra")
+    assert getCompileEngine().name == "fontra"
+
+    with pytest.raises(ValueError):
+        getCompileEngine("nonexistent")
+
+
+def test_getOutputStep():
+    step = compileEngines["fontra"].getOutputStep("Test.ttf")
+    assert step == dict(output="compile-fontra", destination="Test.ttf")
+    step = compileEngines["fontmake"].getOutputStep("Test.otf")
+    assert step["output"] == "compile-fontmake"
+    assert "verbose" not in step["options"]
+    step = compileEngines["fontmake"].getOutputStep("Test.otf", logLevel="INFO")
+    assert step["options"]["verbose"] == "INFO"
+    step = compileEngines["fontra"].getOutputStep("Test.ttf", logLevel="INFO")
+    assert "options" not in step
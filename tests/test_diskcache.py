@@ -0,0 +1,39 @@
+import os
+import time
+
+from fontrapak.diskcache import DiskCache
+
+
+def test_diskCache_roundtrip(tmp_path):
+    cache = DiskCache(tmp_path, maxSize=1000)
+    assert cache.get("abcd") is None
+    cache.put("abcd", b"data")
+    assert cache.get("abcd") == b"data"
+    cache.delete("abcd")
+    assert cache.get("abcd") is None
+
+
+def test_diskCache_evictBySize(tmp_path):
+    cache = DiskCache(tmp_path, maxSize=250)
+    now = time.time()
+    for i, key in enumerate(["aa01", "bb02", "cc03"]):
+        cache.put(key, bytes(100))
+        os.utime(cache.getPath(key), (now - 100 + i, now - 100 + i))
+    # Reading a key makes it the most recently used one
+    cache.get("aa01")
+    cache.evict()
+    assert cache.get("bb02") is None
+    assert cache.get("aa01") is not None
+    assert cache.get("cc03") is not None
+    assert cache.totalSize() == 200
+
+
+def test_diskCache_evictByAge(tmp_path):
+    cache = DiskCache(tmp_path, maxSize=1000, maxAge=60)
+    cache.put("aa01", b"old")
+    cache.put("bb02", b"new")
+    longAgo = time.time() - 120
+    os.utime(cache.getPath("aa01"), (longAgo, longAgo))
+    cache.evict()
+    assert cache.get("aa01") is None
+    assert cache.get("bb02") == b"new"
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+classes = pytest.importorskip("fontra.core.classes")
+
+from fontrapak.exportcache import ExportCache, getToolVersions  # noqa: E402
+
+
+class FakeSourceBackend:
+    def __init__(self):
+        self.glyphReads = 0
+
+    async def getGlyphMap(self):
+        return {"A": [65]}
+
+    async def getAxes(self):
+        return classes.Axes()
+
+    async def getSources(self):
+        return {}
+
+    async def getUnitsPerEm(self):
+        return 1000
+
+    async def getFontInfo(self):
+        return classes.FontInfo()
+
+    async def getKerning(self):
+        return {}
+
+    async def getFeatures(self):
+        return classes.OpenTypeFeatures()
+
+    async def getCustomData(self):
+        return {}
+
+    async def getGlyph(self, glyphName):
+        self.glyphReads += 1
+        return classes.VariableGlyph(name=glyphName)
+
+
+def test_getToolVersions():
+    versions = getToolVersions(["fonttools", "no-such-distribution"])
+    assert versions["fonttools"]
+    assert versions["no-such-distribution"] is None
+
+
+def test_exportCache_unchangedSourceIsNotRead(tmp_path):
+    sourcePath = tmp_path / "A.fontra"
+    sourcePath.write_text("a")
+    compiledPath = tmp_path / "A.ttf"
+
+    async def export(sourceBackend):
+        exportCache = ExportCache(tmp_path / "cache", maxSize=None)
+        await exportCache.setup(sourceBackend, [], sourcePath)
+        outputKey = await exportCache.getOutputKey(".ttf")
+        if not exportCache.restoreOutput(outputKey, compiledPath):
+            compiledPath.write_bytes(b"compiled")
+            exportCache.storeOutput(outputKey, compiledPath)
+        return outputKey
+
+    firstBackend = FakeSourceBackend()
+    outputKey = asyncio.run(export(firstBackend))
+    assert firstBackend.glyphReads == 1
+
+    # Found by the source's file signature, without reading its glyphs
+    compiledPath.unlink()
+    secondBackend = FakeSourceBackend()
+    assert asyncio.run(export(secondBackend)) == outputKey
+    assert secondBackend.glyphReads == 0
+    assert compiledPath.read_bytes() == b"compiled"
+
+    # A changed source is read and hashed again
+    sourcePath.write_text("ab")
+    thirdBackend = FakeSourceBackend()
+    asyncio.run(export(thirdBackend))
+    assert thirdBackend.glyphReads == 1
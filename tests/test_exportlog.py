@@ -0,0 +1,78 @@
+import io
+import logging
+
+import pytest
+
+from fontrapak.exportlog import ExportLog, readLogTail
+
+logger = logging.getLogger("fontrapak.test")
+
+
+def test_exportLog_levels_and_shipping():
+    logFile = io.StringIO()
+    events = []
+    with ExportLog(logFile, events.append, level="INFO", shipInterval=0) as log:
+        logger.debug("detail")
+        logger.info("step one")
+        logger.warning("step two")
+    stats = log.getStats()
+
+    logText = logFile.getvalue()
+    assert "step one" in logText and "step two" in logText
+    assert "detail" not in logText
+    shippedLines = [line for event in events for line in event["lines"]]
+    assert [line.split()[-2:] for line in shippedLines] == [
+        ["step", "one"],
+        ["step", "two"],
+    ]
+    assert stats["records"] == 3
+    assert stats["recordsWritten"] == 2
+    assert stats["loggingTime"] > 0
+    assert log.shippingHandler not in logging.getLogger().handlers
+    assert log.ringBufferHandler not in logging.getLogger().handlers
+
+
+def test_exportLog_leavesOtherLoggersAtLevel():
+    otherLogger = logging.getLogger("fontTools.test")
+    rootLevel = logging.getLogger().level
+    with ExportLog(io.StringIO(), level="INFO") as log:
+        otherLogger.debug("noise")
+        otherLogger.info("step")
+        assert not otherLogger.isEnabledFor(logging.DEBUG)
+        assert logger.isEnabledFor(logging.DEBUG)
+    # Debug calls of other libraries don't make records
+    assert log.getStats()["records"] == 1
+    assert logging.getLogger().level == rootLevel
+    assert logging.getLogger("fontrapak").level == logging.NOTSET
+
+
+def test_exportLog_batches():
+    events = []
+    with ExportLog(io.StringIO(), events.append, level="INFO", shipInterval=60):
+        for i in range(10):
+            logger.info(f"record {i}")
+    # The first record is shipped right away, the rest when the log closes
+    assert [len(event["lines"]) for event in events] == [1, 9]
+
+
+def test_exportLog_dumpsRingBufferOnFailure():
+    logFile = io.StringIO()
+    with pytest.raises(ValueError):
+        with ExportLog(logFile, level="INFO", ringBufferSize=3):
+            for i in range(5):
+                logger.debug(f"detail {i}")
+            raise ValueError()
+    logText = logFile.getvalue()
+    assert "detail 1" not in logText
+    assert "detail 2" in logText and "detail 4" in logText
+
+
+def test_readLogTail(tmp_path):
+    logFilePath = tmp_path / "export.log"
+    logFilePath.write_text("".join(f"line {i}\n" for i in range(1000)))
+    tail = readLogTail(logFilePath, maxSize=100)
+    lines = tail.splitlines()
+    assert lines[0] == "…"
+    assert lines[-1] == "line 999"
+    assert len(tail) < 110
+    assert readLogTail(tmp_path / "missing.log") == ""
@@ -0,0 +1,153 @@
+import os
+import pathlib
+import threading
+import types
+
+import pytest
+
+from fontrapak.compileengines import compileEngineEnvironmentVariable
+from fontrapak.exportworker import ExportJob, ExportWorkerPool, getDefaultMaxWorkers
+from fontrapak.filetypes import getOptionalModules
+
+
+def makeJob(tmp_path, name, **kwargs):
+    return ExportJob(
+        sourcePath=tmp_path / f"{name}.designspace",
+        destPath=tmp_path / f"{name}.ttf",
+        fileExtension="ttf",
+        logFilePath=str(tmp_path / f"{name}.log"),
+        **kwargs,
+    )
+
+
+def test_getDefaultMaxWorkers():
+    assert 1 <= getDefaultMaxWorkers() <= os.cpu_count()
+
+
+def test_exportWorkerPool_queue(tmp_path):
+    # Without workers, jobs stay queued
+    pool = ExportWorkerPool(maxWorkers=0)
+    cancelled = []
+    jobA = pool.submit(makeJob(tmp_path, "A", onFinished=cancelled.append))
+    jobB = pool.submit(makeJob(tmp_path, "B"))
+    jobC = pool.submit(makeJob(tmp_path, "C"))
+
+    # An identical request is merged into the queued job
+    assert pool.submit(makeJob(tmp_path, "A")) is jobA
+    assert jobA.numRequests == 2
+    assert pool.submit(makeJob(tmp_path, "A", compileEngine="fontra")) is not jobA
+    assert len(pool.pendingJobs) == 4
+
+    assert pool.moveJob(jobC, 0)
+    assert pool.pendingJobs[:3] == [jobC, jobA, jobB]
+    assert pool.moveJob(jobC, -1)
+    assert pool.pendingJobs[-1] is jobC
+
+    pool.cancel(jobA)
+    assert jobA.status == "cancelled" and jobA.isFinished
+    assert cancelled == [jobA]
+    assert jobA not in pool.pendingJobs
+    assert not pool.moveJob(jobA, 0)
+
+
+class FakeWorker:
+    def __init__(self, job, messages):
+        self.job = job
+        self.process = types.SimpleNamespace(pid=12345)
+        self.connection = types.SimpleNamespace(recv=messages.pop)
+
+
+def test_exportWorkerPool_cancelWhileStarting(tmp_path, monkeypatch):
+    killedPIDs = []
+    monkeypatch.setattr(os, "kill", lambda pid, signum: killedPIDs.append(pid))
+    pool = ExportWorkerPool(maxWorkers=0)
+    job = makeJob(tmp_path, "A")
+    job.status = "starting"
+    worker = FakeWorker(job, [("started", job.jobId)])
+    pool.workers.append(worker)
+
+    # The worker may not honour SIGINT yet: the cancel waits for "started"
+    pool.cancel(job)
+    assert killedPIDs == [] and job.cancelRequested
+    assert not job.isFinished
+    pool._receiveFromWorker(worker)
+    assert job.status == "running"
+    assert killedPIDs == [12345]
+
+
+def test_exportJob_fanOut(tmp_path):
+    job = makeJob(tmp_path, "A", liveSource=dict(url="http://localhost:8000"))
+    assert job.exportOptions()["liveSource"] is not None
+    fanOutJob = makeJob(tmp_path, "A", fanOut=True)
+    assert fanOutJob.getMergeKey() != job.getMergeKey()
+    # Fan-out reads the source from disk
+    assert fanOutJob.exportOptions() == dict(
+        compileEngine=None, memoryLimit=None, fanOut=True
+    )
+
+
+def test_preloadModules(tmp_path, monkeypatch):
+    monkeypatch.delenv(compileEngineEnvironmentVariable, raising=False)
+    assert getOptionalModules("MyFont.ufo") == []
+    # The compiler is the engine's, fontmake by default
+    assert getOptionalModules("MyFont.glyphs", "MyFont.ttf") == [
+        "fontmake.font_project",
+        "fontra_glyphs",
+    ]
+    assert getOptionalModules("MyFont.woff2", compileEngine="fontra") == [
+        "fontra_compile"
+    ]
+    # fontra-compile doesn't write CFF
+    assert getOptionalModules("MyFont.otf", compileEngine="fontra") == [
+        "fontmake.font_project"
+    ]
+
+    # Plugins are imported once a job needs them, and by new workers after
+    pool = ExportWorkerPool(maxWorkers=0)
+    assert pool.optionalModules == set()
+    pool.submit(
+        ExportJob(
+            sourcePath=tmp_path / "A.rcjk",
+            destPath=tmp_path / "A.fontra",
+            fileExtension="fontra",
+            logFilePath=str(tmp_path / "A.log"),
+        )
+    )
+    assert pool.optionalModules == {"fontra_rcjk"}
+    pool.preloadModules(getOptionalModules("B.designspace", "B.otf"))
+    assert pool.optionalModules == {"fontra_rcjk", "fontmake.font_project"}
+
+
+def test_exportWorkerPool_failure_and_reuse(tmp_path):
+    pytest.importorskip("fontra.backends")
+    pool = ExportWorkerPool(maxWorkers=1)
+    pool.start()
+    try:
+        finished = []
+        allFinished = threading.Event()
+
+        def onFinished(job):
+            finished.append(job)
+            if len(finished) == 2:
+                allFinished.set()
+
+        jobs = [
+            ExportJob(
+                sourcePath=tmp_path / f"missing{i}.designspace",
+                destPath=tmp_path / f"out{i}.ufo",
+                fileExtension="ufo",
+                logFilePath=str(tmp_path / f"log{i}.txt"),
+                onFinished=onFinished,
+            )
+            for i in range(2)
+        ]
+        for job in jobs:
+            pool.submit(job)
+
+        assert allFinished.wait(60)
+        assert [job.status for job in finished] == ["failed", "failed"]
+        assert "Traceback" in pathlib.Path(jobs[0].logFilePath).read_text()
+        # Both jobs ran in the same, still living, worker
+        assert len(pool.workers) == 1
+    finally:
+        pool.shutdown()
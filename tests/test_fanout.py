@@ -0,0 +1,31 @@
+import pathlib
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fontra.backends")
+
+from fontrapak.fanout import getDiscreteInstances  # noqa: E402
+
+
+def test_getDiscreteInstances():
+    axes = [
+        SimpleNamespace(
+            name="italic",
+            values=[0, 1],
+            valueLabels=[
+                SimpleNamespace(name="Upright", value=0),
+                SimpleNamespace(name="Italic", value=1),
+            ],
+        ),
+        SimpleNamespace(name="serif", values=[0, 1], valueLabels=[]),
+    ]
+    instances = getDiscreteInstances(axes, "/out/MyFont.ttf", "/tmp/export.log")
+    assert [instance.destPath for instance in instances] == [
+        pathlib.Path("/out/MyFont-Upright-serif0.ttf"),
+        pathlib.Path("/out/MyFont-Upright-serif1.ttf"),
+        pathlib.Path("/out/MyFont-Italic-serif0.ttf"),
+        pathlib.Path("/out/MyFont-Italic-serif1.ttf"),
+    ]
+    assert instances[2].location == {"italic": 1, "serif": 0}
+    assert len({instance.logFilePath for instance in instances}) == 4
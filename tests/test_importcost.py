@@ -0,0 +1,52 @@
+import pytest
+
+from benchmarks.importcost import (
+    getBundleSizes,
+    measureImports,
+    parseImportTime,
+    summarizeByPackage,
+)
+
+sampleImportTime = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   _io
+import time:       250 |        250 |     fontra.core.path
+import time:      1000 |       1500 |   fontra.core.classes
+import time:      2000 |       3500 | fontra.backends
+"""
+
+
+def test_parseImportTime():
+    imports = parseImportTime(sampleImportTime)
+    assert [item["module"] for item in imports] == [
+        "_io",
+        "fontra.core.path",
+        "fontra.core.classes",
+        "fontra.backends",
+    ]
+    assert [item["depth"] for item in imports] == [1, 2, 1, 0]
+    assert imports[2]["selfTime"] == 0.001
+    assert imports[3]["cumulativeTime"] == 0.0035
+
+    packages = summarizeByPackage(imports)
+    assert list(packages) == ["fontra", "_io"]
+    assert packages["fontra"] == pytest.approx(0.00325)
+
+
+def test_measureImports():
+    result = measureImports(["json"])
+    assert result["status"] == "done"
+    assert "json" in {item["module"] for item in result["modules"]}
+    assert result["rss"] > 0
+    assert measureImports(["no_such_module"])["status"] == "failed"
+
+
+def test_getBundleSizes(tmp_path):
+    # A onedir build
+    (tmp_path / "_internal" / "fontra").mkdir(parents=True)
+    (tmp_path / "_internal" / "fontra" / "data.json").write_bytes(b"x" * 100)
+    (tmp_path / "_internal" / "base_library.zip").write_bytes(b"x" * 10)
+    (tmp_path / "Fontra Pak").write_bytes(b"x" * 1)
+    sizes = getBundleSizes(tmp_path)
+    assert sizes["total"] == 111
+    assert sizes["entries"] == {"fontra": 100, "base_library.zip": 10, "Fontra Pak": 1}
@@ -0,0 +1,61 @@
+import pytest
+
+QtWidgets = pytest.importorskip("PyQt6.QtWidgets")
+
+from fontrapak.exportworker import ExportJob, ExportWorkerPool  # noqa: E402
+from fontrapak.jobspanel import ExportJobsPanel, statusColumn  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication(
+        ["test", "-platform", "offscreen"]
+    )
+
+
+def makeJob(tmp_path, name):
+    return ExportJob(
+        sourcePath=tmp_path / f"{name}.designspace",
+        destPath=tmp_path / f"{name}.ttf",
+        fileExtension="ttf",
+        logFilePath=str(tmp_path / f"{name}.log"),
+    )
+
+
+def test_exportJobsPanel(app, tmp_path):
+    pool = ExportWorkerPool(maxWorkers=0)
+    detailsShown = []
+    panel = ExportJobsPanel(pool, detailsShown.append)
+
+    jobs = [pool.submit(makeJob(tmp_path, name)) for name in "ABC"]
+    for job in jobs:
+        panel.addJob(job)
+    panel.addJob(pool.submit(makeJob(tmp_path, "A")))
+    assert panel.tree.topLevelItemCount() == 3
+    assert panel.rows[jobs[0].jobId].item.text(statusColumn) == "Queued"
+
+    # Move C to the front, in the queue and in the list
+    panel.tree.setCurrentItem(panel.rows[jobs[2].jobId].item)
+    assert panel.runNextButton.isEnabled()
+    panel.runNext()
+    assert pool.pendingJobs[0] is jobs[2]
+    assert panel.tree.topLevelItem(0) is panel.rows[jobs[2].jobId].item
+
+    panel.jobProgress(jobs[2], dict(event="stageStarted", stage="compile"))
+    assert panel.rows[jobs[2].jobId].item.text(statusColumn) == "Compiling…"
+
+    panel.jobProgress(jobs[2], dict(event="instances", done=1, total=4))
+    assert panel.rows[jobs[2].jobId].item.text(statusColumn) == (
+        "Compiling: 1 of 4 fonts"
+    )
+
+    pool.cancel(jobs[2])
+    panel.jobFinished(jobs[2])
+    assert panel.rows[jobs[2].jobId].item.text(statusColumn) == "Cancelled"
+    assert panel.detailsButton.isEnabled()
+    panel.showDetails()
+    assert detailsShown == [jobs[2]]
+
+    panel.clearFinished()
+    assert panel.tree.topLevelItemCount() == 2
+    assert jobs[2].jobId not in panel.rows
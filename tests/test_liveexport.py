@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+classes = pytest.importorskip("fontra.core.classes")
+
+from fontrapak.liveexport import (  # noqa: E402
+    LiveServerBackend,
+    liveFontPath,
+    liveTokenHeader,
+    makeLiveExportMiddleware,
+    openLiveBackend,
+)
+from fontrapak.pipelinedcopy import copyFontPipelined  # noqa: E402
+
+token = "secret"
+
+
+class FakeFontHandler:
+    glyphMap = {"A": [65], "B": [66], "C": [67]}
+
+    def __init__(self):
+        self.glyphCalls = 0
+
+    async def getGlyphMap(self):
+        return self.glyphMap
+
+    async def getAxes(self):
+        return classes.Axes()
+
+    async def getSources(self):
+        return {}
+
+    async def getUnitsPerEm(self):
+        return 1000
+
+    async def getFontInfo(self):
+        return classes.FontInfo(familyName="Live")
+
+    async def getKerning(self):
+        return {}
+
+    async def getFeatures(self):
+        return classes.OpenTypeFeatures()
+
+    async def getCustomData(self):
+        return {"key": "value"}
+
+    async def getGlyph(self, glyphName):
+        self.glyphCalls += 1
+        if glyphName not in self.glyphMap:
+            return None
+        return classes.VariableGlyph(name=glyphName)
+
+
+class FakeProjectManager:
+    def __init__(self):
+        self.fontHandler = FakeFontHandler()
+
+    async def getFontHandler(self, projectIdentifier):
+        if projectIdentifier != "test.fontra":
+            raise FileNotFoundError(projectIdentifier)
+        return self.fontHandler
+
+
+def runWithServer(projectManager, function):
+    async def run():
+        app = web.Application(
+            middlewares=[makeLiveExportMiddleware(projectManager, token)]
+        )
+        async with TestClient(TestServer(app, host="127.0.0.1")) as client:
+            serverURL = str(client.make_url("")).rstrip("/")
+            return await function(client, serverURL)
+
+    return asyncio.run(run())
+
+
+def test_liveServerBackend():
+    projectManager = FakeProjectManager()
+
+    async def readFont(client, serverURL):
+        backend = LiveServerBackend(serverURL, token, "test.fontra")
+        await backend.connect()
+        try:
+            glyphs = await asyncio.gather(
+                *(backend.getGlyph(name) for name in ["A", "B", "C", "A", "X"])
+            )
+            return (
+                await backend.getGlyphMap(),
+                await backend.getFontInfo(),
+                await backend.getCustomData(),
+                glyphs,
+                backend.numRequests,
+            )
+        finally:
+            await backend.aclose()
+
+    glyphMap, fontInfo, customData, glyphs, numRequests = runWithServer(
+        projectManager, readFont
+    )
+    assert glyphMap == FakeFontHandler.glyphMap
+    assert fontInfo.familyName == "Live"
+    assert customData == {"key": "value"}
+    assert [glyph and glyph.name for glyph in glyphs] == ["A", "B", "C", "A", None]
+    # One request for the font, one for all glyphs asked for at once
+    assert numRequests == 2
+    assert projectManager.fontHandler.glyphCalls == 4
+
+
+def test_liveExportNeedsToken():
+    async def request(client, serverURL):
+        response = await client.get(f"{liveFontPath}?project=test.fontra")
+        wrongToken = await client.get(
+            f"{liveFontPath}?project=test.fontra", headers={liveTokenHeader: "x"}
+        )
+        return response.status, wrongToken.status
+
+    assert runWithServer(FakeProjectManager(), request) == (403, 403)
+
+
+def test_openLiveBackendFallsBack():
+    async def openMissingProject(client, serverURL):
+        return await openLiveBackend(
+            dict(serverURL=serverURL, token=token, projectIdentifier="missing")
+        )
+
+    assert runWithServer(FakeProjectManager(), openMissingProject) is None
+
+
+class FakeDestBackend:
+    def __init__(self):
+        self.glyphs = {}
+
+    async def putGlyph(self, glyphName, glyph, codePoints):
+        self.glyphs[glyphName] = glyph
+
+    def __getattr__(self, methodName):
+        # The other font data setters
+        if not methodName.startswith("put"):
+            raise AttributeError(methodName)
+
+        async def putFontData(*args, **kwargs):
+            pass
+
+        return putFontData
+
+
+def test_copyFontPipelined_liveSource():
+    pytest.importorskip("fontra.backends.copy")
+    destBackend = FakeDestBackend()
+
+    async def copyFont(client, serverURL):
+        sourceBackend = await openLiveBackend(
+            dict(serverURL=serverURL, token=token, projectIdentifier="test.fontra")
+        )
+        try:
+            await copyFontPipelined(sourceBackend, destBackend)
+        finally:
+            await sourceBackend.aclose()
+
+    runWithServer(FakeProjectManager(), copyFont)
+    assert sorted(destBackend.glyphs) == ["A", "B", "C"]
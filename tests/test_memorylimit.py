@@ -0,0 +1,131 @@
+import asyncio
+import subprocess
+import sys
+
+import pytest
+
+from fontrapak.memory import (
+    getCurrentRSS,
+    getDescendantPIDs,
+    getProcessRSS,
+    getProcessTreeRSS,
+)
+from fontrapak.memorylimit import (
+    BoundedGlyphBackend,
+    MemoryLimitExceeded,
+    MemoryMonitor,
+    getMemoryLimit,
+    getSharedMemoryLimit,
+    memoryLimitEnvironmentVariable,
+    parseByteSize,
+)
+from fontrapak.progress import ExportProgress
+
+
+def test_parseByteSize():
+    assert parseByteSize("512") == 512
+    assert parseByteSize("512M") == 512 * 1024**2
+    assert parseByteSize("1.5g") == 3 * 1024**3 // 2
+    assert parseByteSize("4GB") == 4 * 1024**3
+    with pytest.raises(ValueError):
+        parseByteSize("lots")
+
+
+def test_getMemoryLimit(monkeypatch):
+    monkeypatch.setenv(memoryLimitEnvironmentVariable, "2G")
+    assert getMemoryLimit() == 2 * 1024**3
+    assert getMemoryLimit("1G") == 1024**3
+    assert getMemoryLimit(1000) == 1000
+    assert getMemoryLimit("off") is None
+    monkeypatch.setenv(memoryLimitEnvironmentVariable, "off")
+    assert getMemoryLimit() is None
+    monkeypatch.delenv(memoryLimitEnvironmentVariable)
+    limit = getMemoryLimit()
+    assert limit is None or limit > 0
+
+
+def test_getSharedMemoryLimit(monkeypatch):
+    monkeypatch.setenv(memoryLimitEnvironmentVariable, "4G")
+    assert getSharedMemoryLimit(None, 4) == 1024**3
+    assert getSharedMemoryLimit("1G", 2) == 1024**3 // 2
+    assert getSharedMemoryLimit("1G", 0) == 1024**3
+    assert getSharedMemoryLimit("off", 4) == "off"
+    # The shared limit can be passed on as the limit of a single export
+    assert getMemoryLimit(getSharedMemoryLimit("off", 4)) is None
+    assert getMemoryLimit(getSharedMemoryLimit(1000, 4)) == 250
+
+
+def test_processTreeRSS_countsChildren():
+    childSize = 128 * 1024**2
+    child = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            f"import time; data = b'x' * {childSize}; print(flush=True); "
+            "time.sleep(60)",
+        ],
+        stdout=subprocess.PIPE,
+    )
+    try:
+        child.stdout.readline()
+        assert child.pid in getDescendantPIDs()
+        assert getProcessRSS(child.pid) >= childSize
+        assert getProcessTreeRSS() - getCurrentRSS() >= childSize
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_memoryMonitor_stagePeaks():
+    with MemoryMonitor() as monitor:
+        progress = ExportProgress(memoryMonitor=monitor)
+        with progress.stage("read"):
+            pass
+    report = progress.getReport()
+    assert report["memoryLimit"] is None
+    assert 0 < report["stages"][0]["peakRSS"] <= report["peakRSS"]
+
+
+def test_memoryMonitor_limitExceeded():
+    limit = getProcessTreeRSS() + 64 * 1024**2
+
+    async def useMemory():
+        data = bytearray(128 * 1024**2)  # noqa: F841
+        await asyncio.sleep(10)
+
+    with MemoryMonitor(limit, interval=0.01) as monitor:
+        progress = ExportProgress(memoryMonitor=monitor)
+
+        async def export():
+            with progress.stage("compile"):
+                await useMemory()
+
+        with pytest.raises(MemoryLimitExceeded, match="“compile” stage"):
+            asyncio.run(monitor.run(export()))
+        with pytest.raises(MemoryLimitExceeded):
+            progress.glyphDone("A")
+
+
+class SlowBackend:
+    def __init__(self):
+        self.pending = self.maxPending = 0
+
+    async def getGlyph(self, glyphName):
+        self.pending += 1
+        self.maxPending = max(self.maxPending, self.pending)
+        await asyncio.sleep(0.001)
+        self.pending -= 1
+        return glyphName
+
+
+def test_boundedGlyphBackend():
+    backend = SlowBackend()
+
+    async def readGlyphs():
+        boundedBackend = BoundedGlyphBackend(backend, maxPendingGlyphs=4)
+        return await asyncio.gather(
+            *(boundedBackend.getGlyph(f"glyph{i}") for i in range(50))
+        )
+
+    assert len(asyncio.run(readGlyphs())) == 50
+    assert backend.maxPending == 4
@@ -0,0 +1,148 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from fontrapak.messagebus import MessageBus, MessageBusFull, RemoteError
+
+
+def waitFor(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def makeBusPair(handlerA, handlerB, kwargsA={}, kwargsB={}):
+    queueAB = multiprocessing.Queue()
+    queueBA = multiprocessing.Queue()
+    busA = MessageBus(queueAB, queueBA, handlerA, **kwargsA)
+    busB = MessageBus(queueBA, queueAB, handlerB, **kwargsB)
+    return busA, busB
+
+
+@pytest.fixture
+def buses():
+    started = []
+    yield started
+    for bus in started:
+        bus.close()
+
+
+def test_postAndRequest(buses):
+    received = []
+
+    def handler(action, path, options):
+        if action == "fail":
+            raise ValueError(path)
+        received.append((action, path, options))
+        return options["value"] * 2
+
+    busA, busB = makeBusPair(None, handler)
+    buses.extend([busA, busB])
+    busA.start()
+    busB.start()
+
+    busA.post("prefetchProject", "a/b.ufo", {"value": 1})
+    future = busA.request("double", None, {"value": 21})
+    assert future.result(5) == 42
+    with pytest.raises(RemoteError, match="ValueError"):
+        busA.request("fail", "x", None).result(5)
+
+    assert received == [
+        ("prefetchProject", "a/b.ufo", {"value": 1}),
+        ("double", None, {"value": 21}),
+    ]
+    stats = busB.getStats()
+    assert stats["prefetchProject"]["calls"] == 1
+    assert stats["double"]["maxTime"] >= 0
+    assert busA.getStats()["double (round trip)"]["calls"] == 1
+
+
+def test_burstIsDeliveredOnce(buses):
+    received = []
+    deliveries = []
+
+    def deliver(function, *args):
+        deliveries.append(len(args[0]))
+        function(*args)
+
+    busA, busB = makeBusPair(
+        None,
+        lambda action, path, options: received.append(options),
+        kwargsB=dict(deliver=deliver),
+    )
+    buses.extend([busA, busB])
+    busA.start()
+    for i in range(50):
+        busA.post("progress", None, i)
+    waitFor(lambda: not busA._outbox)
+    time.sleep(0.1)
+
+    busB.start()
+    waitFor(lambda: len(received) == 50)
+    assert received == list(range(50))
+    assert deliveries == [50]
+
+
+def test_backpressure(buses):
+    received = []
+    heldDeliveries = []
+    holding = True
+
+    def deliver(function, *args):
+        if holding:
+            heldDeliveries.append((function, args))
+        else:
+            function(*args)
+
+    busA, busB = makeBusPair(
+        None,
+        lambda action, path, options: received.append(options),
+        kwargsA=dict(maxInFlight=5),
+        kwargsB=dict(deliver=deliver),
+    )
+    buses.extend([busA, busB])
+    busA.start()
+    busB.start()
+
+    # Five go out, five more wait in the outbox, the next doesn't fit
+    for i in range(10):
+        busA.post("progress", None, i, timeout=5)
+    waitFor(lambda: busA._inFlight == 5)
+    with pytest.raises(MessageBusFull):
+        busA.post("progress", None, 10, block=False)
+
+    # Handling the first five lets the rest through
+    holding = False
+    for function, args in heldDeliveries:
+        function(*args)
+    waitFor(lambda: len(received) == 10)
+    assert received == list(range(10))
+    waitFor(lambda: busA._inFlight == 0)
+
+
+def test_asyncHandler(buses):
+    loop = asyncio.new_event_loop()
+    loopThread = threading.Thread(target=loop.run_forever, daemon=True)
+    loopThread.start()
+
+    async def handler(action, path, options):
+        await asyncio.sleep(0.01)
+        return f"{action} {path}"
+
+    busA, busB = makeBusPair(
+        None,
+        lambda action, path, options: handler(action, path, options),
+        kwargsB=dict(deliver=loop.call_soon_threadsafe),
+    )
+    buses.extend([busA, busB])
+    busA.start()
+    busB.start()
+    try:
+        assert busA.request("open", "a.ufo").result(5) == "open a.ufo"
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        loopThread.join()
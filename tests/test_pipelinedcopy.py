@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+import pytest
+
+from fontrapak.pipelinedcopy import ThreadedBackend, aclosingSafely
+
+
+class FakeBackend:
+    def __init__(self):
+        self.glyphs = {}
+        self.threads = set()
+
+    async def putGlyph(self, glyphName, glyph, codePoints):
+        self.threads.add(threading.current_thread().name)
+        if glyphName == "bad":
+            raise ValueError("cannot write glyph")
+        await asyncio.sleep(0.001)
+        self.glyphs[glyphName] = glyph
+
+    async def getGlyph(self, glyphName):
+        self.threads.add(threading.current_thread().name)
+        return self.glyphs.get(glyphName)
+
+
+def test_threadedBackend_writeBehind():
+    async def run():
+        backend = FakeBackend()
+        threaded = ThreadedBackend(backend, "writer", maxPendingWrites=4)
+        try:
+            for i in range(20):
+                await threaded.putGlyph(f"g{i}", i, [])
+            await threaded.flush()
+            assert len(backend.glyphs) == 20
+            assert await threaded.getGlyph("g3") == 3
+        finally:
+            await threaded.shutdown()
+        assert backend.threads == {"writer"}
+
+    asyncio.run(run())
+
+
+def test_threadedBackend_writeError():
+    async def run():
+        threaded = ThreadedBackend(FakeBackend(), "writer", maxPendingWrites=4)
+        try:
+            await threaded.putGlyph("bad", None, [])
+            with pytest.raises(ValueError):
+                await threaded.flush()
+        finally:
+            await threaded.shutdown()
+
+    asyncio.run(run())
+
+
+def test_aclosingSafely_keepsOriginalError(caplog):
+    async def failingClose():
+        raise OSError("cannot close")
+
+    async def run():
+        async with aclosingSafely(failingClose):
+            raise ValueError("original")
+
+    with pytest.raises(ValueError, match="original"):
+        asyncio.run(run())
+    assert "cannot close" in caplog.text
+
+    async def runWithoutError():
+        async with aclosingSafely(failingClose):
+            pass
+
+    with pytest.raises(OSError, match="cannot close"):
+        asyncio.run(runWithoutError())
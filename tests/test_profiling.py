@@ -0,0 +1,50 @@
+import pstats
+
+import pytest
+
+from fontrapak.profiling import (
+    isProfilingEnabled,
+    profiled,
+    profilingEnvironmentVariable,
+    readSummary,
+)
+
+
+def busyFunction():
+    return sum(i * i for i in range(100000))
+
+
+def test_isProfilingEnabled(monkeypatch):
+    monkeypatch.delenv(profilingEnvironmentVariable, raising=False)
+    assert not isProfilingEnabled("export")
+    monkeypatch.setenv(profilingEnvironmentVariable, "export")
+    assert isProfilingEnabled("export")
+    assert not isProfilingEnabled("server")
+    monkeypatch.setenv(profilingEnvironmentVariable, "server, export")
+    assert isProfilingEnabled("server")
+    monkeypatch.setenv(profilingEnvironmentVariable, "all")
+    assert isProfilingEnabled("server")
+
+
+def test_profiled(tmp_path):
+    profilePath = tmp_path / "export.prof"
+    with profiled(profilePath):
+        busyFunction()
+    stats = pstats.Stats(str(profilePath))
+    assert any(name == "busyFunction" for _, _, name in stats.stats)
+    assert "busyFunction" in readSummary(profilePath)
+
+
+def test_profiled_exception(tmp_path):
+    profilePath = tmp_path / "export.prof"
+    with pytest.raises(ZeroDivisionError):
+        with profiled(profilePath):
+            busyFunction()
+            1 / 0
+    assert "busyFunction" in readSummary(profilePath)
+
+
+def test_profiled_disabled(tmp_path):
+    with profiled(None):
+        busyFunction()
+    assert list(tmp_path.iterdir()) == []
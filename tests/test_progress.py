@@ -0,0 +1,31 @@
+import json
+
+from fontrapak.progress import ExportProgress
+
+
+def test_exportProgress_events_and_report(tmp_path):
+    events = []
+    progress = ExportProgress(events.append, minInterval=0)
+
+    with progress.stage("compile"):
+        progress.setGlyphTotal(2)
+        progress.glyphDone("A")
+        progress.glyphDone("A")
+        progress.glyphDone("B")
+
+    assert [event["event"] for event in events] == [
+        "stageStarted",
+        "glyphs",
+        "glyphs",
+        "glyphs",
+        "stageFinished",
+    ]
+    assert events[-2]["done"] == 2
+    assert events[-1]["glyphs"] == 2
+
+    reportPath = tmp_path / "report.json"
+    progress.writeReport(reportPath, format="ttf")
+    report = json.loads(reportPath.read_text())
+    assert report["format"] == "ttf"
+    assert [stage["stage"] for stage in report["stages"]] == ["compile"]
+    assert report["peakRSS"] > 0
@@ -0,0 +1,92 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from fontrapak.servermetrics import (
+    Histogram,
+    ServerMetrics,
+    metricsPath,
+    metricsViewerPath,
+)
+
+
+def test_histogram():
+    histogram = Histogram([0.01, 0.1, 1])
+    assert histogram.getPercentile(0.5) == 0
+    for value in [0.005, 0.005, 0.05, 0.5]:
+        histogram.add(value)
+    assert histogram.counts == [2, 1, 1, 0]
+    assert histogram.getPercentile(0.5) == 0.01
+    assert histogram.getPercentile(0.95) == 1
+    histogram.add(5)
+    assert histogram.getPercentile(1.0) is None
+
+
+def remoteMethod(function):
+    function.fontraRemoteMethod = True
+    return function
+
+
+class FakeFontHandler:
+    projectIdentifier = "test"
+
+    @remoteMethod
+    async def getGlyph(self, glyphName, *, connection=None):
+        await asyncio.sleep(0.01)
+        return glyphName
+
+    @remoteMethod
+    async def putGlyph(self, glyphName, glyph, *, connection=None):
+        raise ValueError(glyphName)
+
+    async def notRemote(self):
+        pass
+
+
+def test_instrumentedRemoteSubject():
+    metrics = ServerMetrics(sizeSampleInterval=None)
+    subject = metrics.wrapRemoteSubject(FakeFontHandler())
+    assert subject.projectIdentifier == "test"
+    assert not getattr(subject.notRemote, "fontraRemoteMethod", False)
+
+    async def callMethods():
+        await asyncio.gather(
+            *(subject.getGlyph(f"glyph{i}", connection=None) for i in range(3))
+        )
+        try:
+            await subject.putGlyph("A", None, connection=None)
+        except ValueError:
+            pass
+
+    asyncio.run(callMethods())
+    snapshot = metrics.getSnapshot()["remoteMethods"]
+    assert snapshot["getGlyph"]["calls"] == 3
+    assert snapshot["getGlyph"]["maxInFlight"] == 3
+    assert snapshot["getGlyph"]["inFlight"] == 0
+    assert snapshot["getGlyph"]["meanTime"] >= 0.01
+    assert snapshot["putGlyph"]["errors"] == 1
+
+
+def test_metricsMiddleware():
+    metrics = ServerMetrics()
+
+    async def hello(request):
+        return web.Response(text="hello")
+
+    async def run():
+        app = web.Application(middlewares=[metrics.makeMiddleware()])
+        app.router.add_get("/hello/{name}", hello)
+        async with TestClient(TestServer(app, host="127.0.0.1")) as client:
+            for name in ["a", "b"]:
+                response = await client.get(f"/hello/{name}")
+                assert await response.text() == "hello"
+            response = await client.get(metricsViewerPath)
+            assert "<table" in await response.text()
+            response = await client.get(metricsPath)
+            return await response.json()
+
+    snapshot = asyncio.run(run())
+    requestMetrics = snapshot["httpRequests"]["GET /hello/{name}"]
+    assert requestMetrics["calls"] == 2
+    assert requestMetrics["responseSize"]["mean"] == 5
@@ -0,0 +1,54 @@
+import secrets
+import subprocess
+import sys
+import time
+
+import pytest
+
+QtCore = pytest.importorskip("PyQt6.QtCore")
+
+from fontrapak.singleinstance import SingleInstance  # noqa: E402
+
+
+@pytest.fixture
+def instanceName():
+    return "fontra-pak-test-" + secrets.token_hex(4)
+
+
+def test_lock(instanceName):
+    first = SingleInstance(instanceName)
+    second = SingleInstance(instanceName)
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+def test_forwardWithoutListener(instanceName):
+    assert not SingleInstance(instanceName).forward([], timeout=0.2)
+
+
+def test_forward(instanceName, tmp_path):
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    instance = SingleInstance(instanceName)
+    assert instance.acquire()
+    receivedPaths = []
+    assert instance.listen(receivedPaths.extend)
+
+    fontPath = tmp_path / "Test.designspace"
+    script = (
+        "import sys\n"
+        "from fontrapak.singleinstance import SingleInstance\n"
+        f"ok = SingleInstance({instanceName!r}).forward([{str(fontPath)!r}])\n"
+        "sys.exit(0 if ok else 1)\n"
+    )
+    process = subprocess.Popen([sys.executable, "-c", script])
+    deadline = time.monotonic() + 10
+    while process.poll() is None and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+
+    instance.release()
+    assert process.wait(timeout=1) == 0
+    assert receivedPaths == [str(fontPath.resolve())]
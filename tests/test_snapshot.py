@@ -0,0 +1,281 @@
+import asyncio
+
+import pytest
+
+from fontrapak import snapshot
+from fontrapak.backendproxy import writeMethodNames
+from fontrapak.diskcache import DiskCache
+from fontrapak.snapshot import (
+    SnapshotBackend,
+    SnapshotCache,
+    SnapshotReader,
+    SnapshotWriter,
+    WritableSnapshotBackend,
+    fontDataMethodNames,
+    getSourceSignature,
+    writeProjectSnapshot,
+    writeSnapshotFile,
+)
+
+
+def writeTestSnapshot(snapshotPath, isWritable=False, isWatchable=False):
+    writer = SnapshotWriter(snapshotPath)
+    writer.addFontData("getGlyphMap", {"A": [65], "B": [66]})
+    writer.addFontData("getUnitsPerEm", 1000)
+    writer.addGlyph("A", {"name": "A", "width": 500})
+    writer.addGlyph("B", {"name": "B", "width": 600})
+    writer.finish(isWritable=isWritable, isWatchable=isWatchable)
+
+
+class FakeBackend:
+    def __init__(self, glyphs):
+        self.glyphs = glyphs
+        self.watchCallback = None
+        self.closed = False
+
+    async def getGlyphMap(self):
+        return {glyphName: [] for glyphName in self.glyphs}
+
+    async def getGlyph(self, glyphName):
+        return self.glyphs.get(glyphName)
+
+    async def watchExternalChanges(self, callback):
+        self.watchCallback = callback
+
+    async def aclose(self):
+        self.closed = True
+
+    def __getattr__(self, methodName):
+        # The other font data getters
+        if not methodName.startswith("get"):
+            raise AttributeError(methodName)
+
+        async def getFontData():
+            return methodName
+
+        return getFontData
+
+
+def test_snapshotRoundTrip(tmp_path):
+    snapshotPath = tmp_path / "test.snapshot"
+    writeTestSnapshot(snapshotPath)
+
+    reader = SnapshotReader(snapshotPath)
+    backend = SnapshotBackend(tmp_path / "test.glyphs", reader)
+
+    async def readAll():
+        glyphMap = await backend.getGlyphMap()
+        glyphs = [await backend.getGlyph(glyphName) for glyphName in glyphMap]
+        missing = await backend.getGlyph("C")
+        unitsPerEm = await backend.getUnitsPerEm()
+        await backend.aclose()
+        return glyphMap, glyphs, missing, unitsPerEm
+
+    glyphMap, glyphs, missing, unitsPerEm = asyncio.run(readAll())
+    assert glyphMap == {"A": [65], "B": [66]}
+    assert glyphs == [{"name": "A", "width": 500}, {"name": "B", "width": 600}]
+    assert missing is None
+    assert unitsPerEm == 1000
+    assert not reader.isWritable
+
+
+def test_snapshotWritable(tmp_path):
+    snapshotPath = tmp_path / "test.snapshot"
+    writeTestSnapshot(snapshotPath, isWritable=True)
+    reader = SnapshotReader(snapshotPath)
+    assert reader.isWritable
+    reader.close()
+    for methodName in writeMethodNames:
+        assert hasattr(WritableSnapshotBackend, methodName)
+        assert not hasattr(SnapshotBackend, methodName)
+
+
+def test_snapshotBadFile(tmp_path):
+    snapshotPath = tmp_path / "test.snapshot"
+    snapshotPath.write_bytes(b"something else entirely")
+    with pytest.raises(ValueError):
+        SnapshotReader(snapshotPath)
+
+
+def test_sourceSignature(tmp_path):
+    packagePath = tmp_path / "test.glyphspackage"
+    packagePath.mkdir()
+    (packagePath / "fontinfo.plist").write_text("a")
+    signature = getSourceSignature(packagePath)
+    (packagePath / "fontinfo.plist").write_text("ab")
+    assert getSourceSignature(packagePath) != signature
+
+
+def test_sourceSignature_designspace(tmp_path):
+    pytest.importorskip("fontTools.designspaceLib")
+    ufoPath = tmp_path / "masters" / "A.ufo"
+    ufoPath.mkdir(parents=True)
+    (ufoPath / "fontinfo.plist").write_text("a")
+    designspacePath = tmp_path / "A.designspace"
+    designspacePath.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<designspace format="5.0"><sources>'
+        '<source filename="masters/A.ufo"/>'
+        "</sources></designspace>\n"
+    )
+    signature = getSourceSignature(designspacePath)
+    # A change to a master changes the designspace's signature
+    (ufoPath / "fontinfo.plist").write_text("ab")
+    assert getSourceSignature(designspacePath) != signature
+
+
+def test_diskCacheLookup(tmp_path):
+    cache = DiskCache(tmp_path, maxSize=None, suffix=".snapshot")
+    key = "ab" * 32
+    assert cache.lookup(key) is None
+    cache.put(key, b"data")
+    assert cache.lookup(key) == cache.getPath(key)
+
+
+def test_writeSnapshotFile(tmp_path):
+    snapshotPath = tmp_path / "test.snapshot"
+    writeSnapshotFile(FakeBackend({"A": {"width": 500}}), snapshotPath)
+    reader = SnapshotReader(snapshotPath)
+    try:
+        assert reader.isWatchable and not reader.isWritable
+        assert reader.readRecord(reader.glyphRecords["A"]) == {"width": 500}
+        assert reader.readRecord(reader.fontDataRecords["getFeatures"]) == (
+            "getFeatures"
+        )
+        assert sorted(reader.fontDataRecords) == sorted(fontDataMethodNames)
+    finally:
+        reader.close()
+
+
+def test_snapshotWatchExternalChanges(tmp_path, monkeypatch):
+    projectPath = tmp_path / "test.glyphs"
+    projectPath.write_text("a")
+    snapshotPath = tmp_path / "test.snapshot"
+    writeTestSnapshot(snapshotPath, isWatchable=True)
+    realBackend = FakeBackend({"A": {"name": "A", "width": 550}})
+    openedPaths = []
+
+    def openRealBackend(projectPath):
+        openedPaths.append(projectPath)
+        return realBackend
+
+    monkeypatch.setattr(snapshot, "openRealBackend", openRealBackend)
+
+    invalidations = []
+    changes = []
+
+    async def externalChangeCallback(*args):
+        changes.append(args)
+
+    async def run():
+        backend = SnapshotBackend(
+            projectPath,
+            SnapshotReader(snapshotPath),
+            onInvalidate=lambda: invalidations.append(True),
+        )
+        backend.sourcePollInterval = 0.01
+        assert await backend.getGlyph("A") == {"name": "A", "width": 500}
+        await backend.watchExternalChanges(externalChangeCallback)
+        await asyncio.sleep(0.05)
+        # Watching doesn't load the source in full
+        assert openedPaths == []
+
+        projectPath.write_text("ab")
+        await asyncio.wait_for(backend._watchTask, 5)
+        assert openedPaths == [projectPath]
+        assert realBackend.watchCallback is not None
+
+        await realBackend.watchCallback(None, {"glyphs": {"A": None}})
+        glyph = await backend.getGlyph("A")
+        await backend.aclose()
+        return glyph
+
+    assert asyncio.run(run()) == {"name": "A", "width": 550}
+    # Everything is reloaded once the source changed, then only what the real
+    # backend reports
+    assert len(changes) == 2
+    change, reloadPattern = changes[0]
+    assert change is None
+    assert reloadPattern["glyphs"] == {"A": None, "B": None}
+    assert reloadPattern["glyphMap"] is None
+    assert changes[1] == (None, {"glyphs": {"A": None}})
+    assert invalidations == [True]
+    assert realBackend.closed
+
+
+def test_writeProjectSnapshot(tmp_path, monkeypatch):
+    # The snapshot is read from a backend of its own, in the writing thread
+    backends = []
+
+    def openRealBackend(projectPath):
+        backends.append(FakeBackend({"A": {"width": 500}}))
+        return backends[-1]
+
+    monkeypatch.setattr(snapshot, "openRealBackend", openRealBackend)
+    snapshotPath = tmp_path / "test.snapshot"
+    writeProjectSnapshot(tmp_path / "test.glyphs", snapshotPath)
+    assert len(backends) == 1 and backends[0].closed
+    reader = SnapshotReader(snapshotPath)
+    try:
+        assert reader.readRecord(reader.glyphRecords["A"]) == {"width": 500}
+    finally:
+        reader.close()
+
+
+def test_snapshotWriteLoadsRealBackendOnce(tmp_path, monkeypatch):
+    snapshotPath = tmp_path / "test.snapshot"
+    writeTestSnapshot(snapshotPath, isWritable=True)
+    written = []
+
+    class WritableBackend(FakeBackend):
+        async def putGlyph(self, glyphName, glyph, codePoints):
+            written.append(glyphName)
+
+    openedPaths = []
+
+    def openRealBackend(projectPath):
+        openedPaths.append(projectPath)
+        return WritableBackend({})
+
+    monkeypatch.setattr(snapshot, "openRealBackend", openRealBackend)
+
+    async def run():
+        backend = WritableSnapshotBackend(
+            tmp_path / "test.glyphs", SnapshotReader(snapshotPath)
+        )
+        await asyncio.gather(
+            backend.putGlyph("A", {}, []), backend.putGlyph("B", {}, [])
+        )
+        await backend.aclose()
+
+    asyncio.run(run())
+    assert sorted(written) == ["A", "B"]
+    assert len(openedPaths) == 1
+
+
+def test_snapshotCacheEnsureSnapshot(tmp_path, monkeypatch):
+    projectPath = tmp_path / "test.glyphs"
+    projectPath.write_text("a")
+    openedPaths = []
+
+    def openRealBackend(projectPath):
+        openedPaths.append(projectPath)
+        return FakeBackend({"A": {"width": 500}})
+
+    monkeypatch.setattr(snapshot, "openRealBackend", openRealBackend)
+    monkeypatch.setattr(snapshot, "getSnapshotKey", lambda path: "ab" * 32)
+
+    async def run():
+        cache = SnapshotCache(tmp_path / "cache", maxSize=None)
+        await cache.ensureSnapshot(projectPath)
+        await cache.ensureSnapshot(projectPath)
+        # Opened from the snapshot, without parsing the source again
+        backend = cache.openBackend(projectPath)
+        try:
+            assert isinstance(backend, SnapshotBackend)
+            return await backend.getAxes()
+        finally:
+            await backend.aclose()
+
+    assert asyncio.run(run()) == "getAxes"
+    assert openedPaths == [projectPath]
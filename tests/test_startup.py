@@ -1,25 +1,104 @@
+import json
+import os
 import pathlib
 import subprocess
 import sys
 
+import pytest
+
+from benchmarks.launchtime import findAppPath, runTestStartup
+
 repoRoot = pathlib.Path(__file__).resolve().parent.parent
 
+# Seconds from launching the app. Override with a JSON object in the
+# FONTRA_PAK_STARTUP_BUDGETS environment variable, for example on slow CI.
+startupBudgets = {
+    "windowShown": 10,
+    "serverReady": 20,
+    "firstPage": 25,
+}
+
+# Seconds the window may go without handling events once it is shown
+maxGUIStall = 1.0
+
+
+def getStartupBudgets():
+    budgets = dict(startupBudgets)
+    budgets.update(json.loads(os.environ.get("FONTRA_PAK_STARTUP_BUDGETS", "{}")))
+    return budgets
+
 
 def test_startup():
-    if sys.platform == "darwin":
-        app_path = (
-            repoRoot / "dist" / "Fontra Pak.app" / "Contents" / "MacOS" / "Fontra Pak"
-        )
-    elif sys.platform == "win32":
-        app_path = repoRoot / "dist" / "Fontra Pak.exe"
-    else:
+    appPath = findAppPath(repoRoot / "dist")
+    if sys.platform not in {"darwin", "win32"} and not appPath.exists():
+        # Builds are only required on the platforms we ship for
         return
+    result, startupTimes, timings = runTestStartup(appPath)
+    assert "" == result.stderr
+    assert "test-startup" == result.stdout.splitlines()[-1]
+    assert startupTimes is not None
+
+    print("startup timings:", ", ".join(f"{k} {v:.2f}s" for k, v in timings.items()))
+
+    overBudget = [
+        f"{name}: {timings[name]:.2f}s > {budget}s"
+        for name, budget in getStartupBudgets().items()
+        if timings.get(name, float("inf")) > budget
+    ]
+    assert not overBudget, "startup over budget: " + ", ".join(overBudget)
+
+    guiStalls = startupTimes.get("guiStalls")
+    if guiStalls is not None:
+        print(
+            f"GUI stalls: {guiStalls['numStalls']}, "
+            f"longest {guiStalls['maxStall']:.2f}s"
+        )
+        assert guiStalls["maxStall"] <= maxGUIStall
+
+
+@pytest.mark.parametrize(
+    "platform, layout, expectedPath",
+    [
+        ("win32", "Fontra Pak/Fontra Pak.exe", "Fontra Pak/Fontra Pak.exe"),
+        ("win32", "Fontra Pak.exe", "Fontra Pak.exe"),
+        ("linux", "Fontra Pak/Fontra Pak", "Fontra Pak/Fontra Pak"),
+        ("linux", "Fontra Pak", "Fontra Pak"),
+        (
+            "darwin",
+            "Fontra Pak.app/Contents/MacOS/Fontra Pak",
+            "Fontra Pak.app/Contents/MacOS/Fontra Pak",
+        ),
+    ],
+)
+def test_findAppPath(tmp_path, platform, layout, expectedPath):
+    # One-dir and one-file builds
+    appPath = tmp_path / layout
+    appPath.parent.mkdir(parents=True, exist_ok=True)
+    appPath.touch()
+    assert findAppPath(tmp_path, platform) == tmp_path / expectedPath
+
+
+@pytest.mark.parametrize(
+    "moduleNames",
+    [
+        ["FontraPakMain"],
+        ["fontrapak.server", "fontrapak.threads", "fontrapak.filetypes"],
+    ],
+)
+def test_lightImports(moduleNames):
+    # Every process multiprocessing spawns imports the main module again, and
+    # the GUI imports the server module: neither may pull in heavy modules
+    heavyModules = ["PyQt6", "fontra.backends", "fontra.core.server", "aiohttp"]
+    script = (
+        "import sys\n"
+        + "".join(f"import {moduleName}\n" for moduleName in moduleNames)
+        + f"print([m for m in {heavyModules!r} if m in sys.modules])\n"
+    )
     result = subprocess.run(
-        [app_path, "test-startup"],
+        [sys.executable, "-c", script],
         capture_output=True,
-        timeout=30,
-        check=False,
+        cwd=repoRoot,
+        check=True,
         encoding="utf-8",
     )
-    assert "" == result.stderr
-    assert "test-startup" == result.stdout.splitlines()[-1]
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,41 @@
+import pytest
+
+from benchmarks.syntheticfonts import ProjectParameters, compareResults, runBenchmarks
+
+
+def test_compareResults():
+    baseline = {
+        "open": dict(status="done", time=1.0),
+        "copy:ufo": dict(status="done", time=1.0),
+        "export:ttf": dict(status="done", time=1.0),
+        "export:otf": dict(status="failed", error="..."),
+    }
+    results = {
+        "open": dict(status="done", time=1.1),
+        "copy:ufo": dict(status="done", time=1.5),
+        "export:ttf": dict(status="failed", error="..."),
+        "export:otf": dict(status="done", time=10.0),
+    }
+    assert compareResults(results, baseline, tolerance=0.2) == [
+        ("copy:ufo", 1.5, 1.0),
+        ("export:ttf", None, 1.0),
+    ]
+    assert compareResults(results, baseline, tolerance=1.0) == [
+        ("export:ttf", None, 1.0),
+    ]
+
+
+def test_runBenchmarks(tmpdir, monkeypatch):
+    pytest.importorskip("fontra.backends")
+    from fontrapak.exportcache import exportCacheModeEnvironmentVariable
+
+    # runBenchmarks() turns the export cache off: restore it afterwards
+    monkeypatch.setenv(exportCacheModeEnvironmentVariable, "off")
+    parameters = ProjectParameters(
+        numGlyphs=10, numSources=2, numContours=2, compositeRatio=0.3
+    )
+    results = runBenchmarks(parameters, tmpdir, printFunc=lambda line: None)
+    assert results["create"]["status"] == "done"
+    assert results["open"]["status"] == "done"
+    assert results["copy:fontra"]["status"] == "done"
+    assert results["copy:designspace"]["status"] == "done"
@@ -0,0 +1,59 @@
+import pathlib
+
+import pytest
+
+pytest.importorskip("fontTools")
+
+from fontTools.fontBuilder import FontBuilder  # noqa: E402
+from fontTools.pens.ttGlyphPen import TTGlyphPen  # noqa: E402
+from fontTools.ttLib import TTFont  # noqa: E402
+
+from fontrapak.webfonts import getSubsetPath, parseSubsets, writeOutput  # noqa: E402
+
+
+def buildTestFont(path):
+    glyphOrder = [".notdef", "A", "B"]
+    pen = TTGlyphPen(None)
+    pen.moveTo((0, 0))
+    pen.lineTo((0, 500))
+    pen.lineTo((500, 0))
+    pen.closePath()
+    glyph = pen.glyph()
+    builder = FontBuilder(1000, isTTF=True)
+    builder.setupGlyphOrder(glyphOrder)
+    builder.setupCharacterMap({ord("A"): "A", ord("B"): "B"})
+    builder.setupGlyf({glyphName: glyph for glyphName in glyphOrder})
+    builder.setupHorizontalMetrics({glyphName: (600, 0) for glyphName in glyphOrder})
+    builder.setupHorizontalHeader(ascent=800, descent=-200)
+    builder.setupNameTable({"familyName": "Test", "styleName": "Regular"})
+    builder.setupOS2()
+    builder.setupPost()
+    builder.save(path)
+
+
+def test_parseSubsets():
+    assert parseSubsets(["latin=U+0041-0042,U+0131"]) == {"latin": [0x41, 0x42, 0x131]}
+    with pytest.raises(ValueError):
+        parseSubsets(["U+0041"])
+
+
+def test_getSubsetPath():
+    assert getSubsetPath(pathlib.Path("/out/MyFont.woff2"), "latin") == pathlib.Path(
+        "/out/MyFont-latin.woff2"
+    )
+
+
+@pytest.mark.parametrize("fileExtension", ["ttf", "woff"])
+def test_writeOutput(tmp_path, fileExtension):
+    compiledPath = tmp_path / "compiled.ttf"
+    buildTestFont(compiledPath)
+
+    destPath = tmp_path / f"Test.{fileExtension}"
+    writeOutput(compiledPath, destPath, fileExtension)
+    font = TTFont(destPath)
+    assert font.flavor == (None if fileExtension == "ttf" else fileExtension)
+    assert set(font.getBestCmap()) == {ord("A"), ord("B")}
+
+    subsetPath = getSubsetPath(destPath, "A")
+    writeOutput(compiledPath, subsetPath, fileExtension, unicodes=[ord("A")])
+    assert set(TTFont(subsetPath).getBestCmap()) == {ord("A")}